@@ -1,22 +1,87 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, g, request, jsonify, make_response, send_from_directory, send_file
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 from dotenv import load_dotenv
 from services.instagram_scraper import InstagramScraper
 from services.facebook_scraper import FacebookScraper
 from services.sentiment_analyzer import SentimentAnalyzer
 from services.topic_classifier import TopicClassifier
+from services.result_store import ResultStore
+from services.serialization import FastJSONProvider, compress_response, dumps_bytes, iter_ndjson, iter_encoded, choose_encoding
+from services.single_flight import SingleFlight
+from services.response_cache import ResponseCache
+from services.comment_store import CommentStore
+from services.comment_utils import stable_comment_id, to_epoch
+from services.monitor import ProfileMonitor
+from services.streaming import StreamingAggregator
+from services.near_duplicates import NearDuplicateClusterer
+from services.export import EXPORT_FORMATS, iter_comment_batches, iter_export, iter_post_batches, schema_for
+from services.trends import TREND_SOURCES, build_trend_series
+from services.url_utils import normalize_url
+from services.rate_limiter import RateLimiter
+from services.admission import AdmissionController, AdmissionRejected
+from services.deadline import Deadline, DeadlineExceeded
+from services.fake_apify import FakeApifyClient
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_SECONDS, render as render_metrics
+from services import tracing
+from services.structured_logging import configure_logging
 import logging
+import math
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging - JSON lines by default, LOG_FORMAT=text for local development
+configure_logging(os.getenv('LOG_LEVEL', 'INFO'), os.getenv('LOG_FORMAT', 'json'))
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder='../frontend/build', static_url_path='')
-CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "OPTIONS"]}})
+app.json = FastJSONProvider(app)
+CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "OPTIONS"], "expose_headers": ["ETag", "X-Cache", "Server-Timing", "X-Trace-Id", "Retry-After"]}})
+
+# Response compression settings
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+# Profile/page runs with at least this many posts are analyzed in memory-bounded streaming mode
+STREAMING_POST_THRESHOLD = int(os.getenv('STREAMING_POST_THRESHOLD', 200))
+STREAMING_CHUNK_SIZE = int(os.getenv('STREAMING_CHUNK_SIZE', 500))
+# Multi-URL batch analysis limits
+BATCH_MAX_URLS = int(os.getenv('BATCH_MAX_URLS', 100))
+BATCH_SCRAPE_CONCURRENCY = int(os.getenv('BATCH_SCRAPE_CONCURRENCY', 4))
+# Profiles/pages of one portfolio analyzed at the same time
+PORTFOLIO_CONCURRENCY = int(os.getenv('PORTFOLIO_CONCURRENCY', 4))
+# Per-request profiler capture (?profile=1) - debug only, off unless enabled
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes', 'on')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'profiles'))
+# Admission control for analyses that miss the response cache (limits are per process);
+# override per endpoint with ADMISSION_<ENDPOINT>_CONCURRENCY / ADMISSION_<ENDPOINT>_QUEUE
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() in ('1', 'true', 'yes', 'on')
+ADMISSION_LIMITS = {
+    # endpoint: (running, waiting)
+    'analyze': (4, 8),
+    'analyze-batch': (1, 2),
+    'analyze-profile': (2, 4),
+    'analyze-facebook-group': (2, 4)
+}
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 30))
+ADMISSION_MAX_QUEUED_PER_CLIENT = int(os.getenv('ADMISSION_MAX_QUEUED_PER_CLIENT', 2))
+# Reverse proxies in front of the app whose X-Forwarded-For hop is trusted for the client
+# address (0 = use the peer address; clients can set the header to anything)
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+# Default deadline for profile/page analyses without timeout_seconds (0 = none); scraping may
+# use all but DEADLINE_ANALYSIS_SHARE of it, posts that do not fit are skipped
+ANALYSIS_TIMEOUT_SECONDS = float(os.getenv('ANALYSIS_TIMEOUT_SECONDS', 0))
+DEADLINE_ANALYSIS_SHARE = float(os.getenv('DEADLINE_ANALYSIS_SHARE', 0.2))
+# Incremental runs list only posts newer than the profile watermark minus this many days; older
+# posts are served from the comment store (negative = always list from from_date)
+INCREMENTAL_LOOKBACK_DAYS = int(os.getenv('INCREMENTAL_LOOKBACK_DAYS', 30))
+
+if TRUSTED_PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
 
 # Get API key from environment
 APIFY_API_KEY = os.getenv('APIFY_API_KEY')
@@ -25,10 +90,153 @@ if not APIFY_API_KEY:
     logger.info("Please set APIFY_API_KEY in your .env file")
 
 # Initialize services
-instagram_scraper = InstagramScraper(api_key=APIFY_API_KEY)
-facebook_scraper = FacebookScraper(api_key=APIFY_API_KEY)
-sentiment_analyzer = SentimentAnalyzer()
+# One actor-call budget shared by every scraper and concurrent analysis - and by every
+# gunicorn worker when APIFY_RATE_LIMIT_FILE is set (gunicorn.conf.py does with several workers)
+apify_rate_limiter = RateLimiter(
+    rate_per_second=float(os.getenv('APIFY_CALLS_PER_SECOND', 2)),
+    burst=int(os.getenv('APIFY_CALLS_BURST', 4)),
+    state_path=os.getenv('APIFY_RATE_LIMIT_FILE') or None
+)
+# APIFY_FAKE=1 swaps Apify for an offline record/replay stand-in (benchmarks, CI)
+apify_client = FakeApifyClient.from_env() if os.getenv('APIFY_FAKE', '').lower() in ('1', 'true', 'yes', 'on') else None
+if apify_client is not None:
+    logger.warning("APIFY_FAKE is set - scrapers replay recorded/synthetic datasets instead of calling Apify")
+scraper_post_delay = float(os.getenv('APIFY_POST_DELAY', 0 if apify_client is not None else 2))
+instagram_scraper = InstagramScraper(api_key=APIFY_API_KEY, rate_limiter=apify_rate_limiter,
+                                     client=apify_client, post_delay=scraper_post_delay)
+facebook_scraper = FacebookScraper(api_key=APIFY_API_KEY, rate_limiter=apify_rate_limiter, client=apify_client)
+# SENTIMENT_MODEL_PATH: local safetensors export (python -m services.model_loading), memory-mapped and shared by workers
+sentiment_analyzer = SentimentAnalyzer(
+    batch_size=int(os.getenv('INFERENCE_BATCH_SIZE', 32)),
+    model_path=os.getenv('SENTIMENT_MODEL_PATH')
+)
 topic_classifier = TopicClassifier()
+result_store = ResultStore(
+    max_results=int(os.getenv('RESULT_STORE_MAX_RESULTS', 50)),
+    ttl_seconds=int(os.getenv('RESULT_STORE_TTL_SECONDS', 3600)),
+    spill_dir=os.getenv('RESULT_SPILL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'result_spills')),
+    # Every result on disk, so all gunicorn workers can serve it (set by gunicorn.conf.py with several workers)
+    shared=os.getenv('RESULT_STORE_SHARED', 'false').lower() in ('1', 'true', 'yes', 'on')
+)
+# Near-duplicate stage ahead of sentiment scoring (DEDUP_ENABLED=false turns it off)
+near_duplicate_clusterer = NearDuplicateClusterer(
+    threshold=float(os.getenv('DEDUP_THRESHOLD', 0.8))
+) if os.getenv('DEDUP_ENABLED', 'true').lower() in ('1', 'true', 'yes', 'on') else None
+single_flight = SingleFlight()
+comment_store = CommentStore(
+    os.getenv('COMMENT_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'comments.db'))
+)
+admission_controllers = {}
+if ADMISSION_ENABLED:
+    for endpoint, (running, waiting) in ADMISSION_LIMITS.items():
+        prefix = f"ADMISSION_{endpoint.upper().replace('-', '_')}"
+        admission_controllers[endpoint] = AdmissionController(
+            endpoint,
+            max_concurrent=int(os.getenv(f'{prefix}_CONCURRENCY', running)),
+            max_queue=int(os.getenv(f'{prefix}_QUEUE', waiting)),
+            queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+            max_queued_per_client=ADMISSION_MAX_QUEUED_PER_CLIENT
+        )
+
+def stored_result_exists(outcome):
+    """Cached outcomes only hold the summary - the comments behind its result_id must still be stored"""
+    return result_store.get(outcome[1]['data']['result_id']) is not None
+
+response_cache = ResponseCache(
+    cache_dir=os.getenv('RESPONSE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'responses')),
+    max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 32)),
+    ttl_seconds=int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 900)),
+    stale_seconds=int(os.getenv('RESPONSE_CACHE_STALE_SECONDS', 3600)),
+    single_flight=single_flight,
+    is_valid=stored_result_exists
+)
+
+def comments_url_for(result_id):
+    """Build the paginated comments URL for a stored result"""
+    return f'/api/results/{result_id}/comments'
+
+def request_flag(name):
+    """Read a boolean flag from the query string or the JSON body"""
+    if is_truthy(request.args.get(name)):
+        return True
+    body = request.get_json(silent=True) if request.is_json else None
+    return isinstance(body, dict) and is_truthy(body.get(name))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.trace, g.trace_token = tracing.start_trace()
+    
+    g.profiler = None
+    if request_flag('profile'):
+        if PROFILING_ENABLED or app.debug:
+            profiler = tracing.RequestProfiler(PROFILE_DIR)
+            if profiler.start():
+                g.profiler = profiler
+            else:
+                logger.warning("Profiler busy with another request - not profiling this one")
+        else:
+            logger.warning("Profile requested but PROFILING_ENABLED is off")
+
+@app.teardown_request
+def end_request_trace(exc):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        tracing.end_trace(token)
+    # The view may have raised before after_request could stop the profiler
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop(g.trace.trace_id)
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe request latency per route (the URL rule, so result ids don't explode the label set)"""
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUEST_SECONDS.labels(endpoint, request.method, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+@app.after_request
+def compress_api_response(response):
+    """Compress large API responses with gzip/brotli when the client accepts it"""
+    if request.path.startswith('/api/'):
+        response = compress_response(
+            response,
+            request.headers.get('Accept-Encoding', ''),
+            min_size=COMPRESSION_MIN_BYTES
+        )
+    return response
+
+@app.after_request
+def add_trace_timings(response):
+    """
+    Report the request's spans as Server-Timing headers and, when asked (timings=true),
+    as a 'timings' block in the JSON body. Registered after compression so it runs first.
+    """
+    trace = g.get('trace')
+    if trace is None:
+        return response
+    
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop(trace.trace_id)
+        response.headers['X-Profile-URL'] = f'/api/debug/profiles/{trace.trace_id}'
+        logger.info(f"Saved {profiler.kind} profile of {request.path} as trace {trace.trace_id}")
+    
+    if request_flag('timings') and response.is_json and not response.direct_passthrough:
+        body = response.get_json(silent=True)
+        if isinstance(body, dict):
+            body['timings'] = trace.to_dict()
+            response.set_data(dumps_bytes(body))
+            # The body now differs on every request
+            response.headers.pop('ETag', None)
+    
+    response.headers['Server-Timing'] = trace.server_timing()
+    response.headers['X-Trace-Id'] = trace.trace_id
+    return response
 
 @app.route('/', methods=['GET'])
 def home():
@@ -42,7 +250,16 @@ def home():
             'analyze': '/api/analyze (POST) - Single Instagram post analysis',
             'analyze-profile': '/api/analyze-profile (POST) - Bulk Instagram profile analysis from date',
             'analyze-facebook-group': '/api/analyze-facebook-group (POST) - Bulk Facebook group analysis from date',
-            'stats': '/api/stats (POST)'
+            'analyze-batch': '/api/analyze-batch (POST) - Many Instagram/Facebook post URLs in one report',
+            'analyze-portfolio': '/api/analyze-portfolio (POST) - Several profiles/pages analyzed in parallel and merged',
+            'metrics': '/metrics (GET) - Prometheus metrics',
+            'stats': '/api/stats (POST)',
+            'result-comments': '/api/results/<result_id>/comments (GET) - Paginated comments of a stored analysis',
+            'result-export': '/api/results/<result_id>/export (GET) - Parquet/Arrow download of a stored analysis',
+            'history-comments': '/api/history/comments (GET) - Stored comments from past analyses',
+            'history-stats': '/api/history/stats (GET) - Re-aggregated statistics from stored comments',
+            'monitor-profiles': '/api/monitor/profiles (GET, POST, DELETE) - Scheduled profile/page monitoring',
+            'trends': '/api/trends (GET) - Sentiment and topic counts per hour/day/week from rollups'
         }
     }), 200
 
@@ -63,9 +280,34 @@ def health_check():
             'facebook_scraper': 'initialized',
             'sentiment_analyzer': 'initialized',
             'topic_classifier': 'initialized'
-        }
+        },
+        'single_flight': single_flight.stats(),
+        'response_cache': response_cache.stats(),
+        'apify_rate_limit': apify_rate_limiter.stats(),
+        'admission': {endpoint: controller.stats() for endpoint, controller in admission_controllers.items()}
     }), 200
 
+@app.route('/api/debug/profiles/<trace_id>', methods=['GET'])
+def get_profile(trace_id):
+    """Download the profiler output captured for a request (?profile=1, PROFILING_ENABLED only)"""
+    if not (PROFILING_ENABLED or app.debug) or not all(c in '0123456789abcdef' for c in trace_id):
+        return jsonify({'error': 'Profile not found', 'success': False}), 404
+    
+    for extension in ('.html', '.prof'):
+        path = os.path.join(PROFILE_DIR, trace_id + extension)
+        if os.path.exists(path):
+            return send_file(path, as_attachment=extension == '.prof')
+    return jsonify({'error': 'Profile not found', 'success': False}), 404
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus metrics: stage latencies, model batches, comment counts, cache lookups, coalesced
+    requests, request latency - summed over all gunicorn workers when PROMETHEUS_MULTIPROC_DIR
+    is set (gunicorn.conf.py does with several workers)
+    """
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
 # Serve React App
 @app.route('/')
 def serve_react_app():
@@ -109,14 +351,1164 @@ def test_scraper():
             'message': 'Scraper test failed. Check API key and actor configuration.'
         }), 500
 
-@app.route('/api/analyze', methods=['POST'])
+def build_sentiment_stats(positive_count, negative_count, neutral_count):
+    """Build the sentiment_stats block from sentiment counts"""
+    total_comments = positive_count + negative_count + neutral_count
+    return {
+        'positive': positive_count,
+        'negative': negative_count,
+        'neutral': neutral_count,
+        'positive_percentage': round((positive_count / total_comments) * 100, 2) if total_comments > 0 else 0,
+        'negative_percentage': round((negative_count / total_comments) * 100, 2) if total_comments > 0 else 0,
+        'neutral_percentage': round((neutral_count / total_comments) * 100, 2) if total_comments > 0 else 0
+    }
+
+def build_posts_analysis(posts, analyzed_comments):
+    """Build the per-post sentiment breakdown in a single pass over the analyzed comments"""
+    breakdowns = {}
+    for comment in analyzed_comments:
+        counts = breakdowns.setdefault(comment.get('post_url'), {'positive': 0, 'negative': 0, 'neutral': 0})
+        counts[comment['sentiment']] += 1
+    
+    posts_analysis = []
+    for post in posts:
+        breakdown = breakdowns.get(post['post_url'], {'positive': 0, 'negative': 0, 'neutral': 0})
+        posts_analysis.append({
+            'post_url': post['post_url'],
+            'post_date': post['post_date'],
+            'total_comments': sum(breakdown.values()),
+            'sentiment_breakdown': breakdown
+        })
+    return posts_analysis
+
+def build_duplicate_stats(analyzed_comments, top=5):
+    """Summarize near-duplicate clusters (copy-paste spam, bot campaigns) as a spam signal"""
+    clusters = {}
+    for comment in analyzed_comments:
+        label = comment.get('duplicate_cluster')
+        if label is not None and label not in clusters:
+            clusters[label] = comment
+    
+    duplicate_comments = sum(c['duplicate_cluster_size'] for c in clusters.values())
+    largest = sorted(clusters.values(), key=lambda c: c['duplicate_cluster_size'], reverse=True)[:top]
+    return {
+        'clusters': len(clusters),
+        'duplicate_comments': duplicate_comments,
+        'duplicate_percentage': round(duplicate_comments / len(analyzed_comments) * 100, 2) if analyzed_comments else 0,
+        'largest_clusters': [
+            {
+                'size': c['duplicate_cluster_size'],
+                'text': c.get('text', ''),
+                'sentiment': c['sentiment']
+            }
+            for c in largest
+        ]
+    }
+
+def analyze_comments(analyzed_comments):
+    """
+    Split analyzed comments by sentiment and classify negative topics
+    
+    Args:
+        analyzed_comments (list): Comments with sentiment
+    
+    Returns:
+        tuple: (positive, negative, neutral, sentiment_stats, topic_stats)
+    """
+    negative_comments = [c for c in analyzed_comments if c['sentiment'] == 'negative']
+    positive_comments = [c for c in analyzed_comments if c['sentiment'] == 'positive']
+    neutral_comments = [c for c in analyzed_comments if c['sentiment'] == 'neutral']
+    
+    if negative_comments:
+        negative_comments = topic_classifier.classify_topics(negative_comments)
+    
+    sentiment_stats = build_sentiment_stats(len(positive_comments), len(negative_comments), len(neutral_comments))
+    
+    # Get topic distribution for negative comments
+    topic_stats = {}
+    for comment in negative_comments:
+        topic = comment.get('topic', 'Other')
+        topic_stats[topic] = topic_stats.get(topic, 0) + 1
+    
+    return positive_comments, negative_comments, neutral_comments, sentiment_stats, topic_stats
+
+def persist_comments(analyzed_comments, platform, profile=None):
+    """Bulk-insert analyzed comments into the persistent store (never fails the request)"""
+    try:
+        with tracing.span('persist'):
+            comment_store.save_comments(
+                analyzed_comments,
+                platform,
+                profile=profile,
+                model_version=sentiment_analyzer.get_model_version()
+            )
+    except Exception as e:
+        logger.error(f"Failed to persist analyzed comments: {str(e)}", exc_info=True)
+
+def incremental_listing_from(from_date, profile_watermark, watermarks):
+    """
+    Start date of an incremental run's post listing: the profile watermark (newest post seen by
+    earlier runs) minus INCREMENTAL_LOOKBACK_DAYS, or the user's from_date if that is later
+    
+    Args:
+        from_date (str): Requested start date 'YYYY-MM-DD' (or None)
+        profile_watermark (dict): Profile watermark row, or None
+        watermarks (dict): Per-post watermarks of the profile
+    
+    Returns:
+        str: Listing start date 'YYYY-MM-DD' (or from_date unchanged)
+    """
+    if (INCREMENTAL_LOOKBACK_DAYS < 0 or profile_watermark is None
+            or profile_watermark['latest_post_ts'] is None
+            # Posts recorded without their timestamp cannot be placed before or after the bound
+            or any(watermark['post_ts'] is None for watermark in watermarks.values())):
+        return from_date
+    bound = profile_watermark['latest_post_ts'] - INCREMENTAL_LOOKBACK_DAYS * 86400
+    since = to_epoch(from_date) if from_date else None
+    if since is not None and since >= bound:
+        return from_date
+    return datetime.fromtimestamp(bound, tz=timezone.utc).strftime('%Y-%m-%d')
+
+def settled_posts(watermarks, listed_urls, from_date, listing_from, limit):
+    """
+    Posts older than the listing bound that earlier runs stored, as unchanged post entries
+    
+    Args:
+        watermarks (dict): Per-post watermarks of the profile
+        listed_urls (set): Post URLs returned by this run's listing
+        from_date (str): Requested start date (or None)
+        listing_from (str): Listing start date
+        limit (int): Maximum number of posts
+    
+    Returns:
+        list: Newest first, in the shape of the scrapers' unchanged posts
+    """
+    since = to_epoch(from_date) if from_date else None
+    until = to_epoch(listing_from)
+    candidates = [
+        (post_url, watermark) for post_url, watermark in watermarks.items()
+        if post_url not in listed_urls and watermark['post_ts'] < until
+        and (since is None or watermark['post_ts'] >= since)
+    ]
+    candidates.sort(key=lambda item: item[1]['post_ts'], reverse=True)
+    return [
+        {
+            'post_url': post_url,
+            'post_date': datetime.fromtimestamp(watermark['post_ts'], tz=timezone.utc).strftime('%Y-%m-%d'),
+            'post_timestamp': watermark['post_ts'],
+            'reported_comments_count': watermark['reported_comment_count'],
+            'comments_count': 0,
+            'comments': [],
+            'unchanged': True
+        }
+        for post_url, watermark in candidates[:max(0, limit)]
+    ]
+
+def update_watermarks(platform, profile, posts):
+    """Advance the per-post/per-profile watermarks after a run (never fails the request)"""
+    try:
+        comment_store.update_watermarks(platform, profile, posts)
+    except Exception as e:
+        logger.error(f"Failed to update watermarks for {profile}: {str(e)}", exc_info=True)
+
+def stored_comment_lists(result_id):
+    """
+    Rebuild the legacy full comment lists of a stored result
+    
+    Returns:
+        dict: 'negative_comments_details' and 'all_comments' by sentiment, or None if the result is gone
+    """
+    comments = result_store.iter_comments(result_id)
+    if comments is None:
+        return None
+    all_comments = {'positive': [], 'negative': [], 'neutral': []}
+    for comment in comments:
+        all_comments.setdefault(comment.get('sentiment', 'neutral'), []).append(comment)
+    return {'negative_comments_details': all_comments['negative'], 'all_comments': all_comments}
+
+def analysis_response(outcome, include_comments):
+    """
+    Turn a (possibly shared) analysis outcome into a Flask response
+    
+    Args:
+        outcome (tuple): (status_code, body, comment_lists) - cached outcomes carry no comment
+            lists, they are read back from the result store
+        include_comments (bool): Embed the full comment lists (legacy clients); not available
+            for streaming results
+    """
+    status_code, body, comment_lists = outcome
+    
+    if include_comments and comment_lists is None and status_code == 200 and not body['data'].get('streaming'):
+        comment_lists = stored_comment_lists(body['data']['result_id'])
+    
+    if include_comments and comment_lists is not None:
+        # Outcomes are shared between coalesced requests - never mutate them
+        body = {**body, 'data': {**body['data']}}
+        if comment_lists.get('negative_comments_details') is not None:
+            body['data']['negative_comments_details'] = comment_lists['negative_comments_details']
+        body['data']['all_comments'] = comment_lists['all_comments']
+    
+    return jsonify(body), status_code
+
+def is_truthy(value):
+    """Interpret JSON booleans and query-string flags ("1", "true", "yes")"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def request_payload():
+    """Get the request parameters - JSON body for POST, query string for GET"""
+    if request.method == 'GET':
+        return request.args.to_dict()
+    return request.get_json()
+
+def client_id():
+    """
+    Identify the caller for fair queuing by address. Request headers are not trusted: behind
+    TRUSTED_PROXY_HOPS proxies ProxyFix sets remote_addr from the hop the nearest proxy added,
+    so a client cannot rotate X-Forwarded-For (or make up ids) to escape its queue share.
+    """
+    return request.remote_addr or 'unknown'
+
+def admitted(endpoint, compute, client):
+    """
+    Wrap a compute function so it runs under the endpoint's admission limit - only cache
+    misses queue, hits are served without waiting
+
+    Raises (when called):
+        AdmissionRejected: The endpoint's queue is full or the wait timed out
+    """
+    controller = admission_controllers.get(endpoint)
+    if controller is None:
+        return compute
+    
+    def run():
+        with controller.admit(client):
+            return compute()
+    return run
+
+def busy_response(rejected):
+    """429 with Retry-After for a shed request"""
+    response = jsonify({
+        'error': f'Server is busy ({rejected.reason}), retry in {rejected.retry_after}s',
+        'success': False,
+        'retry_after': rejected.retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(rejected.retry_after)
+    return response
+
+def number_param(data, name, default, cast=int, minimum=None, maximum=None, inclusive=True):
+    """
+    Read a numeric field of the request body or query string
+
+    Args:
+        data (dict): Request parameters
+        name (str): Field name
+        default: Value when the field is missing or empty
+        cast (type): int or float - int fields reject fractional values
+        minimum (float): Optional lower bound
+        maximum (float): Optional upper bound
+        inclusive (bool): Whether the bounds themselves are allowed
+
+    Returns:
+        int or float: The parsed value
+
+    Raises:
+        ValueError: Not a number of the right kind, or out of range (the message is client-facing)
+    """
+    value = data.get(name)
+    if value is None or value == '':
+        return default
+    kind = 'an integer' if cast is int else 'a number'
+    try:
+        # bool is an int, but "true" is not a count
+        number = float(value) if not isinstance(value, bool) else math.nan
+    except (TypeError, ValueError):
+        number = math.nan
+    if not math.isfinite(number) or (cast is int and not number.is_integer()):
+        raise ValueError(f'{name} must be {kind}')
+    
+    below = minimum is not None and (number < minimum if inclusive else number <= minimum)
+    above = maximum is not None and (number > maximum if inclusive else number >= maximum)
+    if below or above:
+        if minimum is not None and maximum is not None:
+            bounds = f"between {minimum:g} and {maximum:g}" + ('' if inclusive else ' (exclusive)')
+        elif minimum is not None:
+            bounds = f"at least {minimum:g}" if inclusive else f"greater than {minimum:g}"
+        else:
+            bounds = f"at most {maximum:g}" if inclusive else f"less than {maximum:g}"
+        raise ValueError(f'{name} must be {bounds}')
+    return cast(number)
+
+def request_deadline(data):
+    """
+    Deadline from the request's timeout_seconds (default ANALYSIS_TIMEOUT_SECONDS)
+
+    Returns:
+        Deadline: None when unlimited
+
+    Raises:
+        ValueError: timeout_seconds is not a positive number
+    """
+    seconds = number_param(data, 'timeout_seconds', None, float, minimum=0, inclusive=False)
+    if seconds is None:
+        return Deadline(ANALYSIS_TIMEOUT_SECONDS) if ANALYSIS_TIMEOUT_SECONDS > 0 else None
+    return Deadline(seconds)
+
+def scraping_deadline(deadline):
+    """The part of a request deadline available for scraping - the rest is kept for the analysis"""
+    return deadline.until(1 - DEADLINE_ANALYSIS_SHARE) if deadline is not None else None
+
+def bounded_by_deadline(compute, deadline):
+    """
+    Wrap a compute function so running out of time before any comments could be scraped
+    gives a 504 outcome (never cached) instead of an error
+    """
+    if deadline is None:
+        return compute
+    
+    def run():
+        try:
+            return compute()
+        except DeadlineExceeded as e:
+            logger.warning(f"Analysis stopped by its deadline ({deadline.seconds:g}s): {str(e)}")
+            return 504, {
+                'error': f'Nothing could be scraped within timeout_seconds={deadline.seconds:g}: {str(e)}',
+                'success': False,
+                'partial': True,
+                'completeness': 0.0
+            }, None
+    return run
+
+def completeness_fields(posts):
+    """
+    Response fields telling how much of a deadline-bounded scrape made it into the aggregates
+    
+    Returns:
+        dict: 'partial', 'completeness' (share of the posts scraped) and 'skipped_posts'
+    """
+    skipped = [{'post_url': p['post_url'], 'reason': p['skip_reason']} for p in posts if p.get('skipped')]
+    return {
+        'partial': bool(skipped),
+        'completeness': round((len(posts) - len(skipped)) / len(posts), 4) if posts else 1.0,
+        'skipped_posts': skipped
+    }
+
+def cached_analysis(key_parts, compute, data):
+    """
+    Serve an analysis through the response cache with ETag revalidation
+
+    Args:
+        key_parts (tuple): Endpoint, normalized URL and parameters identifying the analysis
+        compute (callable): Zero-argument run_* function producing the outcome
+        data (dict): Request parameters (include_comments, refresh)
+    """
+    include_comments = is_truthy(data.get('include_comments'))
+    force_refresh = is_truthy(data.get('refresh')) or 'no-cache' in request.headers.get('Cache-Control', '')
+    
+    try:
+        entry, cache_status = response_cache.get_or_compute(
+            response_cache.make_key(key_parts),
+            admitted(key_parts[0], compute, client_id()),
+            force_refresh=force_refresh
+        )
+    except AdmissionRejected as e:
+        return busy_response(e)
+    outcome = entry['outcome']
+    
+    if outcome[0] != 200:
+        return analysis_response(outcome, include_comments)
+    
+    # Weak: the same analysis is served identity, gzip or brotli encoded
+    etag = entry['etag'] + ('-full' if include_comments else '')
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(analysis_response(outcome, include_comments))
+    
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Cache'] = cache_status
+    return response
+
+def detect_platform(url):
+    """Detect the platform of a post URL ('instagram', 'facebook' or None)"""
+    if 'instagram.com' in url:
+        return 'instagram'
+    if 'facebook.com' in url:
+        return 'facebook'
+    return None
+
+def build_sampled_sentiment_stats(estimate):
+    """Build the sentiment_stats block from a sampling estimate (counts are scaled to all comments)"""
+    intervals = estimate['intervals']
+    stats = {}
+    for sentiment, interval in intervals.items():
+        stats[sentiment] = round(interval['proportion'] * estimate['population'])
+    for sentiment, interval in intervals.items():
+        stats[f'{sentiment}_percentage'] = round(interval['proportion'] * 100, 2)
+    stats['confidence_intervals'] = {
+        sentiment: {
+            'lower': round(interval['lower'] * 100, 2),
+            'upper': round(interval['upper'] * 100, 2)
+        }
+        for sentiment, interval in intervals.items()
+    }
+    return stats
+
+def run_post_analysis(post_url, platform, max_comments=1000, sampling=None):
+    """
+    Scrape and analyze a single Instagram or Facebook post
+    
+    Args:
+        post_url (str): Post URL
+        platform (str): 'instagram' or 'facebook'
+        max_comments (int): Maximum number of comments to scrape
+        sampling (dict): Optional sampling mode parameters for SentimentAnalyzer.analyze_sample
+            (tolerance, confidence, strata_by) - only a stratified sample is scored
+    
+    Returns:
+        tuple: (status_code, body, comment_lists)
+    """
+    logger.info(f"Starting {platform} analysis for URL: {post_url}")
+    
+    # Step 1: Scrape comments based on platform
+    logger.info("Step 1: Scraping comments...")
+    
+    if platform == 'instagram':
+        comments_data = instagram_scraper.scrape_comments(post_url, max_comments)
+    else:  # facebook
+        try:
+            comments_data = facebook_scraper.scrape_single_post(post_url, max_comments)
+        except Exception as fb_error:
+            error_msg = str(fb_error)
+            logger.error(f"Facebook scraping failed: {error_msg}")
+            
+            # Check if it's a privacy/access issue
+            if 'not_available' in error_msg.lower() or 'cannot access' in error_msg.lower():
+                return 403, {
+                    'error': 'Cannot access this Facebook post',
+                    'success': False,
+                    'details': {
+                        'url': post_url,
+                        'reason': 'The post is private, restricted, or deleted',
+                        'explanation': error_msg,
+                        'solutions': [
+                            '⚠️ Facebook requires authentication to access most posts',
+                            '✓ Try a PUBLIC post from a public page (e.g., NASA, Tesla, news outlets)',
+                            '✓ Ensure the post is not deleted or restricted',
+                            '✓ For groups: The group must be PUBLIC',
+                            '⚠️ Note: Personal profiles and private groups cannot be scraped without login'
+                        ]
+                    }
+                }, None
+            else:
+                # Other scraping errors
+                raise fb_error
+    
+    if not comments_data or len(comments_data) == 0:
+        logger.warning(f"No comments found for URL: {post_url}")
+        return 404, {
+            'error': 'No comments found',
+            'success': False,
+            'details': {
+                'url': post_url,
+                'comments_found': 0,
+                'platform': platform,
+                'suggestions': [
+                    'The post may have zero comments',
+                    'Verify the post URL is correct',
+                    'For Facebook: Use public pages/groups only (e.g., NASA, BBC News)',
+                    'For Instagram: Ensure the post is public',
+                    'Check your Apify API credits at https://console.apify.com'
+                ]
+            }
+        }, None
+    
+    logger.info(f"Scraped {len(comments_data)} comments")
+    
+    for comment in comments_data:
+        comment['post_url'] = post_url
+    
+    # Step 2: Perform sentiment analysis on all comments (or a stratified sample)
+    logger.info("Step 2: Performing sentiment analysis...")
+    estimate = None
+    if sampling:
+        analyzed_comments, estimate = sentiment_analyzer.analyze_sample(comments_data, clusterer=near_duplicate_clusterer,
+                                                                         **sampling)
+    else:
+        analyzed_comments = sentiment_analyzer.analyze_batch(comments_data, clusterer=near_duplicate_clusterer)
+    
+    # Step 3: Classify topics for negative comments
+    logger.info("Step 3: Classifying topics for negative comments...")
+    positive_comments, negative_comments, neutral_comments, sentiment_stats, topic_stats = analyze_comments(analyzed_comments)
+    persist_comments(analyzed_comments, platform)
+    
+    logger.info("Analysis completed successfully")
+    
+    response_data = {
+        'post_url': post_url,
+        'platform': platform,
+        'total_comments': len(comments_data),
+        'sentiment_stats': sentiment_stats,
+        'topic_stats': topic_stats,
+        'duplicate_stats': build_duplicate_stats(analyzed_comments)
+    }
+    
+    if estimate is not None:
+        # topic_stats, duplicate_stats and the stored comments cover the sample only
+        response_data['sentiment_stats'] = build_sampled_sentiment_stats(estimate)
+        response_data['sampling'] = {
+            **sampling,
+            'sample_size': estimate['sample_size'],
+            'population': estimate['population'],
+            'stopped_early': estimate['stopped_early']
+        }
+    
+    # Keep the comments server-side; the response only carries aggregates
+    result_id = result_store.save(analyzed_comments, summary=response_data)
+    response_data['result_id'] = result_id
+    response_data['comments_url'] = comments_url_for(result_id)
+    
+    return 200, {'success': True, 'data': response_data}, {
+        'all_comments': {
+            'positive': positive_comments,
+            'negative': negative_comments,
+            'neutral': neutral_comments
+        }
+    }
+
+def run_bulk_analysis(bulk_data, response_head, platform, profile):
+    """
+    Analyze the comments of bulk-scraped posts (Instagram profile or Facebook page/group)
+    
+    Args:
+        bulk_data (dict): Output of a scraper's scrape_posts_comments_bulk
+        response_head (dict): Leading response fields (profile/url, from_date)
+        platform (str): 'instagram' or 'facebook'
+        profile (str): Normalized profile/page URL the posts belong to
+    
+    Returns:
+        tuple: (status_code, body, comment_lists)
+    """
+    logger.info(f"Scraped {bulk_data['total_posts']} posts with {bulk_data['total_comments']} total comments")
+    
+    # Step 2: Analyze all comments from all posts
+    logger.info("Step 2: Analyzing all comments...")
+    all_comments = []
+    for post in bulk_data['posts']:
+        for comment in post['comments']:
+            comment['post_url'] = post['post_url']
+        all_comments.extend(post['comments'])
+    completeness = completeness_fields(bulk_data['posts'])
+    scraped_posts = [post for post in bulk_data['posts'] if not post.get('skipped')]
+    
+    if not all_comments:
+        if completeness['partial']:
+            raise DeadlineExceeded(f"{len(completeness['skipped_posts'])} posts skipped, no comments scraped")
+        return 404, {
+            'error': 'No comments found in the posts',
+            'success': False
+        }, None
+    
+    # Perform sentiment analysis on all comments (once per near-duplicate cluster)
+    analyzed_comments = sentiment_analyzer.analyze_batch(all_comments, clusterer=near_duplicate_clusterer)
+    
+    # Step 3: Classify topics for negative comments
+    logger.info("Step 3: Classifying topics for negative comments...")
+    positive_comments, negative_comments, neutral_comments, sentiment_stats, topic_stats = analyze_comments(analyzed_comments)
+    persist_comments(analyzed_comments, platform, profile)
+    # Skipped posts keep their old watermarks, so the next run scrapes them again
+    update_watermarks(platform, profile, scraped_posts)
+    
+    # Organize comments by post
+    posts_analysis = build_posts_analysis(scraped_posts, analyzed_comments)
+    
+    response_data = {
+        **response_head,
+        'total_posts': bulk_data['total_posts'],
+        'total_comments': len(analyzed_comments),
+        'sentiment_stats': sentiment_stats,
+        'topic_stats': topic_stats,
+        'duplicate_stats': build_duplicate_stats(analyzed_comments),
+        'posts_analysis': posts_analysis,
+        **completeness
+    }
+    
+    # Keep the comments server-side; the response only carries aggregates
+    result_id = result_store.save(analyzed_comments, summary=response_data)
+    response_data['result_id'] = result_id
+    response_data['comments_url'] = comments_url_for(result_id)
+    
+    return 200, {'success': True, 'data': response_data}, {
+        'negative_comments_details': negative_comments,
+        'all_comments': {
+            'positive': positive_comments,
+            'negative': negative_comments,
+            'neutral': neutral_comments
+        }
+    }
+
+def run_profile_analysis(profile_url, from_date, max_posts, deadline=None):
+    """
+    Scrape and analyze an Instagram profile
+    
+    Args:
+        deadline (Deadline): Optional request deadline - posts that cannot be scraped in time are skipped
+    
+    Returns:
+        tuple: (status_code, body, comment_lists)
+    """
+    logger.info(f"Starting bulk analysis for profile: {profile_url} from date: {from_date}")
+    logger.info(f"Max posts: {max_posts}")
+    
+    # Step 1: Scrape all posts and their comments
+    logger.info("Step 1: Scraping posts and comments...")
+    try:
+        bulk_data = instagram_scraper.scrape_posts_comments_bulk(
+            profile_url,
+            from_date,
+            max_posts,
+            deadline=scraping_deadline(deadline)
+        )
+    except DeadlineExceeded:
+        raise
+    except Exception as scrape_error:
+        logger.error(f"Scraping failed: {str(scrape_error)}", exc_info=True)
+        return 500, {
+            'error': f'Failed to scrape profile: {str(scrape_error)}',
+            'success': False,
+            'details': {
+                'profile_url': profile_url,
+                'from_date': from_date,
+                'suggestions': [
+                    'Check if the profile URL is correct',
+                    'Verify the profile is public',
+                    'Check your Apify API key and credits',
+                    'Try a different profile URL'
+                ]
+            }
+        }, None
+    
+    if bulk_data['total_posts'] == 0:
+        logger.warning(f"No posts found for {profile_url} from {from_date}")
+        return 404, {
+            'error': 'No posts found or unable to scrape',
+            'success': False,
+            'details': {
+                'profile_url': profile_url,
+                'from_date': from_date,
+                'posts_found': 0,
+                'suggestions': [
+                    'Check if the profile URL is correct (should end with /)',
+                    'Verify the profile is public and has posts',
+                    'Try a different or earlier date',
+                    'Check your Apify API credits at https://console.apify.com'
+                ]
+            }
+        }, None
+    
+    outcome = run_bulk_analysis(bulk_data, {
+        'profile_url': profile_url,
+        'from_date': from_date
+    }, 'instagram', normalize_url(profile_url))
+    logger.info("Bulk analysis completed successfully")
+    return outcome
+
+def run_facebook_analysis(facebook_url, from_date, max_posts, deadline=None):
+    """
+    Scrape and analyze a Facebook group, page or profile
+    
+    Args:
+        deadline (Deadline): Optional request deadline for the scraper run
+    
+    Returns:
+        tuple: (status_code, body, comment_lists)
+    """
+    logger.info(f"Starting Facebook analysis: {facebook_url} from date: {from_date}")
+    
+    # Step 1: Scrape all posts and their comments from Facebook
+    logger.info("Step 1: Scraping Facebook posts and comments...")
+    bulk_data = facebook_scraper.scrape_posts_comments_bulk(
+        facebook_url,
+        from_date,
+        max_posts,
+        deadline=scraping_deadline(deadline)
+    )
+    
+    if bulk_data['total_posts'] == 0:
+        return 404, {
+            'error': 'No posts found or unable to scrape Facebook URL',
+            'success': False
+        }, None
+    
+    outcome = run_bulk_analysis(bulk_data, {
+        'type': 'profile',
+        'url': facebook_url,
+        'from_date': from_date
+    }, 'facebook', normalize_url(facebook_url))
+    logger.info("Facebook analysis completed successfully")
+    return outcome
+
+def ingest_incremental(platform, source_url, from_date, max_posts, deadline=None):
+    """
+    Scrape what changed since the last run, score it and merge it into the comment store,
+    advancing the watermarks - the part of an incremental analysis that must not run twice
+    at once for one profile
+    
+    Returns:
+        dict: 'params' (from_date, max_posts), 'posts' (this run's posts, listed and settled),
+              'new_comments', 'new_posts', 'unchanged_posts', 'scraped_posts', 'listed_from'
+              and the completeness fields
+    """
+    profile = normalize_url(source_url)
+    watermarks = comment_store.get_post_watermarks(platform, profile)
+    listing_from = incremental_listing_from(from_date, comment_store.get_profile_watermark(platform, profile), watermarks)
+    logger.info(f"Starting incremental {platform} analysis for {profile} ({len(watermarks)} posts with watermarks, "
+                f"listing posts from {listing_from or 'all time'})")
+    
+    # Step 1: Scrape posts newer than the listing bound - Instagram skips posts whose comment count has not grown
+    if platform == 'instagram':
+        bulk_data = instagram_scraper.scrape_posts_comments_bulk(source_url, listing_from, max_posts, watermarks=watermarks,
+                                                                 deadline=scraping_deadline(deadline))
+    else:
+        bulk_data = facebook_scraper.scrape_posts_comments_bulk(source_url, listing_from, max_posts,
+                                                                deadline=scraping_deadline(deadline))
+    
+    # Older posts within from_date keep the comments stored by earlier runs
+    if listing_from != from_date and 'error' not in bulk_data:
+        listed_urls = {post['post_url'] for post in bulk_data['posts']}
+        older_posts = settled_posts(watermarks, listed_urls, from_date, listing_from, max_posts - len(bulk_data['posts']))
+        bulk_data['posts'] = bulk_data['posts'] + older_posts
+    
+    # Step 2: Keep only comments newer than each post's watermark
+    new_comments = []
+    new_posts = 0
+    unchanged_posts = 0
+    scraped_posts = [post for post in bulk_data['posts'] if not post.get('skipped')]
+    for post in bulk_data['posts']:
+        post_url = post['post_url']
+        watermark = watermarks.get(post_url)
+        if watermark is None:
+            new_posts += 1
+        if post.get('unchanged'):
+            unchanged_posts += 1
+            continue
+        
+        known_ids = comment_store.known_comment_ids(platform, post_url) if watermark else set()
+        latest_ts = watermark['latest_comment_ts'] if watermark else None
+        for comment in post['comments']:
+            if stable_comment_id(comment, post_url) in known_ids:
+                continue
+            comment_ts = to_epoch(comment.get('timestamp'))
+            if latest_ts is not None and comment_ts is not None and comment_ts < latest_ts:
+                continue
+            comment['post_url'] = post_url
+            new_comments.append(comment)
+    
+    logger.info(f"Delta: {len(new_comments)} new comments, {new_posts} new posts, {unchanged_posts} unchanged posts")
+    
+    # Step 3: Analyze only the delta and merge it into the store
+    if new_comments:
+        analyzed_delta = sentiment_analyzer.analyze_batch(new_comments, clusterer=near_duplicate_clusterer)
+        negative_delta = [c for c in analyzed_delta if c['sentiment'] == 'negative']
+        if negative_delta:
+            topic_classifier.classify_topics(negative_delta)
+        persist_comments(analyzed_delta, platform, profile)
+    update_watermarks(platform, profile, scraped_posts)
+    
+    return {
+        'params': (from_date, max_posts),
+        # Only the post fields the aggregation reads - the comments are in the store now
+        'posts': [{'post_url': post['post_url'], 'post_date': post.get('post_date')} for post in bulk_data['posts']],
+        'new_comments': len(new_comments),
+        'new_posts': new_posts,
+        'unchanged_posts': unchanged_posts,
+        'scraped_posts': len(scraped_posts) - unchanged_posts,
+        'listed_from': listing_from,
+        **completeness_fields(bulk_data['posts'])
+    }
+
+def run_incremental_analysis(platform, source_url, from_date, max_posts, response_head, deadline=None,
+                             persist_result=True):
+    """
+    Incremental profile/page analysis: only new posts and new comments are scraped and scored,
+    then merged with the comments stored by previous runs
+    
+    Args:
+        platform (str): 'instagram' or 'facebook'
+        source_url (str): Profile/page URL as submitted
+        from_date (str): Start date in format 'YYYY-MM-DD'
+        max_posts (int): Maximum number of posts
+        response_head (dict): Leading response fields (profile/url, from_date)
+        deadline (Deadline): Optional request deadline - skipped posts keep their stored comments
+        persist_result (bool): Store the merged comments in the ResultStore and return a
+            result_id - scheduled runs only update the comment store and skip this
+    
+    Returns:
+        tuple: (status_code, body, comment_lists)
+    """
+    # Requests and scheduled runs for one profile share one ingest, so only one of them reads
+    # and advances the watermarks at a time
+    flight_key = ('incremental', platform, normalize_url(source_url))
+    while True:
+        delta = single_flight.do(flight_key, lambda: ingest_incremental(platform, source_url, from_date, max_posts, deadline))
+        if delta['params'] == (from_date, max_posts):
+            break
+        # Joined a run listing other posts - the store is up to date with it now, so running
+        # again only scrapes what that run did not cover
+    
+    if not delta['posts']:
+        return 404, {
+            'error': 'No posts found or unable to scrape',
+            'success': False,
+            'details': {'url': source_url, 'from_date': from_date, 'posts_found': 0}
+        }, None
+    
+    # Step 4: Aggregate the merged comments of this run's posts from the store
+    post_urls = [post['post_url'] for post in delta['posts']]
+    aggregates = comment_store.aggregate(platform=platform, post_urls=post_urls)
+    if aggregates['total_comments'] == 0:
+        if delta['partial']:
+            raise DeadlineExceeded(f"{len(delta['skipped_posts'])} posts skipped, no comments scraped")
+        return 404, {
+            'error': 'No comments found in the posts',
+            'success': False
+        }, None
+    
+    counts = aggregates['sentiment_counts']
+    response_data = {
+        **response_head,
+        'total_posts': len(delta['posts']),
+        'total_comments': aggregates['total_comments'],
+        'sentiment_stats': build_sentiment_stats(counts['positive'], counts['negative'], counts['neutral']),
+        'topic_stats': aggregates['topic_stats'],
+        'incremental': {
+            'new_comments': delta['new_comments'],
+            'new_posts': delta['new_posts'],
+            'unchanged_posts': delta['unchanged_posts'],
+            'scraped_posts': delta['scraped_posts'],
+            'listed_from': delta['listed_from']
+        },
+        'partial': delta['partial'],
+        'completeness': delta['completeness'],
+        'skipped_posts': delta['skipped_posts']
+    }
+    if not persist_result:
+        logger.info("Incremental analysis completed (comment store only)")
+        return 200, {'success': True, 'data': response_data}, None
+    
+    stored_comments = comment_store.load_comments(platform, post_urls)
+    response_data['posts_analysis'] = build_posts_analysis(delta['posts'], stored_comments)
+    result_id = result_store.save(stored_comments, summary=response_data)
+    response_data['result_id'] = result_id
+    response_data['comments_url'] = comments_url_for(result_id)
+    
+    negative_comments = [c for c in stored_comments if c['sentiment'] == 'negative']
+    logger.info("Incremental analysis completed successfully")
+    
+    return 200, {'success': True, 'data': response_data}, {
+        'negative_comments_details': negative_comments,
+        'all_comments': {
+            'positive': [c for c in stored_comments if c['sentiment'] == 'positive'],
+            'negative': negative_comments,
+            'neutral': [c for c in stored_comments if c['sentiment'] == 'neutral']
+        }
+    }
+
+def scrape_post_comments(post_url, platform, max_comments):
+    """Scrape one post's comments, tagged with their post URL"""
+    if platform == 'instagram':
+        comments = instagram_scraper.scrape_comments(post_url, max_comments)
+    else:
+        comments = facebook_scraper.scrape_single_post(post_url, max_comments)
+    for comment in comments:
+        comment['post_url'] = post_url
+    return comments
+
+def run_batch_analysis(urls, max_comments):
+    """
+    Analyze many post URLs as one report: posts are scraped concurrently (bounded by
+    BATCH_SCRAPE_CONCURRENCY) and all comments are scored together, so the model sees
+    full inference batches instead of one small pass per URL
+    
+    Args:
+        urls (list): (post_url, platform) pairs
+        max_comments (int): Maximum comments scraped per post
+    
+    Returns:
+        tuple: (status_code, body, comment_lists)
+    """
+    logger.info(f"Starting batch analysis of {len(urls)} URLs")
+    
+    # Step 1: Scrape all posts with bounded parallelism
+    def scrape(url_platform):
+        post_url, platform = url_platform
+        try:
+            return scrape_post_comments(post_url, platform, max_comments), None
+        except Exception as e:
+            logger.error(f"Batch scrape failed for {post_url}: {str(e)}")
+            return [], str(e)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_SCRAPE_CONCURRENCY, len(urls)))) as executor:
+        scraped = list(executor.map(tracing.propagate(scrape), urls))
+    
+    # Step 2: Pool every comment into one analysis pass
+    all_comments = [comment for comments, _ in scraped for comment in comments]
+    if not all_comments:
+        return 404, {
+            'error': 'No comments found for any of the URLs',
+            'success': False,
+            'details': {
+                'urls': [
+                    {'url': post_url, 'platform': platform, 'error': error}
+                    for (post_url, platform), (_, error) in zip(urls, scraped)
+                ]
+            }
+        }, None
+    
+    logger.info(f"Scraped {len(all_comments)} comments from {len(urls)} URLs, analyzing together...")
+    analyzed_comments = sentiment_analyzer.analyze_batch(all_comments, clusterer=near_duplicate_clusterer)
+    positive_comments, negative_comments, neutral_comments, sentiment_stats, topic_stats = analyze_comments(analyzed_comments)
+    
+    # Step 3: Per-URL results
+    by_post = {}
+    for comment in analyzed_comments:
+        by_post.setdefault(comment['post_url'], []).append(comment)
+    
+    url_results = []
+    posts_analysis = []
+    for (post_url, platform), (comments, error) in zip(urls, scraped):
+        post_comments = by_post.get(post_url, [])
+        if post_comments:
+            persist_comments(post_comments, platform)
+        counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        post_topics = {}
+        for comment in post_comments:
+            counts[comment['sentiment']] += 1
+            if comment['sentiment'] == 'negative':
+                topic = comment.get('topic', 'Other')
+                post_topics[topic] = post_topics.get(topic, 0) + 1
+        url_results.append({
+            'url': post_url,
+            'platform': platform,
+            'success': error is None and bool(post_comments),
+            'error': error or (None if post_comments else 'No comments found'),
+            'total_comments': len(post_comments),
+            'sentiment_stats': build_sentiment_stats(counts['positive'], counts['negative'], counts['neutral']),
+            'topic_stats': post_topics
+        })
+        posts_analysis.append({
+            'post_url': post_url,
+            'post_date': None,
+            'total_comments': len(post_comments),
+            'sentiment_breakdown': counts
+        })
+    
+    response_data = {
+        'total_urls': len(urls),
+        'successful_urls': sum(1 for r in url_results if r['success']),
+        'total_comments': len(analyzed_comments),
+        'sentiment_stats': sentiment_stats,
+        'topic_stats': topic_stats,
+        'duplicate_stats': build_duplicate_stats(analyzed_comments),
+        'results': url_results,
+        # Same per-post shape as profile analyses, so table=posts exports work for batches
+        'posts_analysis': posts_analysis
+    }
+    
+    # The summary is stored with the comments (export, results restored from the cache)
+    result_id = result_store.save(analyzed_comments, summary=response_data)
+    comments_url = comments_url_for(result_id)
+    response_data['result_id'] = result_id
+    response_data['comments_url'] = comments_url
+    for url_result in url_results:
+        url_result['comments_url'] = f"{comments_url}?post={quote(url_result['url'], safe='')}"
+    
+    logger.info("Batch analysis completed successfully")
+    return 200, {'success': True, 'data': response_data}, {
+        'negative_comments_details': negative_comments,
+        'all_comments': {
+            'positive': positive_comments,
+            'negative': negative_comments,
+            'neutral': neutral_comments
+        }
+    }
+
+def iter_source_posts(platform, source_url, from_date, max_posts, deadline=None):
+    """
+    Yield scraped posts one at a time for streaming analysis
+    
+    Returns:
+        iterator: Posts with 'post_url', 'post_date', 'post_timestamp', 'reported_comments_count' and 'comments'
+                  ('skipped' and 'skip_reason' instead for posts not scraped before the deadline)
+    """
+    if platform == 'instagram':
+        posts = instagram_scraper.scrape_profile_posts(source_url, from_date, max_posts, deadline=deadline)
+        return instagram_scraper.iter_posts_comments(posts, deadline=deadline)
+    # The Facebook actor returns posts with their comments (capped per post) in one dataset,
+    # read page by page once the run has finished
+    return facebook_scraper.iter_posts_bulk(source_url, from_date, max_posts, deadline=deadline)
+
+def run_streaming_analysis(platform, source_url, from_date, max_posts, response_head, deadline=None):
+    """
+    Memory-bounded profile/page analysis: each post's comments are scored in chunks,
+    folded into running counters and written to a disk-backed result and the comment store,
+    so the full comment set is never held in memory. Full comment lists (include_comments)
+    are not available in this mode - use comments_url.
+    
+    Args:
+        platform (str): 'instagram' or 'facebook'
+        source_url (str): Profile/page URL as submitted
+        from_date (str): Start date in format 'YYYY-MM-DD'
+        max_posts (int): Maximum number of posts
+        response_head (dict): Leading response fields (profile/url, from_date)
+        deadline (Deadline): Optional request deadline - posts that cannot be scraped in time are skipped
+    
+    Returns:
+        tuple: (status_code, body, comment_lists)
+    """
+    profile = normalize_url(source_url)
+    logger.info(f"Starting streaming {platform} analysis for {profile} (max {max_posts} posts)")
+    
+    spill = result_store.create_spill()
+    aggregator = StreamingAggregator(
+        sentiment_analyzer,
+        topic_classifier,
+        sinks=[spill.add, lambda chunk: persist_comments(chunk, platform, profile)],
+        chunk_size=STREAMING_CHUNK_SIZE,
+        clusterer=near_duplicate_clusterer
+    )
+    
+    posts_meta = []
+    try:
+        for post in iter_source_posts(platform, source_url, from_date, max_posts, scraping_deadline(deadline)):
+            comments = post.pop('comments', None) or []
+            posts_meta.append(post)
+            if post.get('skipped'):
+                continue
+            aggregator.add_post(post['post_url'], post['post_date'], comments)
+            del comments
+    except Exception:
+        spill.remove()
+        raise
+    completeness = completeness_fields(posts_meta)
+    
+    if aggregator.total_posts == 0 or aggregator.total_comments == 0:
+        spill.remove()
+        if completeness['partial']:
+            raise DeadlineExceeded(f"{len(completeness['skipped_posts'])} posts skipped, no comments scraped")
+        return 404, {
+            'error': 'No posts found or unable to scrape' if aggregator.total_posts == 0 else 'No comments found in the posts',
+            'success': False,
+            'details': {'url': source_url, 'from_date': from_date, 'posts_found': aggregator.total_posts}
+        }, None
+    
+    update_watermarks(platform, profile, [post for post in posts_meta if not post.get('skipped')])
+    
+    counts = aggregator.sentiment_counts
+    response_data = {
+        **response_head,
+        'total_posts': len(posts_meta),
+        'total_comments': aggregator.total_comments,
+        'sentiment_stats': build_sentiment_stats(counts['positive'], counts['negative'], counts['neutral']),
+        'topic_stats': aggregator.topic_stats,
+        'posts_analysis': aggregator.posts_analysis,
+        'duplicate_stats': aggregator.duplicate_stats(),
+        'streaming': True,
+        **completeness
+    }
+    
+    result_id = result_store.save_spill(spill, summary=response_data)
+    response_data['result_id'] = result_id
+    response_data['comments_url'] = comments_url_for(result_id)
+    
+    logger.info(f"Streaming analysis completed: {aggregator.total_comments} comments from {aggregator.total_posts} posts")
+    return 200, {'success': True, 'data': response_data}, None
+
+def profile_analysis_plan(platform, source_url, from_date, max_posts, incremental=False, streaming=False,
+                          deadline=None):
+    """
+    Pick the pipeline for a profile/page analysis and the cache key identifying it
+    
+    Args:
+        platform (str): 'instagram' or 'facebook'
+        source_url (str): Profile/page URL as submitted
+        from_date (str): Start date in format 'YYYY-MM-DD'
+        max_posts (int): Maximum number of posts
+        incremental (bool): Only scrape/score what changed since the last run
+        streaming (bool): Memory-bounded mode (also used from STREAMING_POST_THRESHOLD posts)
+        deadline (Deadline): Optional request deadline - not part of the cache key, since
+            partial results are never cached
+    
+    Returns:
+        tuple: (cache key parts, zero-argument compute function)
+    """
+    max_posts = int(max_posts)
+    streaming = not incremental and (streaming or max_posts >= STREAMING_POST_THRESHOLD)
+    if platform == 'instagram':
+        endpoint = 'analyze-profile'
+        response_head = {'profile_url': source_url, 'from_date': from_date}
+    else:
+        endpoint = 'analyze-facebook-group'
+        response_head = {'type': 'profile', 'url': source_url, 'from_date': from_date}
+    
+    if incremental:
+        compute = lambda: run_incremental_analysis(platform, source_url, from_date, max_posts, response_head, deadline)
+    elif streaming:
+        compute = lambda: run_streaming_analysis(platform, source_url, from_date, max_posts, response_head, deadline)
+    elif platform == 'instagram':
+        compute = lambda: run_profile_analysis(source_url, from_date, max_posts, deadline)
+    else:
+        compute = lambda: run_facebook_analysis(source_url, from_date, max_posts, deadline)
+    
+    key_parts = (endpoint, normalize_url(source_url), from_date, max_posts, incremental, streaming)
+    return key_parts, bounded_by_deadline(compute, deadline)
+
+def merge_portfolio(profile_results):
+    """
+    Merge profile-level aggregates into portfolio totals - only the per-profile
+    counters are added up, the comments are never walked again
+    """
+    counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+    topic_stats = {}
+    total_posts = 0
+    for profile in profile_results:
+        if not profile['success']:
+            continue
+        total_posts += profile['total_posts']
+        for sentiment in counts:
+            counts[sentiment] += profile['sentiment_stats'][sentiment]
+        for topic, count in profile['topic_stats'].items():
+            topic_stats[topic] = topic_stats.get(topic, 0) + count
+    
+    return {
+        'total_profiles': len(profile_results),
+        'successful_profiles': sum(1 for p in profile_results if p['success']),
+        'partial': any(p.get('partial') for p in profile_results),
+        'total_posts': total_posts,
+        'total_comments': sum(counts.values()),
+        'sentiment_stats': build_sentiment_stats(counts['positive'], counts['negative'], counts['neutral']),
+        'topic_stats': topic_stats
+    }
+
+@app.route('/api/analyze', methods=['GET', 'POST'])
 def analyze_post():
     """
     Analyze Instagram or Facebook post comments
-    Expected JSON body: { "url": "post_url", "platform": "instagram" or "facebook" (optional) }
+    Expected JSON body: { "url": "post_url", "platform": "instagram" or "facebook" (optional),
+                          "max_comments": 1000 (optional),
+                          "sample": false (optional, score a stratified sample - for huge posts),
+                          "tolerance": 0.02, "confidence": 0.95, "strata": "likes" or "time"
+                              (optional, sampling mode only),
+                          "include_comments": false (optional, legacy full comment lists),
+                          "refresh": false (optional, bypass the response cache) }
+    The same parameters are accepted as a query string on GET (conditional GET via If-None-Match)
+    Comments are served page by page from /api/results/<result_id>/comments
     """
     try:
-        data = request.get_json()
+        data = request_payload()
         
         if not data or 'url' not in data:
             return jsonify({
@@ -127,126 +1519,33 @@ def analyze_post():
         post_url = data['url']
         
         # Auto-detect platform or use provided platform
-        platform = data.get('platform', '')
+        platform = data.get('platform', '') or detect_platform(post_url)
         if not platform:
-            if 'instagram.com' in post_url:
-                platform = 'instagram'
-            elif 'facebook.com' in post_url:
-                platform = 'facebook'
-            else:
-                return jsonify({
-                    'error': 'Unable to detect platform. URL must be from Instagram or Facebook',
-                    'success': False
-                }), 400
-        
-        logger.info(f"Starting {platform} analysis for URL: {post_url}")
-        
-        # Step 1: Scrape comments based on platform
-        logger.info("Step 1: Scraping comments...")
-        
-        if platform == 'instagram':
-            comments_data = instagram_scraper.scrape_comments(post_url)
-        else:  # facebook
-            try:
-                comments_data = facebook_scraper.scrape_single_post(post_url)
-            except Exception as fb_error:
-                error_msg = str(fb_error)
-                logger.error(f"Facebook scraping failed: {error_msg}")
-                
-                # Check if it's a privacy/access issue
-                if 'not_available' in error_msg.lower() or 'cannot access' in error_msg.lower():
-                    return jsonify({
-                        'error': 'Cannot access this Facebook post',
-                        'success': False,
-                        'details': {
-                            'url': post_url,
-                            'reason': 'The post is private, restricted, or deleted',
-                            'explanation': error_msg,
-                            'solutions': [
-                                '⚠️ Facebook requires authentication to access most posts',
-                                '✓ Try a PUBLIC post from a public page (e.g., NASA, Tesla, news outlets)',
-                                '✓ Ensure the post is not deleted or restricted',
-                                '✓ For groups: The group must be PUBLIC',
-                                '⚠️ Note: Personal profiles and private groups cannot be scraped without login'
-                            ]
-                        }
-                    }), 403
-                else:
-                    # Other scraping errors
-                    raise fb_error
-        
-        if not comments_data or len(comments_data) == 0:
-            logger.warning(f"No comments found for URL: {post_url}")
             return jsonify({
-                'error': 'No comments found',
-                'success': False,
-                'details': {
-                    'url': post_url,
-                    'comments_found': 0,
-                    'platform': platform,
-                    'suggestions': [
-                        'The post may have zero comments',
-                        'Verify the post URL is correct',
-                        'For Facebook: Use public pages/groups only (e.g., NASA, BBC News)',
-                        'For Instagram: Ensure the post is public',
-                        'Check your Apify API credits at https://console.apify.com'
-                    ]
-                }
-            }), 404
-        
-        logger.info(f"Scraped {len(comments_data)} comments")
-        
-        # Step 2: Perform sentiment analysis on all comments
-        logger.info("Step 2: Performing sentiment analysis...")
-        analyzed_comments = sentiment_analyzer.analyze_batch(comments_data)
-        
-        # Step 3: Classify topics for negative comments
-        logger.info("Step 3: Classifying topics for negative comments...")
-        negative_comments = [c for c in analyzed_comments if c['sentiment'] == 'negative']
-        
-        if negative_comments:
-            negative_comments = topic_classifier.classify_topics(negative_comments)
-        
-        # Prepare response
-        positive_comments = [c for c in analyzed_comments if c['sentiment'] == 'positive']
-        neutral_comments = [c for c in analyzed_comments if c['sentiment'] == 'neutral']
-        
-        # Calculate statistics
-        total_comments = len(analyzed_comments)
-        sentiment_stats = {
-            'positive': len(positive_comments),
-            'negative': len(negative_comments),
-            'neutral': len(neutral_comments),
-            'positive_percentage': round((len(positive_comments) / total_comments) * 100, 2),
-            'negative_percentage': round((len(negative_comments) / total_comments) * 100, 2),
-            'neutral_percentage': round((len(neutral_comments) / total_comments) * 100, 2)
-        }
-        
-        # Get topic distribution for negative comments
-        topic_stats = {}
-        if negative_comments:
-            for comment in negative_comments:
-                topic = comment.get('topic', 'Other')
-                topic_stats[topic] = topic_stats.get(topic, 0) + 1
-        
-        logger.info("Analysis completed successfully")
+                'error': 'Unable to detect platform. URL must be from Instagram or Facebook',
+                'success': False
+            }), 400
         
-        return jsonify({
-            'success': True,
-            'data': {
-                'post_url': post_url,
-                'platform': platform,
-                'total_comments': total_comments,
-                'sentiment_stats': sentiment_stats,
-                'topic_stats': topic_stats,
-                'all_comments': {
-                    'positive': positive_comments,
-                    'negative': negative_comments,
-                    'neutral': neutral_comments
+        try:
+            max_comments = number_param(data, 'max_comments', 1000, minimum=1)
+            sampling = None
+            if is_truthy(data.get('sample')):
+                sampling = {
+                    'tolerance': number_param(data, 'tolerance', 0.02, float, 0, 1, inclusive=False),
+                    'confidence': number_param(data, 'confidence', 0.95, float, 0, 1, inclusive=False),
+                    'strata_by': 'time' if data.get('strata') == 'time' else 'likes'
                 }
-            }
-        }), 200
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
         
+        # Cached by normalized URL + parameters; identical in-flight requests share one scrape + analysis
+        return cached_analysis(
+            ('analyze', platform, normalize_url(post_url), max_comments,
+             tuple(sorted(sampling.items())) if sampling else None),
+            lambda: run_post_analysis(post_url, platform, max_comments, sampling),
+            data
+        )
+    
     except Exception as e:
         logger.error(f"Error during analysis: {str(e)}", exc_info=True)
         return jsonify({
@@ -258,161 +1557,231 @@ def analyze_post():
             }
         }), 500
 
-@app.route('/api/analyze-profile', methods=['POST'])
-def analyze_profile():
+@app.route('/api/analyze-batch', methods=['POST'])
+def analyze_batch_urls():
     """
-    Analyze all posts from an Instagram profile from a given date onwards
-    Expected JSON body: { 
-        "profile_url": "instagram_profile_url",
-        "from_date": "YYYY-MM-DD" (optional),
-        "max_posts": 50 (optional)
+    Analyze many Instagram/Facebook post URLs as one report
+    Expected JSON body: {
+        "urls": ["post_url", ...] (mixed Instagram and Facebook, up to BATCH_MAX_URLS),
+        "max_comments": 1000 (optional, per post),
+        "include_comments": false (optional, legacy full comment lists),
+        "refresh": false (optional, bypass the response cache)
     }
+    Returns per-URL results plus a combined rollup; comments are served page by page
+    from /api/results/<result_id>/comments (filter one URL with ?post=)
     """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
+        raw_urls = data.get('urls')
         
-        if not data or 'profile_url' not in data:
+        if not isinstance(raw_urls, list) or not raw_urls:
             return jsonify({
-                'error': 'Profile URL is required',
+                'error': 'urls must be a non-empty list of post URLs',
                 'success': False
             }), 400
         
-        profile_url = data['profile_url']
-        from_date = data.get('from_date', None)
-        max_posts = data.get('max_posts', 50)
-        
-        logger.info(f"Starting bulk analysis for profile: {profile_url} from date: {from_date}")
-        logger.info(f"Max posts: {max_posts}")
-        
-        # Step 1: Scrape all posts and their comments
-        logger.info("Step 1: Scraping posts and comments...")
-        try:
-            bulk_data = instagram_scraper.scrape_posts_comments_bulk(
-                profile_url, 
-                from_date, 
-                max_posts
-            )
-        except Exception as scrape_error:
-            logger.error(f"Scraping failed: {str(scrape_error)}", exc_info=True)
-            return jsonify({
-                'error': f'Failed to scrape profile: {str(scrape_error)}',
-                'success': False,
-                'details': {
-                    'profile_url': profile_url,
-                    'from_date': from_date,
-                    'suggestions': [
-                        'Check if the profile URL is correct',
-                        'Verify the profile is public',
-                        'Check your Apify API key and credits',
-                        'Try a different profile URL'
-                    ]
-                }
-            }), 500
+        # Keep the first occurrence of every post (compared by normalized URL)
+        urls = []
+        seen = set()
+        for url in raw_urls:
+            platform = detect_platform(url) if isinstance(url, str) else None
+            if not platform:
+                return jsonify({
+                    'error': f'Unable to detect platform for {url}. URLs must be from Instagram or Facebook',
+                    'success': False
+                }), 400
+            if normalize_url(url) not in seen:
+                seen.add(normalize_url(url))
+                urls.append((url, platform))
         
-        if bulk_data['total_posts'] == 0:
-            logger.warning(f"No posts found for {profile_url} from {from_date}")
+        if len(urls) > BATCH_MAX_URLS:
             return jsonify({
-                'error': 'No posts found or unable to scrape',
-                'success': False,
-                'details': {
-                    'profile_url': profile_url,
-                    'from_date': from_date,
-                    'posts_found': 0,
-                    'suggestions': [
-                        'Check if the profile URL is correct (should end with /)',
-                        'Verify the profile is public and has posts',
-                        'Try a different or earlier date',
-                        'Check your Apify API credits at https://console.apify.com'
-                    ]
-                }
-            }), 404
+                'error': f'Too many URLs ({len(urls)}), the maximum is {BATCH_MAX_URLS}',
+                'success': False
+            }), 400
         
-        logger.info(f"Scraped {bulk_data['total_posts']} posts with {bulk_data['total_comments']} total comments")
+        try:
+            max_comments = number_param(data, 'max_comments', 1000, minimum=1)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
         
-        # Step 2: Analyze all comments from all posts
-        logger.info("Step 2: Analyzing all comments...")
-        all_comments = []
-        for post in bulk_data['posts']:
-            all_comments.extend(post['comments'])
+        # Cached by the set of normalized URLs; identical in-flight reports share one run
+        return cached_analysis(
+            ('analyze-batch', tuple(sorted(seen)), max_comments),
+            lambda: run_batch_analysis(urls, max_comments),
+            data
+        )
+    
+    except Exception as e:
+        logger.error(f"Error during batch analysis: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': str(e),
+            'success': False,
+            'details': {
+                'error_type': type(e).__name__,
+                'message': 'An error occurred during batch analysis. Check server logs for details.'
+            }
+        }), 500
+
+@app.route('/api/analyze-portfolio', methods=['POST'])
+def analyze_portfolio():
+    """
+    Analyze several Instagram profiles and Facebook pages of one client in parallel
+    Expected JSON body: {
+        "profiles": ["profile_or_page_url", ...],
+        "from_date": "YYYY-MM-DD" (optional),
+        "max_posts": 50 (optional, per profile),
+        "refresh": false (optional, bypass the response cache),
+        "timeout_seconds": 90 (optional, one deadline for the whole portfolio)
+    }
+    Profiles run concurrently (PORTFOLIO_CONCURRENCY) under the shared Apify call budget and
+    share the cache with /api/analyze-profile and /api/analyze-facebook-group.
+    Returns portfolio totals, then per-profile aggregates with their per-post breakdowns.
+    """
+    try:
+        data = request.get_json() or {}
+        profile_urls = data.get('profiles')
         
-        if not all_comments:
+        if not isinstance(profile_urls, list) or not profile_urls:
             return jsonify({
-                'error': 'No comments found in the posts',
+                'error': 'profiles must be a non-empty list of profile/page URLs',
                 'success': False
-            }), 404
-        
-        # Perform sentiment analysis on all comments
-        analyzed_comments = sentiment_analyzer.analyze_batch(all_comments)
-        
-        # Step 3: Classify topics for negative comments
-        logger.info("Step 3: Classifying topics for negative comments...")
-        negative_comments = [c for c in analyzed_comments if c['sentiment'] == 'negative']
-        positive_comments = [c for c in analyzed_comments if c['sentiment'] == 'positive']
-        neutral_comments = [c for c in analyzed_comments if c['sentiment'] == 'neutral']
-        
-        if negative_comments:
-            negative_comments = topic_classifier.classify_topics(negative_comments)
-        
-        # Calculate overall statistics
-        total_comments = len(analyzed_comments)
-        sentiment_stats = {
-            'positive': len(positive_comments),
-            'negative': len(negative_comments),
-            'neutral': len(neutral_comments),
-            'positive_percentage': round((len(positive_comments) / total_comments) * 100, 2) if total_comments > 0 else 0,
-            'negative_percentage': round((len(negative_comments) / total_comments) * 100, 2) if total_comments > 0 else 0,
-            'neutral_percentage': round((len(neutral_comments) / total_comments) * 100, 2) if total_comments > 0 else 0
-        }
+            }), 400
         
-        # Get topic distribution for negative comments
-        topic_stats = {}
-        if negative_comments:
-            for comment in negative_comments:
-                topic = comment.get('topic', 'Other')
-                topic_stats[topic] = topic_stats.get(topic, 0) + 1
+        targets = []
+        seen = set()
+        for url in profile_urls:
+            platform = detect_platform(url) if isinstance(url, str) else None
+            if not platform:
+                return jsonify({
+                    'error': f'Unable to detect platform for {url}. URLs must be from Instagram or Facebook',
+                    'success': False
+                }), 400
+            if normalize_url(url) not in seen:
+                seen.add(normalize_url(url))
+                targets.append((url, platform))
         
-        # Organize comments by post
-        posts_analysis = []
-        for post in bulk_data['posts']:
-            post_comments = post['comments']
-            post_analyzed = [c for c in analyzed_comments if c.get('id') in [pc.get('id') for pc in post_comments]]
+        from_date = data.get('from_date', None)
+        force_refresh = is_truthy(data.get('refresh'))
+        client = client_id()
+        try:
+            max_posts = number_param(data, 'max_posts', 50, minimum=1)
+            deadline = request_deadline(data)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
+        
+        def analyze(target):
+            url, platform = target
+            key_parts, compute = profile_analysis_plan(platform, url, from_date, max_posts, deadline=deadline)
+            try:
+                entry, cache_status = response_cache.get_or_compute(
+                    response_cache.make_key(key_parts), admitted(key_parts[0], compute, client),
+                    force_refresh=force_refresh
+                )
+            except AdmissionRejected as e:
+                return {'url': url, 'platform': platform, 'success': False, 'error': str(e),
+                        'retry_after': e.retry_after}
+            except Exception as e:
+                logger.error(f"Portfolio analysis failed for {url}: {str(e)}", exc_info=True)
+                return {'url': url, 'platform': platform, 'success': False, 'error': str(e)}
             
-            post_negative = [c for c in post_analyzed if c['sentiment'] == 'negative']
-            post_positive = [c for c in post_analyzed if c['sentiment'] == 'positive']
-            post_neutral = [c for c in post_analyzed if c['sentiment'] == 'neutral']
+            status_code, body, _ = entry['outcome']
+            if status_code != 200:
+                return {'url': url, 'platform': platform, 'success': False, 'error': body.get('error')}
             
-            posts_analysis.append({
-                'post_url': post['post_url'],
-                'post_date': post['post_date'],
-                'total_comments': len(post_analyzed),
-                'sentiment_breakdown': {
-                    'positive': len(post_positive),
-                    'negative': len(post_negative),
-                    'neutral': len(post_neutral)
-                }
-            })
+            profile = body['data']
+            return {
+                'url': url,
+                'platform': platform,
+                'success': True,
+                'cache': cache_status,
+                'total_posts': profile['total_posts'],
+                'total_comments': profile['total_comments'],
+                'sentiment_stats': profile['sentiment_stats'],
+                'topic_stats': profile['topic_stats'],
+                'posts_analysis': profile['posts_analysis'],
+                # Entries cached before deadlines existed have no completeness fields
+                'partial': profile.get('partial', False),
+                'completeness': profile.get('completeness', 1.0),
+                'skipped_posts': profile.get('skipped_posts', []),
+                'result_id': profile['result_id'],
+                'comments_url': profile['comments_url']
+            }
+        
+        logger.info(f"Starting portfolio analysis of {len(targets)} profiles/pages")
+        with ThreadPoolExecutor(max_workers=max(1, min(PORTFOLIO_CONCURRENCY, len(targets)))) as executor:
+            profile_results = list(executor.map(tracing.propagate(analyze), targets))
         
-        logger.info("Bulk analysis completed successfully")
+        # Shed as a whole only if no profile got through
+        if all('retry_after' in profile for profile in profile_results):
+            rejected = max(profile_results, key=lambda profile: profile['retry_after'])
+            return busy_response(AdmissionRejected('analyze-portfolio', 'all profiles were shed', rejected['retry_after']))
         
         return jsonify({
             'success': True,
             'data': {
-                'profile_url': profile_url,
+                **merge_portfolio(profile_results),
                 'from_date': from_date,
-                'total_posts': bulk_data['total_posts'],
-                'total_comments': total_comments,
-                'sentiment_stats': sentiment_stats,
-                'topic_stats': topic_stats,
-                'posts_analysis': posts_analysis,
-                'negative_comments_details': negative_comments,
-                'all_comments': {
-                    'positive': positive_comments,
-                    'negative': negative_comments,
-                    'neutral': neutral_comments
-                }
+                'profiles': profile_results
             }
         }), 200
+    
+    except Exception as e:
+        logger.error(f"Error during portfolio analysis: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': str(e),
+            'success': False,
+            'details': {
+                'error_type': type(e).__name__,
+                'message': 'An error occurred during portfolio analysis. Check server logs for details.'
+            }
+        }), 500
+
+@app.route('/api/analyze-profile', methods=['GET', 'POST'])
+def analyze_profile():
+    """
+    Analyze all posts from an Instagram profile from a given date onwards
+    Expected JSON body: {
+        "profile_url": "instagram_profile_url",
+        "from_date": "YYYY-MM-DD" (optional),
+        "max_posts": 50 (optional),
+        "include_comments": false (optional, legacy full comment lists),
+        "refresh": false (optional, bypass the response cache),
+        "incremental": false (optional, only scrape/score what changed since the last run),
+        "streaming": false (optional, memory-bounded mode; automatic from STREAMING_POST_THRESHOLD posts),
+        "timeout_seconds": 90 (optional, default ANALYSIS_TIMEOUT_SECONDS; posts that cannot be
+                               scraped in time are skipped and listed in skipped_posts)
+    }
+    The same parameters are accepted as a query string on GET (conditional GET via If-None-Match)
+    Comments are served page by page from /api/results/<result_id>/comments
+    """
+    try:
+        data = request_payload()
+        
+        if not data or 'profile_url' not in data:
+            return jsonify({
+                'error': 'Profile URL is required',
+                'success': False
+            }), 400
+        
+        profile_url = data['profile_url']
+        from_date = data.get('from_date', None)
+        try:
+            max_posts = number_param(data, 'max_posts', 50, minimum=1)
+            deadline = request_deadline(data)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
         
+        key_parts, compute = profile_analysis_plan(
+            'instagram', profile_url, from_date, max_posts,
+            incremental=is_truthy(data.get('incremental')),
+            streaming=is_truthy(data.get('streaming')),
+            deadline=deadline
+        )
+        
+        # Cached by normalized URL + parameters; identical in-flight requests share one scrape + analysis
+        return cached_analysis(key_parts, compute, data)
+    
     except Exception as e:
         logger.error(f"Error during bulk analysis: {str(e)}", exc_info=True)
         return jsonify({
@@ -429,11 +1798,18 @@ def analyze_profile():
 def analyze_facebook_group():
     """
     Analyze all posts from Facebook (groups, pages, or profiles) from a given date onwards
-    Expected JSON body: { 
+    Expected JSON body: {
         "group_url": "facebook_url",  (also accepts page_url or profile_url)
         "from_date": "YYYY-MM-DD" (optional),
-        "max_posts": 50 (optional)
+        "max_posts": 50 (optional),
+        "include_comments": false (optional, legacy full comment lists),
+        "refresh": false (optional, bypass the response cache),
+        "incremental": false (optional, only scrape/score what changed since the last run),
+        "streaming": false (optional, memory-bounded mode; automatic from STREAMING_POST_THRESHOLD posts),
+        "timeout_seconds": 90 (optional, default ANALYSIS_TIMEOUT_SECONDS; 504 if the scraper
+                               run does not finish in time)
     }
+    Comments are served page by page from /api/results/<result_id>/comments
     """
     try:
         data = request.get_json()
@@ -448,111 +1824,22 @@ def analyze_facebook_group():
             }), 400
         
         from_date = data.get('from_date', None)
-        max_posts = data.get('max_posts', 50)
-        
-        logger.info(f"Starting Facebook analysis: {facebook_url} from date: {from_date}")
+        try:
+            max_posts = number_param(data, 'max_posts', 50, minimum=1)
+            deadline = request_deadline(data)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
         
-        # Step 1: Scrape all posts and their comments from Facebook
-        logger.info("Step 1: Scraping Facebook posts and comments...")
-        bulk_data = facebook_scraper.scrape_posts_comments_bulk(
-            facebook_url, 
-            from_date, 
-            max_posts
+        key_parts, compute = profile_analysis_plan(
+            'facebook', facebook_url, from_date, max_posts,
+            incremental=is_truthy(data.get('incremental')),
+            streaming=is_truthy(data.get('streaming')),
+            deadline=deadline
         )
         
-        if bulk_data['total_posts'] == 0:
-            return jsonify({
-                'error': 'No posts found or unable to scrape Facebook URL',
-                'success': False
-            }), 404
-        
-        logger.info(f"Scraped {bulk_data['total_posts']} posts with {bulk_data['total_comments']} total comments")
-        
-        # Step 2: Analyze all comments from all posts
-        logger.info("Step 2: Analyzing all comments...")
-        all_comments = []
-        for post in bulk_data['posts']:
-            all_comments.extend(post['comments'])
-        
-        if not all_comments:
-            return jsonify({
-                'error': 'No comments found in the posts',
-                'success': False
-            }), 404
-        
-        # Perform sentiment analysis on all comments
-        analyzed_comments = sentiment_analyzer.analyze_batch(all_comments)
-        
-        # Step 3: Classify topics for negative comments
-        logger.info("Step 3: Classifying topics for negative comments...")
-        negative_comments = [c for c in analyzed_comments if c['sentiment'] == 'negative']
-        positive_comments = [c for c in analyzed_comments if c['sentiment'] == 'positive']
-        neutral_comments = [c for c in analyzed_comments if c['sentiment'] == 'neutral']
-        
-        if negative_comments:
-            negative_comments = topic_classifier.classify_topics(negative_comments)
-        
-        # Calculate overall statistics
-        total_comments = len(analyzed_comments)
-        sentiment_stats = {
-            'positive': len(positive_comments),
-            'negative': len(negative_comments),
-            'neutral': len(neutral_comments),
-            'positive_percentage': round((len(positive_comments) / total_comments) * 100, 2) if total_comments > 0 else 0,
-            'negative_percentage': round((len(negative_comments) / total_comments) * 100, 2) if total_comments > 0 else 0,
-            'neutral_percentage': round((len(neutral_comments) / total_comments) * 100, 2) if total_comments > 0 else 0
-        }
-        
-        # Get topic distribution for negative comments
-        topic_stats = {}
-        if negative_comments:
-            for comment in negative_comments:
-                topic = comment.get('topic', 'Other')
-                topic_stats[topic] = topic_stats.get(topic, 0) + 1
-        
-        # Organize comments by post
-        posts_analysis = []
-        for post in bulk_data['posts']:
-            post_comments = post['comments']
-            post_analyzed = [c for c in analyzed_comments if c.get('id') in [pc.get('id') for pc in post_comments]]
-            
-            post_negative = [c for c in post_analyzed if c['sentiment'] == 'negative']
-            post_positive = [c for c in post_analyzed if c['sentiment'] == 'positive']
-            post_neutral = [c for c in post_analyzed if c['sentiment'] == 'neutral']
-            
-            posts_analysis.append({
-                'post_url': post['post_url'],
-                'post_date': post['post_date'],
-                'total_comments': len(post_analyzed),
-                'sentiment_breakdown': {
-                    'positive': len(post_positive),
-                    'negative': len(post_negative),
-                    'neutral': len(post_neutral)
-                }
-            })
-        
-        logger.info("Facebook analysis completed successfully")
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'type': 'profile',
-                'url': facebook_url,
-                'from_date': from_date,
-                'total_posts': bulk_data['total_posts'],
-                'total_comments': total_comments,
-                'sentiment_stats': sentiment_stats,
-                'topic_stats': topic_stats,
-                'posts_analysis': posts_analysis,
-                'negative_comments_details': negative_comments,
-                'all_comments': {
-                    'positive': positive_comments,
-                    'negative': negative_comments,
-                    'neutral': neutral_comments
-                }
-            }
-        }), 200
-        
+        # Cached by normalized URL + parameters; identical in-flight requests share one scrape + analysis
+        return cached_analysis(key_parts, compute, data)
+    
     except Exception as e:
         logger.error(f"Error during Facebook group analysis: {str(e)}")
         return jsonify({
@@ -560,6 +1847,7 @@ def analyze_facebook_group():
             'success': False
         }), 500
 
+
 @app.route('/api/stats', methods=['POST'])
 def get_stats_only():
     """
@@ -573,28 +1861,20 @@ def get_stats_only():
         if not instagram_url:
             return jsonify({'error': 'URL is required', 'success': False}), 400
         
-        # Scrape and analyze
+        # Scrape and aggregate - lean mode only keeps counters, no per-comment enrichment
         comments_data = instagram_scraper.scrape_comments(instagram_url)
-        analyzed_comments = sentiment_analyzer.analyze_batch(comments_data)
-        
-        negative_comments = [c for c in analyzed_comments if c['sentiment'] == 'negative']
-        if negative_comments:
-            negative_comments = topic_classifier.classify_topics(negative_comments)
+        counts = sentiment_analyzer.aggregate_batch(comments_data, topic_classifier)
         
         # Calculate stats
-        total = len(analyzed_comments)
         stats = {
-            'total_comments': total,
-            'positive': len([c for c in analyzed_comments if c['sentiment'] == 'positive']),
-            'negative': len(negative_comments),
-            'neutral': len([c for c in analyzed_comments if c['sentiment'] == 'neutral'])
+            'total_comments': counts['total'],
+            'positive': counts['positive'],
+            'negative': counts['negative'],
+            'neutral': counts['neutral']
         }
         
         # Topic distribution
-        topic_distribution = {}
-        for comment in negative_comments:
-            topic = comment.get('topic', 'Other')
-            topic_distribution[topic] = topic_distribution.get(topic, 0) + 1
+        topic_distribution = counts['topics']
         
         return jsonify({
             'success': True,
@@ -608,6 +1888,285 @@ def get_stats_only():
         logger.error(f"Error: {str(e)}")
         return jsonify({'error': str(e), 'success': False}), 500
 
+@app.route('/api/results/<result_id>/comments', methods=['GET'])
+def get_result_comments(result_id):
+    """
+    Page through the comments of a stored analysis result
+    Query params: sentiment, topic, post (post URL), cursor, limit (max 500), fields (comma separated),
+                  format=ndjson (stream every matching comment as newline-delimited JSON)
+    """
+    try:
+        limit = min(number_param(request.args, 'limit', 100, minimum=1), 500)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+    filters = {
+        'sentiment': request.args.get('sentiment'),
+        'topic': request.args.get('topic'),
+        'post': request.args.get('post'),
+        'cursor': request.args.get('cursor'),
+        'fields': fields
+    }
+    
+    try:
+        if request.args.get('format') == 'ndjson':
+            comments = result_store.iter_comments(result_id, **filters)
+        else:
+            page = result_store.query_comments(result_id, limit=limit, **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    if request.args.get('format') == 'ndjson':
+        if comments is None:
+            return jsonify({'error': 'Result not found or expired. Run the analysis again.', 'success': False}), 404
+        
+        # Stream line by line; compress incrementally so the body is never fully buffered
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        headers = {'Vary': 'Accept-Encoding'}
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        return Response(iter_encoded(iter_ndjson(comments), encoding), mimetype='application/x-ndjson', headers=headers)
+    
+    if page is None:
+        return jsonify({
+            'error': 'Result not found or expired. Run the analysis again.',
+            'success': False
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': page
+    }), 200
+
+@app.route('/api/results/<result_id>/export', methods=['GET'])
+def export_result(result_id):
+    """
+    Download a stored analysis result as a Parquet file or an Arrow IPC stream
+    Query params: format (parquet or arrow), table (comments or posts),
+                  sentiment, topic, post (comments table only)
+    The file is encoded batch by batch while it streams out
+    """
+    export_format = request.args.get('format', 'parquet')
+    table = request.args.get('table', 'comments')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be parquet or arrow', 'success': False}), 400
+    if table not in ('comments', 'posts'):
+        return jsonify({'error': 'table must be comments or posts', 'success': False}), 400
+    
+    try:
+        schema = schema_for(table)
+    except RuntimeError as e:
+        return jsonify({'error': str(e), 'success': False}), 501
+    
+    entry = result_store.get(result_id)
+    if entry is None:
+        return jsonify({'error': 'Result not found or expired. Run the analysis again.', 'success': False}), 404
+    
+    if table == 'posts':
+        batches = iter_post_batches(entry['summary'].get('posts_analysis', []))
+    else:
+        try:
+            comments = result_store.iter_comments(
+                result_id,
+                sentiment=request.args.get('sentiment'),
+                topic=request.args.get('topic'),
+                post=request.args.get('post')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
+        batches = iter_comment_batches(comments)
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    return Response(
+        iter_export(batches, schema, export_format),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{result_id}-{table}.{extension}"'}
+    )
+
+def run_monitored_analysis(platform, url, max_posts):
+    """
+    Incremental analysis used by the scheduler - same pipeline and single-flight key as
+    incremental=true requests, under the endpoint's admission limit. Only the comment store
+    is updated: nobody reads a scheduled run's result, and storing one would push users'
+    results out of the ResultStore.
+    """
+    head = {'profile_url': url} if platform == 'instagram' else {'type': 'profile', 'url': url}
+    endpoint = 'analyze-profile' if platform == 'instagram' else 'analyze-facebook-group'
+    compute = lambda: run_incremental_analysis(platform, url, None, max_posts, {**head, 'from_date': None},
+                                               persist_result=False)
+    return admitted(endpoint, compute, 'monitor')()
+
+profile_monitor = ProfileMonitor(
+    comment_store,
+    run_monitored_analysis,
+    max_concurrent=int(os.getenv('MONITOR_MAX_CONCURRENT', 2)),
+    jitter=float(os.getenv('MONITOR_JITTER', 0.1)),
+    poll_seconds=int(os.getenv('MONITOR_POLL_SECONDS', 30))
+)
+
+def start_profile_monitor():
+    """Start the monitoring scheduler unless disabled with MONITOR_ENABLED=false"""
+    if is_truthy(os.getenv('MONITOR_ENABLED', 'true')):
+        profile_monitor.start()
+
+@app.route('/api/monitor/profiles', methods=['GET', 'POST', 'DELETE'])
+def monitor_profiles():
+    """
+    Manage scheduled monitoring
+    GET: list monitored profiles/pages
+    POST body: { "url": "profile_or_page_url", "platform": "instagram" or "facebook" (optional),
+                 "interval_minutes": 60 (optional), "max_posts": 20 (optional) }
+    DELETE body: { "url": "profile_or_page_url", "platform": (optional) }
+    """
+    if request.method == 'GET':
+        return jsonify({
+            'success': True,
+            'data': {
+                'profiles': comment_store.list_monitored_profiles(),
+                'running': profile_monitor.running()
+            }
+        }), 200
+    
+    data = request.get_json() or {}
+    url = data.get('url')
+    if not url:
+        return jsonify({'error': 'url is required', 'success': False}), 400
+    
+    platform = data.get('platform') or ('facebook' if 'facebook.com' in url else 'instagram')
+    profile = normalize_url(url)
+    
+    if request.method == 'DELETE':
+        removed = comment_store.remove_monitored_profile(platform, profile)
+        if not removed:
+            return jsonify({'error': 'Profile is not monitored', 'success': False}), 404
+        return jsonify({'success': True, 'data': {'platform': platform, 'profile': profile}}), 200
+    
+    try:
+        # Runs are at least 5 minutes apart
+        interval_seconds = max(int(number_param(data, 'interval_minutes', 60, float, minimum=0, inclusive=False) * 60), 300)
+        max_posts = number_param(data, 'max_posts', 20, minimum=1)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    profile_monitor.register(platform, url, profile, interval_seconds, max_posts)
+    return jsonify({
+        'success': True,
+        'data': {
+            'platform': platform,
+            'profile': profile,
+            'interval_seconds': interval_seconds,
+            'max_posts': max_posts
+        }
+    }), 201
+
+@app.route('/api/trends', methods=['GET'])
+def get_trends():
+    """
+    Sentiment and topic counts per time bucket, read from the pre-aggregated rollups
+    Query params: profile, platform, bucket (hour, day or week), from_date, to_date (YYYY-MM-DD),
+                  fill_gaps (default true - zero points for empty buckets)
+    """
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in TREND_SOURCES:
+        return jsonify({'error': 'bucket must be hour, day or week', 'success': False}), 400
+    
+    try:
+        filters = history_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    rows = comment_store.query_rollups(
+        TREND_SOURCES[bucket],
+        platform=filters['platform'],
+        profile=filters['profile'],
+        since=filters['since'],
+        until=filters['until']
+    )
+    series = build_trend_series(rows, bucket, fill_gaps=is_truthy(request.args.get('fill_gaps', 'true')))
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'bucket': bucket,
+            'profile': filters['profile'],
+            'platform': filters['platform'],
+            'series': series
+        }
+    }), 200
+
+def history_filters():
+    """Read the shared history query parameters (profile, post, sentiment, topic, platform, from_date, to_date)"""
+    profile = request.args.get('profile')
+    from_date = request.args.get('from_date')
+    to_date = request.args.get('to_date')
+    since = to_epoch(from_date) if from_date else None
+    until = to_epoch(to_date) if to_date else None
+    if (from_date and since is None) or (to_date and until is None):
+        raise ValueError('Invalid date format. Expected YYYY-MM-DD')
+    return {
+        'profile': normalize_url(profile) if profile else None,
+        'post_url': request.args.get('post'),
+        'sentiment': request.args.get('sentiment'),
+        'topic': request.args.get('topic'),
+        'platform': request.args.get('platform'),
+        'since': since,
+        # to_date is inclusive
+        'until': until + 86400 if until is not None else None
+    }
+
+@app.route('/api/history/comments', methods=['GET'])
+def get_history_comments():
+    """
+    Query stored comments from past analyses, newest first - no scraping involved
+    Query params: profile, post, sentiment, topic, platform, from_date, to_date (YYYY-MM-DD),
+                  limit (max 1000), cursor (next_cursor from the previous page)
+    """
+    try:
+        filters = history_filters()
+        limit = min(number_param(request.args, 'limit', 100, minimum=1), 1000)
+        page = comment_store.query_comments(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            **filters
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    return jsonify({
+        'success': True,
+        'data': page
+    }), 200
+
+@app.route('/api/history/stats', methods=['GET'])
+def get_history_stats():
+    """
+    Re-aggregate sentiment/topic statistics from stored comments - no scraping involved
+    Query params: profile, post, sentiment, topic, platform, from_date, to_date (YYYY-MM-DD)
+    """
+    try:
+        filters = history_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    aggregates = comment_store.aggregate(**filters)
+    counts = aggregates['sentiment_counts']
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'total_comments': aggregates['total_comments'],
+            'sentiment_stats': build_sentiment_stats(counts['positive'], counts['negative'], counts['neutral']),
+            'topic_stats': aggregates['topic_stats'],
+            'posts_analysis': aggregates['posts']
+        }
+    }), 200
+
 if __name__ == '__main__':
+    # The debug reloader imports this module in two processes; only the serving child schedules runs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_profile_monitor()
+    
     port = int(os.getenv('PORT', 5000))
     app.run(debug=True, host='0.0.0.0', port=port)
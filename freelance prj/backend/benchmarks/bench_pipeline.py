@@ -0,0 +1,332 @@
+"""
+Benchmark the comment analysis pipeline stage by stage
+
+Runs synthetic multilingual corpora (mixed, emoji-heavy, question-heavy, negative-heavy)
+at several sizes through preprocess_text, the rule shortcuts, analyze_batch,
+classify_topics and the endpoint aggregation, and reports comments/sec per stage.
+
+Results are compared with a JSON baseline; stages whose throughput drops by more than
+--threshold are flagged and the script exits with status 1 (usable as a CI gate).
+Without --baseline the run is only reported. If the --baseline file does not exist yet,
+or with --update-baseline, it is written instead of compared. Baselines are only
+comparable on the same machine and sentiment model.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 1000,10000,100000] [--corpora mixed,emoji]
+                                        [--repeat 3] [--threshold 0.15]
+                                        [--baseline ~/bench/pipeline_baseline.json]
+                                        [--update-baseline] [--output results.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+# The app module, imported by load_backend() once its scratch directories are set up
+backend = None
+
+TEXTS = {
+    'positive': [
+        "Love this so much",
+        "Amazing quality, thank you",
+        "Best shop in town, highly recommend",
+        "Juda chiroyli, rahmat",
+        "Очень красиво, спасибо",
+        "Harika olmuş, teşekkürler",
+        "ما شاء الله جميل جدا",
+    ],
+    'negative': [
+        "Terrible quality, it broke after two days",
+        "Still waiting for my order, worst delivery ever",
+        "Customer service is rude and never answers",
+        "Way too expensive, total scam",
+        "The size was wrong and the color faded after one wash",
+        "Sifati juda yomon, pulimni qaytaring",
+        "Ужасное качество, не покупайте",
+        "Berbat, param boşa gitti",
+        "خدمة سيئة جدا",
+    ],
+    'question': [
+        "Where can I buy this?",
+        "How much is it?",
+        "Do you ship to Tashkent?",
+        "Is this available in blue?",
+        "Narxi qancha?",
+        "Сколько стоит?",
+        "Fiyatı ne kadar?",
+        "كم السعر؟",
+    ],
+    'emoji': [
+        "😍😍😍",
+        "🔥🔥",
+        "❤️❤️❤️",
+        "👏👏 so good",
+        "😡😡",
+        "🙏",
+        "💯💯💯 @bestie",
+    ],
+    'neutral': [
+        "ok",
+        "seen",
+        "tagging @friend",
+        "posted on monday",
+        "👀 @bestie",
+        "first",
+    ],
+}
+
+# Share of each text kind per corpus
+CORPORA = {
+    'mixed': {'positive': 0.35, 'negative': 0.25, 'question': 0.15, 'emoji': 0.15, 'neutral': 0.10},
+    'emoji': {'positive': 0.10, 'negative': 0.10, 'question': 0.10, 'emoji': 0.60, 'neutral': 0.10},
+    'questions': {'positive': 0.10, 'negative': 0.10, 'question': 0.60, 'emoji': 0.10, 'neutral': 0.10},
+    'negative': {'positive': 0.10, 'negative': 0.60, 'question': 0.10, 'emoji': 0.10, 'neutral': 0.10},
+}
+
+SUFFIXES = ['', '', '', '!', '!!', ' 😂', ' @shop_official', ' #sale', ' https://t.co/x1', ' really', ' lol']
+
+
+def build_corpus(mix, size, posts=20, seed=42):
+    """Build `size` synthetic comments spread over `posts` posts"""
+    rng = random.Random(f"{seed}:{size}")
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    comments = []
+    for idx in range(size):
+        kind = rng.choices(kinds, weights)[0]
+        comments.append({
+            'id': f"c{idx}",
+            'text': rng.choice(TEXTS[kind]) + rng.choice(SUFFIXES),
+            'username': f"user{rng.randrange(10000)}",
+            'timestamp': f"2024-03-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:15:00Z",
+            'likes': rng.randrange(50),
+            'post_url': f"https://www.instagram.com/p/BENCH{idx % posts:04d}/"
+        })
+    return comments
+
+
+def measure(fn, prepare, repeat, budget_seconds=5.0, min_seconds=0.25, max_runs=50):
+    """
+    Best wall time of fn(prepare()) in milliseconds - prepare() runs outside the timer.
+    Slow stages stop repeating once the time budget is spent; fast ones keep repeating
+    until min_seconds so sub-millisecond timings are not dominated by noise.
+    """
+    best = float('inf')
+    result = None
+    spent = 0.0
+    runs = 0
+    while runs < repeat or (spent < min_seconds and runs < max_runs):
+        arg = prepare()
+        start = time.perf_counter()
+        result = fn(arg)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        runs += 1
+        if spent >= budget_seconds:
+            break
+    return best * 1000, result
+
+
+def load_backend(scratch_dir):
+    """
+    Import app for its real analyzers and aggregation code - offline, with its spills,
+    cache and comment store in scratch_dir instead of the working tree
+    """
+    global backend
+    os.environ.setdefault('APIFY_FAKE', '1')
+    os.environ.setdefault('RESULT_SPILL_DIR', os.path.join(scratch_dir, 'spills'))
+    os.environ.setdefault('RESPONSE_CACHE_DIR', os.path.join(scratch_dir, 'responses'))
+    os.environ.setdefault('COMMENT_STORE_PATH', os.path.join(scratch_dir, 'comments.db'))
+    import app
+    backend = app
+    logging.disable(logging.WARNING)
+
+
+class PrecomputedTopics:
+    """Stands in for the topic classifier while timing aggregation - topics are already set"""
+
+    def classify_topics(self, comments):
+        return comments
+
+
+def rule_shortcuts(texts):
+    """The rule-based part of SentimentAnalyzer.classify_texts, in its priority order"""
+    analyzer = backend.sentiment_analyzer
+    return [analyzer.detect_neutral_questions(t) or analyzer.detect_positive_indicators(t) for t in texts]
+
+
+def aggregate(analyzed, posts):
+    """What the endpoints do once comments are scored and topics are classified"""
+    topic_classifier = backend.topic_classifier
+    # classify_topics is timed as its own stage
+    backend.topic_classifier = PrecomputedTopics()
+    try:
+        backend.analyze_comments(analyzed)
+    finally:
+        backend.topic_classifier = topic_classifier
+    backend.build_posts_analysis(posts, analyzed)
+    backend.build_duplicate_stats(analyzed)
+
+
+def bench_corpus(name, size, repeat):
+    """Time every stage on one corpus - returns {stage: {'ms', 'items', 'items_per_sec'}}"""
+    analyzer = backend.sentiment_analyzer
+    comments = build_corpus(CORPORA[name], size)
+    texts = [c['text'] for c in comments]
+    posts = [{'post_url': url, 'post_date': '2024-03-01'} for url in sorted({c['post_url'] for c in comments})]
+    copies = lambda: [dict(c) for c in comments]
+
+    timings = {}
+    timings['preprocess_text'] = (measure(lambda ts: [analyzer.preprocess_text(t) for t in ts],
+                                          lambda: texts, repeat)[0], size)
+    timings['rule_shortcuts'] = (measure(rule_shortcuts, lambda: texts, repeat)[0], size)
+
+    ms, analyzed = measure(analyzer.analyze_batch, copies, repeat)
+    timings['analyze_batch'] = (ms, size)
+
+    negatives = [c for c in analyzed if c['sentiment'] == 'negative']
+    ms, classified = measure(backend.topic_classifier.classify_topics, lambda: [dict(c) for c in negatives], repeat)
+    timings['classify_topics'] = (ms, len(negatives))
+    for comment, with_topic in zip(negatives, classified):
+        comment['topic'] = with_topic['topic']
+
+    timings['endpoint_aggregation'] = (measure(lambda a: aggregate(a, posts), lambda: analyzed, repeat)[0], size)
+
+    return {
+        stage: {
+            'ms': round(ms, 3),
+            'items': items,
+            'items_per_sec': round(items / (ms / 1000), 1) if ms > 0 else None
+        }
+        for stage, (ms, items) in timings.items()
+    }
+
+
+def environment():
+    """What a baseline depends on besides the code"""
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'sentiment_model': backend.sentiment_analyzer.get_model_version(),
+        'inference_batch_size': backend.sentiment_analyzer.batch_size
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Flag stages whose throughput fell below (1 - threshold) of the baseline
+
+    Returns:
+        list: (key, baseline items/sec, current items/sec, change) for every regression
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get('results', {}).get(key)
+        if not previous or not previous.get('items_per_sec') or not current.get('items_per_sec'):
+            continue
+        change = current['items_per_sec'] / previous['items_per_sec'] - 1
+        current['change_vs_baseline'] = round(change, 4)
+        if change < -threshold:
+            regressions.append((key, previous['items_per_sec'], current['items_per_sec'], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--corpora', default=','.join(CORPORA))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Allowed throughput drop vs the baseline (0.15 = 15%%)')
+    parser.add_argument('--baseline', help='Baseline JSON file to compare with (written if missing)')
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--output', help='Also write this run to a JSON file')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    corpora = [c for c in args.corpora.split(',') if c]
+    unknown = set(corpora) - set(CORPORA)
+    if unknown:
+        parser.error(f"unknown corpora: {', '.join(sorted(unknown))} (choose from {', '.join(CORPORA)})")
+
+    with tempfile.TemporaryDirectory(prefix='bench_pipeline_') as scratch_dir:
+        load_backend(scratch_dir)
+        return run(args, sizes, corpora)
+
+
+def run(args, sizes, corpora):
+    """Benchmark every corpus and size, then compare with or write the baseline"""
+    env = environment()
+    print("=" * 78)
+    print(f"Pipeline benchmark - model {env['sentiment_model']}, batch size {env['inference_batch_size']}, "
+          f"{env['cpu_count']} CPUs")
+    print("=" * 78)
+
+    results = {}
+    for name in corpora:
+        for size in sizes:
+            for stage, timing in bench_corpus(name, size, args.repeat).items():
+                results[f"{name}/{size}/{stage}"] = timing
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'environment': env,
+        'results': results
+    }
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != env:
+            print(f"WARNING: baseline was recorded on a different environment: {baseline.get('environment')}")
+
+    regressions = compare(results, baseline, args.threshold) if baseline else []
+
+    print(f"\n{'corpus/size/stage':<44} {'ms':>10} {'comments/s':>12} {'vs base':>9}")
+    print("-" * 78)
+    for key, timing in results.items():
+        change = timing.get('change_vs_baseline')
+        change_text = f"{change:+.1%}" if change is not None else ''
+        flag = '  REGRESSION' if any(r[0] == key for r in regressions) else ''
+        print(f"{key:<44} {timing['ms']:>10.1f} {timing['items_per_sec'] or 0:>12,.0f} {change_text:>9}{flag}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        print("\nNo --baseline given - nothing compared")
+        return 0
+
+    if baseline is None:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}:")
+        for key, before, after, change in regressions:
+            print(f"  {key}: {before:,.0f} -> {after:,.0f} comments/s ({change:+.1%})")
+        return 1
+
+    print(f"\nNo regressions beyond {args.threshold:.0%} vs {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
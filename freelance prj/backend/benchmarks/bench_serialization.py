@@ -0,0 +1,132 @@
+"""
+Benchmark JSON serialization and bytes on the wire for a large profile analysis response
+
+Compares the stdlib json module with orjson, the legacy monolithic payload with the
+aggregates-only payload, and raw vs gzip vs brotli encodings.
+
+Usage:
+    python benchmarks/bench_serialization.py [--comments 20000] [--posts 50] [--repeat 5]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.serialization import dumps_bytes, orjson, brotli
+
+SAMPLE_TEXTS = [
+    "Love this so much ❤️🔥",
+    "Where can I buy this? What is the price?",
+    "Terrible quality, it broke after two days. Never again",
+    "Still waiting for my order, delivery is so slow",
+    "Mashallah, beautiful work 🙏",
+    "Customer service never answered my messages, very rude staff",
+    "ok",
+    "Bu juda qimmat, narxi nechi?",
+]
+TOPICS = ['Delivery', 'Bad Quality', 'Customer Service', 'Pricing', 'Product Issues']
+
+
+def build_profile_response(total_comments, total_posts, include_comments=True):
+    """Build a synthetic /api/analyze-profile response body"""
+    rng = random.Random(42)
+    comments = {'positive': [], 'negative': [], 'neutral': []}
+    posts_analysis = []
+
+    per_post = total_comments // total_posts
+    for p in range(total_posts):
+        post_url = f"https://www.instagram.com/p/POST{p:04d}/"
+        breakdown = {'positive': 0, 'negative': 0, 'neutral': 0}
+        for c in range(per_post):
+            text = rng.choice(SAMPLE_TEXTS)
+            sentiment = rng.choice(['positive', 'negative', 'neutral'])
+            comment = {
+                'id': f"{p}_{c}_{rng.getrandbits(48)}",
+                'text': text,
+                'username': f"user_{rng.randint(1, 100000)}",
+                'timestamp': f"2024-03-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:15:00.000Z",
+                'likes': rng.randint(0, 500),
+                'post_url': post_url,
+                'sentiment': sentiment,
+                'confidence': round(rng.random(), 4),
+                'cleaned_text': text,
+            }
+            if sentiment == 'negative':
+                comment['topic'] = rng.choice(TOPICS)
+                comment['keywords'] = text.lower().split()[:5]
+            comments[sentiment].append(comment)
+            breakdown[sentiment] += 1
+        posts_analysis.append({
+            'post_url': post_url,
+            'post_date': '2024-03-01',
+            'total_comments': per_post,
+            'sentiment_breakdown': breakdown
+        })
+
+    data = {
+        'profile_url': 'https://www.instagram.com/brand/',
+        'from_date': '2024-03-01',
+        'total_posts': total_posts,
+        'total_comments': total_comments,
+        'sentiment_stats': {k: len(v) for k, v in comments.items()},
+        'topic_stats': {t: 0 for t in TOPICS},
+        'posts_analysis': posts_analysis,
+        'result_id': 'f' * 32,
+        'comments_url': '/api/results/' + 'f' * 32 + '/comments',
+    }
+    if include_comments:
+        data['negative_comments_details'] = comments['negative']
+        data['all_comments'] = comments
+    return {'success': True, 'data': data}
+
+
+def time_it(fn, repeat):
+    """Return the best wall time in milliseconds over several runs"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--posts', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"Serialization benchmark - {args.comments} comments across {args.posts} posts")
+    print(f"orjson: {'available' if orjson else 'missing'}, brotli: {'available' if brotli else 'missing'}")
+    print("=" * 72)
+
+    for label, include in (('legacy payload (all comments)', True), ('aggregates-only payload', False)):
+        payload = build_profile_response(args.comments, args.posts, include_comments=include)
+
+        stdlib_ms, stdlib_body = time_it(lambda: json.dumps(payload).encode('utf-8'), args.repeat)
+        fast_ms, fast_body = time_it(lambda: dumps_bytes(payload), args.repeat)
+        gzip_ms, gzip_body = time_it(lambda: gzip.compress(fast_body, compresslevel=6), args.repeat)
+
+        print(f"\n{label}")
+        print("-" * 72)
+        print(f"  stdlib json.dumps      {stdlib_ms:9.1f} ms   {len(stdlib_body):>12,} bytes")
+        print(f"  dumps_bytes (fast)     {fast_ms:9.1f} ms   {len(fast_body):>12,} bytes")
+        print(f"  + gzip level 6         {gzip_ms:9.1f} ms   {len(gzip_body):>12,} bytes")
+        if brotli is not None:
+            br_ms, br_body = time_it(lambda: brotli.compress(fast_body, quality=5), args.repeat)
+            print(f"  + brotli quality 5     {br_ms:9.1f} ms   {len(br_body):>12,} bytes")
+        if include:
+            print(f"  speedup vs stdlib      {stdlib_ms / fast_ms:9.1f} x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Compare the single-process development server with gunicorn pre-fork serving
+
+Boots each setup with the offline Apify stand-in (see load_test.py), drives the same
+request mix at a fixed concurrency and reports requests/sec, latency and memory per
+process. RSS counts shared pages in full; PSS divides them between the processes
+sharing them and USS is what each process holds privately, so with the model preloaded
+in the gunicorn master the workers' USS should stay far below their RSS.
+
+The development setup is app.py's Flask app on werkzeug's threaded server in one
+process (what `python app.py` runs, minus the debug reloader's second process).
+
+Usage:
+    python benchmarks/bench_serving.py [--workers 1,2,4] [--threads 32] [--concurrency 16]
+                                       [--duration 20] [--mix analyze=70,comments=10,health=20]
+                                       [--apify-latency 0.5] [--output serving.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from load_test import (
+    BACKEND_DIR, RequestFactory, free_port, mock_env, parse_mix, run_level, send, wait_until_healthy
+)
+
+LOAD_TEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load_test.py')
+
+
+def read_memory(pid):
+    """RSS, PSS and USS of a process in MB (Linux /proc only)"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                key, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[key] = int(value.split()[0])
+    except OSError:
+        return None
+    return {
+        'rss_mb': round(fields.get('Rss', 0) / 1024, 1),
+        'pss_mb': round(fields.get('Pss', 0) / 1024, 1),
+        'uss_mb': round((fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024, 1)
+    }
+
+
+def child_pids(pid):
+    """Direct children of a process (the gunicorn workers of a master)"""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces - the parent pid follows its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def boot(name, port, command, args):
+    scratch = tempfile.mkdtemp(prefix=f'bench_serving_{name}_')
+    log = open(os.path.join(scratch, 'server.log'), 'wb')
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=mock_env(args, scratch),
+                               stdout=log, stderr=subprocess.STDOUT)
+    return wait_until_healthy(process, f"http://127.0.0.1:{port}", log, args.boot_timeout)
+
+
+def setups(args):
+    """(name, worker count, port, command) for every server setup to compare"""
+    port = free_port()
+    yield 'werkzeug', 1, port, [sys.executable, LOAD_TEST, '--serve', '--port', str(port)]
+    for workers in [int(w) for w in args.workers.split(',') if w]:
+        port = free_port()
+        yield f"gunicorn-{workers}w", workers, port, [
+            sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f"127.0.0.1:{port}",
+            '--workers', str(workers), '--threads', str(args.threads), 'wsgi:app'
+        ]
+
+
+def bench_setup(name, workers, port, command, args, mix):
+    process, target = boot(name, port, command, args)
+    try:
+        factory = RequestFactory(args.url_pool, 10, args.seed)
+        # Warm every worker's caches and lazy imports before measuring
+        for _ in range(args.warmup):
+            send(target, 'GET', '/api/health', None, args.timeout)
+            send(target, *factory.build('analyze'), args.timeout)
+
+        level = run_level(target, factory, mix, args.concurrency, args.duration, args.timeout, process.pid)
+        worker_pids = child_pids(process.pid) if name != 'werkzeug' else [process.pid]
+        memory = {
+            'master': read_memory(process.pid) if name != 'werkzeug' else None,
+            'workers': [read_memory(pid) for pid in worker_pids]
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=args.graceful_timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    workers_memory = [m for m in memory['workers'] if m]
+    average = lambda key: round(sum(m[key] for m in workers_memory) / len(workers_memory), 1) if workers_memory else None
+    processes = workers_memory + ([memory['master']] if memory['master'] else [])
+    return {
+        'setup': name,
+        'workers': workers,
+        'throughput_rps': level['throughput_rps'],
+        'error_rate': level['error_rate'],
+        'latency_ms': level['latency_ms'],
+        'worker_rss_mb': average('rss_mb'),
+        'worker_uss_mb': average('uss_mb'),
+        'total_pss_mb': round(sum(m['pss_mb'] for m in processes), 1) if processes else None,
+        'memory': memory
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='gunicorn worker counts to compare')
+    parser.add_argument('--threads', type=int, default=32, help='gunicorn threads per worker')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--warmup', type=int, default=5, help='Requests per kind sent before measuring')
+    parser.add_argument('--mix', default='analyze=70,comments=10,health=20')
+    parser.add_argument('--url-pool', type=int, default=500)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--apify-latency', type=float, default=0.5)
+    parser.add_argument('--apify-jitter', type=float, default=0.2)
+    parser.add_argument('--apify-failure-rate', type=float, default=0.0)
+    parser.add_argument('--apify-calls-per-second', type=float, default=0)
+    parser.add_argument('--comments-per-post', type=int, default=100)
+    parser.add_argument('--posts-per-profile', type=int, default=5)
+    parser.add_argument('--boot-timeout', type=float, default=300)
+    parser.add_argument('--graceful-timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results to a JSON file')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    results = []
+    for name, workers, port, command in setups(args):
+        print(f"\n--- {name} ---")
+        results.append(bench_setup(name, workers, port, command, args, mix))
+        time.sleep(1)
+
+    print("\n" + "=" * 96)
+    print(f"Serving benchmark - concurrency {args.concurrency}, {args.duration:.0f}s, mix {args.mix}, "
+          f"{os.cpu_count()} CPUs")
+    print("=" * 96)
+    print(f"{'setup':<14} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>8} "
+          f"{'RSS/worker':>11} {'USS/worker':>11} {'total PSS':>10}")
+    print("-" * 96)
+    fmt = lambda v, width, digits=1: f"{v:>{width}.{digits}f}" if v is not None else f"{'-':>{width}}"
+    for result in results:
+        latency = result['latency_ms']
+        print(f"{result['setup']:<14} {result['throughput_rps']:>8.1f} {fmt(latency['p50'], 9, 0)} "
+              f"{fmt(latency['p95'], 9, 0)} {result['error_rate'] or 0:>8.1%} "
+              f"{fmt(result['worker_rss_mb'], 11)} {fmt(result['worker_uss_mb'], 11)} "
+              f"{fmt(result['total_pss_mb'], 10)}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'arguments': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+HTTP load test for the Flask API with mocked backends
+
+Boots app.py in a child process with the Apify scrapers replaced by the offline
+FakeApifyClient (with simulated actor latency) and, optionally, a stub sentiment model,
+then drives a weighted request mix at increasing concurrency levels. Every level reports
+throughput, p50/p95/p99 latency, error rate and the server's peak memory, and the
+highest level that still meets the p95 target is printed for deployment sizing.
+
+Usage:
+    python benchmarks/load_test.py [--concurrency 1,4,16,32] [--duration 20]
+                                   [--mix analyze=70,analyze-profile=10,comments=10,health=10]
+                                   [--apify-latency 0.5] [--stub-model --model-latency-ms 20]
+                                   [--url-pool 500] [--slo-p95-ms 2000] [--output load.json]
+    python benchmarks/load_test.py --target http://localhost:5000 ...   # an already running server
+
+Request kinds for --mix: analyze, analyze-profile, analyze-facebook, analyze-batch,
+analyze-portfolio, comments, export, trends, health
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DEFAULT_MIX = 'analyze=70,analyze-profile=10,comments=10,health=10'
+
+
+class StubPipeline:
+    """Stands in for the Hugging Face sentiment pipeline: fixed latency per batch, no model"""
+
+    LABELS = ('1 star', '2 stars', '3 stars', '4 stars', '5 stars')
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000
+
+    def __call__(self, texts, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        time.sleep(self.latency)
+        return [{'label': self.LABELS[hash(text) % len(self.LABELS)], 'score': 0.9} for text in texts]
+
+
+def serve(port, stub_model, model_latency_ms):
+    """Child process: run the API on a threaded WSGI server"""
+    sys.path.insert(0, BACKEND_DIR)
+    from werkzeug.serving import make_server
+
+    import app as backend
+
+    if stub_model:
+        backend.sentiment_analyzer.sentiment_pipeline = StubPipeline(model_latency_ms)
+        backend.sentiment_analyzer.model_name = 'stub'
+        backend.sentiment_analyzer.is_multilingual = True
+
+    make_server('127.0.0.1', port, backend.app, threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def mock_env(args, scratch):
+    """Environment for a server process with the offline Apify stand-in and scratch storage"""
+    env = dict(os.environ)
+    env.update({
+        'APIFY_FAKE': '1',
+        'APIFY_FAKE_LATENCY': str(args.apify_latency),
+        'APIFY_FAKE_JITTER': str(args.apify_jitter),
+        'APIFY_FAKE_FAILURE_RATE': str(args.apify_failure_rate),
+        'APIFY_FAKE_COMMENTS_PER_POST': str(args.comments_per_post),
+        'APIFY_FAKE_POSTS': str(args.posts_per_profile),
+        'APIFY_CALLS_PER_SECOND': str(args.apify_calls_per_second),
+        'RESULT_SPILL_DIR': os.path.join(scratch, 'spills'),
+        'RESPONSE_CACHE_DIR': os.path.join(scratch, 'responses'),
+        'COMMENT_STORE_PATH': os.path.join(scratch, 'comments.db'),
+        'MONITOR_ENABLED': 'false'
+    })
+    return env
+
+
+def wait_until_healthy(process, target, log, boot_timeout):
+    """Wait for /api/health to answer; kills the process and raises if it never does"""
+    deadline = time.time() + boot_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup - see {log.name}")
+        try:
+            with urllib.request.urlopen(target + '/api/health', timeout=2) as response:
+                if response.status == 200:
+                    print(f"Server ready on {target} (pid {process.pid}, log {log.name})")
+                    return process, target
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.5)
+
+    process.kill()
+    raise RuntimeError(f"Server did not become healthy within {boot_timeout}s - see {log.name}")
+
+
+def start_server(args):
+    """Boot app.py with mocked backends and wait until /api/health answers"""
+    scratch = tempfile.mkdtemp(prefix='load_test_')
+    port = free_port()
+    command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port),
+               '--model-latency-ms', str(args.model_latency_ms)]
+    if args.stub_model:
+        command.append('--stub-model')
+
+    log = open(os.path.join(scratch, 'server.log'), 'wb')
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=mock_env(args, scratch),
+                               stdout=log, stderr=subprocess.STDOUT)
+    target = f"http://127.0.0.1:{port}"
+    return wait_until_healthy(process, target, log, args.boot_timeout)
+
+
+def read_memory_kb(pid):
+    """Current and peak resident memory of a process in KB (Linux /proc only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['VmRSS'].split()[0]), int(fields['VmHWM'].split()[0])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+class RequestFactory:
+    """Builds the HTTP requests of each kind; the URL pool controls the response cache hit rate"""
+
+    def __init__(self, url_pool, batch_size, seed):
+        self.url_pool = url_pool
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.result_ids = []
+        self.lock = threading.Lock()
+
+    def _pick(self):
+        with self.lock:
+            return self.rng.randrange(self.url_pool)
+
+    def remember(self, body):
+        result_id = (body.get('data') or {}).get('result_id') if isinstance(body, dict) else None
+        if result_id:
+            with self.lock:
+                self.result_ids.append(result_id)
+                # Recent results only - older ones may already be evicted from the result store
+                del self.result_ids[:-20]
+
+    def _result_id(self):
+        with self.lock:
+            return self.rng.choice(self.result_ids) if self.result_ids else None
+
+    def build(self, kind):
+        """Returns (method, path, json body or None)"""
+        if kind == 'analyze':
+            return 'POST', '/api/analyze', {'url': f"https://www.instagram.com/p/LOAD{self._pick()}/"}
+        if kind == 'analyze-profile':
+            return 'POST', '/api/analyze-profile', {
+                'profile_url': f"https://www.instagram.com/load{self._pick()}/", 'max_posts': 5
+            }
+        if kind == 'analyze-facebook':
+            return 'POST', '/api/analyze-facebook-group', {
+                'url': f"https://www.facebook.com/load{self._pick()}", 'max_posts': 5
+            }
+        if kind == 'analyze-batch':
+            return 'POST', '/api/analyze-batch', {
+                'urls': [f"https://www.instagram.com/p/LOAD{self._pick()}/" for _ in range(self.batch_size)]
+            }
+        if kind == 'analyze-portfolio':
+            return 'POST', '/api/analyze-portfolio', {
+                'profiles': [f"https://www.instagram.com/load{self._pick()}/" for _ in range(3)],
+                'max_posts': 5
+            }
+        if kind in ('comments', 'export'):
+            result_id = self._result_id()
+            if result_id is None:
+                return self.build('analyze')
+            if kind == 'comments':
+                return 'GET', f"/api/results/{result_id}/comments?limit=100&sentiment=negative", None
+            return 'GET', f"/api/results/{result_id}/export?format=parquet", None
+        if kind == 'trends':
+            return 'GET', '/api/trends?bucket=day', None
+        return 'GET', '/api/health', None
+
+
+def send(target, method, path, body, timeout):
+    """Send one request; returns (status, parsed JSON body or None)"""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(target + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json', 'Accept-Encoding': 'identity'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+            is_json = response.headers.get('Content-Type', '').startswith('application/json')
+            return response.status, json.loads(payload) if is_json else None
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code, None
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return 0, None
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_level(target, factory, mix, concurrency, duration, timeout, pid):
+    """Closed-loop load: `concurrency` workers send back-to-back requests for `duration` seconds"""
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    samples = []
+    samples_lock = threading.Lock()
+    stop_at = time.time() + duration
+    peak_rss = [0]
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while time.time() < stop_at:
+            kind = rng.choices(kinds, weights)[0]
+            method, path, body = factory.build(kind)
+            started = time.perf_counter()
+            status, payload = send(target, method, path, body, timeout)
+            elapsed = (time.perf_counter() - started) * 1000
+            if payload is not None:
+                factory.remember(payload)
+            with samples_lock:
+                samples.append((kind, status, elapsed))
+
+    def sample_memory():
+        while time.time() < stop_at:
+            rss, _ = read_memory_kb(pid) if pid else (None, None)
+            if rss:
+                peak_rss[0] = max(peak_rss[0], rss)
+            time.sleep(0.2)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    threads.append(threading.Thread(target=sample_memory, daemon=True))
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.time() - started
+
+    latencies = [elapsed for _, _, elapsed in samples]
+    errors = sum(1 for _, status, _ in samples if status == 0 or status >= 500)
+    per_kind = {}
+    for kind, status, elapsed in samples:
+        per_kind.setdefault(kind, []).append(elapsed)
+
+    _, peak_hwm = read_memory_kb(pid) if pid else (None, None)
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / wall, 2),
+        'error_rate': round(errors / len(samples), 4) if samples else None,
+        'status_codes': {str(code): sum(1 for _, s, _ in samples if s == code) for code in sorted({s for _, s, _ in samples})},
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'mean': statistics.fmean(latencies) if latencies else None
+        },
+        'p95_by_kind_ms': {kind: percentile(values, 0.95) for kind, values in per_kind.items()},
+        'peak_rss_mb': round(peak_rss[0] / 1024, 1) if peak_rss[0] else None,
+        'peak_rss_since_start_mb': round(peak_hwm / 1024, 1) if peak_hwm else None
+    }
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--target', help='Load an already running server instead of booting one')
+    parser.add_argument('--pid', type=int, help='Process id of --target, for memory readings')
+    parser.add_argument('--concurrency', default='1,4,16,32')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per concurrency level')
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--url-pool', type=int, default=500,
+                        help='Distinct post/profile URLs - smaller pools mean more response cache hits')
+    parser.add_argument('--batch-size', type=int, default=10, help='URLs per analyze-batch request')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--apify-latency', type=float, default=0.5, help='Simulated seconds per actor run')
+    parser.add_argument('--apify-jitter', type=float, default=0.2)
+    parser.add_argument('--apify-failure-rate', type=float, default=0.0)
+    parser.add_argument('--apify-calls-per-second', type=float, default=0,
+                        help='Shared actor call budget (0 disables the rate limiter)')
+    parser.add_argument('--comments-per-post', type=int, default=100)
+    parser.add_argument('--posts-per-profile', type=int, default=5)
+    parser.add_argument('--stub-model', action='store_true', help='Replace the sentiment model with a fixed-latency stub')
+    parser.add_argument('--model-latency-ms', type=float, default=20, help='Stub model latency per batch')
+    parser.add_argument('--slo-p95-ms', type=float, default=2000)
+    parser.add_argument('--boot-timeout', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results to a JSON file')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.stub_model, args.model_latency_ms)
+        return 0
+
+    mix = parse_mix(args.mix)
+    unknown = set(mix) - {'analyze', 'analyze-profile', 'analyze-facebook', 'analyze-batch',
+                          'analyze-portfolio', 'comments', 'export', 'trends', 'health'}
+    if unknown:
+        parser.error(f"unknown request kinds in --mix: {', '.join(sorted(unknown))}")
+
+    process = None
+    if args.target:
+        target, pid = args.target.rstrip('/'), args.pid
+    else:
+        process, target = start_server(args)
+        pid = process.pid
+
+    factory = RequestFactory(args.url_pool, args.batch_size, args.seed)
+    levels = []
+    try:
+        print("=" * 96)
+        print(f"Load test against {target} - mix {args.mix}, {args.duration:.0f}s per level")
+        print("=" * 96)
+        print(f"{'conc':>5} {'requests':>9} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'errors':>8} {'peak RSS MB':>12}")
+        print("-" * 96)
+        for concurrency in [int(c) for c in args.concurrency.split(',') if c]:
+            level = run_level(target, factory, mix, concurrency, args.duration, args.timeout, pid)
+            levels.append(level)
+            latency = level['latency_ms']
+            fmt = lambda v: f"{v:9.0f}" if v is not None else f"{'-':>9}"
+            print(f"{concurrency:>5} {level['requests']:>9} {level['throughput_rps']:>8.1f} {fmt(latency['p50'])} "
+                  f"{fmt(latency['p95'])} {fmt(latency['p99'])} {level['error_rate'] or 0:>8.1%} "
+                  f"{level['peak_rss_mb'] or '-':>12}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    within_slo = [level for level in levels
+                  if level['latency_ms']['p95'] is not None and level['latency_ms']['p95'] <= args.slo_p95_ms
+                  and (level['error_rate'] or 0) < 0.01]
+    if within_slo:
+        best = max(within_slo, key=lambda level: level['concurrency'])
+        print(f"\nHighest concurrency within p95 <= {args.slo_p95_ms:.0f} ms and <1% errors: "
+              f"{best['concurrency']} ({best['throughput_rps']:.1f} req/s)")
+    else:
+        print(f"\nNo level met p95 <= {args.slo_p95_ms:.0f} ms with <1% errors")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'target': target, 'mix': mix, 'arguments': vars(args), 'levels': levels}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Gunicorn settings for production serving (gunicorn -c gunicorn.conf.py wsgi:app)
+
+Environment:
+    PORT                          Listen port (default 5000)
+    WEB_CONCURRENCY               Worker processes (default 2)
+    GUNICORN_THREADS              Request threads per worker (default 32)
+    GUNICORN_MAX_REQUESTS         Recycle a worker after this many requests, 0 = never (default 1000)
+    GUNICORN_MAX_REQUESTS_JITTER  Random extra requests so workers don't recycle together (default 100)
+    GUNICORN_TIMEOUT              Seconds before an unresponsive worker is killed (default 120)
+    GUNICORN_GRACEFUL_TIMEOUT     Seconds a recycled/stopping worker gets to finish requests (default 60)
+    TORCH_NUM_THREADS             Torch threads per worker (default: CPU cores / workers)
+    RESULT_STORE_SHARED           Keep every analysis result on disk (default: true with several workers)
+    PROMETHEUS_MULTIPROC_DIR      Directory where workers share metrics (default: .cache/metrics with several workers)
+    APIFY_RATE_LIMIT_FILE         File holding the Apify call budget of all workers (default: .cache/apify_rate_limit
+                                  with several workers)
+
+With several workers a request may reach any of them, so every analysis result is written
+to the shared spill directory (RESULT_SPILL_DIR) and /metrics sums the metric files of all
+workers (prometheus_client multiprocess mode). The Apify call budget (APIFY_CALLS_PER_SECOND)
+is kept in one file, so it holds for the whole instance rather than per worker. All of these
+must be on the same host. Admission limits (ADMISSION_*) apply per worker.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+if workers > 1:
+    # Read by app.py when preload_app imports it below
+    os.environ.setdefault('RESULT_STORE_SHARED', 'true')
+    # prometheus_client reads this when it is first imported, i.e. during the preload
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'metrics'))
+    os.environ.setdefault('APIFY_RATE_LIMIT_FILE',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'apify_rate_limit'))
+# Threads overlap the long Apify waits; the CPU-bound model work is spread over processes.
+# Admission control (ADMISSION_*) bounds the running and queued analyses, so the threads
+# only need to cover those plus cheap requests (cache hits, pagination, health checks)
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+
+# Import the app (and load the models) once in the master, before forking
+preload_app = True
+
+# Graceful recycling bounds memory growth from fragmentation and caches
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 60))
+keepalive = 5
+
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+def on_starting(server):
+    import wsgi
+    wsgi.clear_metrics()
+
+def pre_fork(server, worker):
+    import wsgi
+    wsgi.prepare_fork()
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.configure_worker(server.cfg.workers)
+
+def post_worker_init(worker):
+    import wsgi
+    wsgi.start_monitor_in_one_worker()
+
+def child_exit(server, worker):
+    import wsgi
+    wsgi.worker_died(worker.pid)
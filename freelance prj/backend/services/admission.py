@@ -0,0 +1,158 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from services.metrics import ADMISSION_DECISIONS, ADMISSION_WAIT_SECONDS
+from services.structured_logging import SampledLog
+
+logger = logging.getLogger(__name__)
+# Under overload every shed request would log
+_shed_log = SampledLog(logger, every=100)
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed - the queue is full or it waited too long"""
+
+    def __init__(self, endpoint, reason, retry_after):
+        super().__init__(f"{endpoint}: {reason}")
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.admitted = False
+
+class AdmissionController:
+    """
+    Concurrency limit for one endpoint with a bounded wait queue. Waiting requests are
+    grouped per client and admitted round-robin across clients, so one client sending
+    many requests cannot starve the others; requests beyond the queue are rejected.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout=30.0, max_queued_per_client=None):
+        """
+        Initialize the controller
+
+        Args:
+            name (str): Endpoint name (metrics label, error messages)
+            max_concurrent (int): Requests running at the same time
+            max_queue (int): Requests waiting for a slot before new ones are rejected
+            queue_timeout (float): Seconds a request may wait before it is rejected
+            max_queued_per_client (int): Waiting requests allowed per client (default: max_queue)
+        """
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.max_queued_per_client = max_queued_per_client or self.max_queue
+        self._active = 0
+        self._queued = 0
+        # client -> waiting requests; the front client is served next, then moved to the back
+        self._waiting = OrderedDict()
+        self._service_seconds = None
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def admit(self, client):
+        """
+        Hold a slot for the duration of the block, waiting in the client's queue if needed
+
+        Args:
+            client (str): Caller identity used for fair queuing
+
+        Raises:
+            AdmissionRejected: Queue full, client over its queue share, or queue_timeout expired
+        """
+        self.acquire(client)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def acquire(self, client):
+        """Take a slot (see admit()); every successful acquire needs a release()"""
+        with self._lock:
+            if self._active < self.max_concurrent:
+                self._active += 1
+                ADMISSION_DECISIONS.labels(self.name, 'admitted').inc()
+                return
+            if self._queued >= self.max_queue:
+                raise self._reject('queue_full', 'too many analyses running and queued')
+            queue = self._waiting.get(client)
+            if queue is not None and len(queue) >= self.max_queued_per_client:
+                raise self._reject('client_queue_full', 'too many queued requests from this client')
+            waiter = _Waiter()
+            self._waiting.setdefault(client, deque()).append(waiter)
+            self._queued += 1
+
+        started = time.perf_counter()
+        waiter.event.wait(self.queue_timeout)
+        waited = time.perf_counter() - started
+        ADMISSION_WAIT_SECONDS.labels(self.name).observe(waited)
+        with self._lock:
+            # Checked under the lock - a slot may have been handed over just after the timeout
+            if waiter.admitted:
+                ADMISSION_DECISIONS.labels(self.name, 'queued').inc()
+                return
+            queue = self._waiting[client]
+            queue.remove(waiter)
+            if not queue:
+                del self._waiting[client]
+            self._queued -= 1
+            raise self._reject('timeout', f"waited {waited:.1f}s without a free slot")
+
+    def release(self, seconds):
+        """
+        Free a slot - handed straight to the next waiting client, round-robin
+
+        Args:
+            seconds (float): How long the request held the slot (feeds the Retry-After estimate)
+        """
+        with self._lock:
+            if self._service_seconds is None:
+                self._service_seconds = seconds
+            else:
+                self._service_seconds = 0.8 * self._service_seconds + 0.2 * seconds
+
+            if not self._waiting:
+                self._active -= 1
+                return
+            client, queue = self._waiting.popitem(last=False)
+            waiter = queue.popleft()
+            if queue:
+                self._waiting[client] = queue
+            self._queued -= 1
+            waiter.admitted = True
+            waiter.event.set()
+
+    def _reject(self, outcome, reason):
+        """Count a rejection and build its exception (caller must hold the lock)"""
+        self._rejected += 1
+        ADMISSION_DECISIONS.labels(self.name, f"rejected_{outcome}").inc()
+        _shed_log.warning("Shedding %s request: %s (%d running, %d queued)",
+                          self.name, reason, self._active, self._queued)
+        return AdmissionRejected(self.name, reason, self._retry_after())
+
+    def _retry_after(self):
+        """Seconds until the current queue has likely drained (caller must hold the lock)"""
+        service = self._service_seconds if self._service_seconds is not None else 10.0
+        return min(600, max(1, math.ceil(service * (self._queued + 1) / self.max_concurrent)))
+
+    def stats(self):
+        """Get the limits and the current load"""
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'running': self._active,
+                'queued': self._queued,
+                'queued_clients': len(self._waiting),
+                'rejected': self._rejected,
+                'avg_service_seconds': round(self._service_seconds, 3) if self._service_seconds is not None else None
+            }
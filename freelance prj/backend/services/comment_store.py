@@ -0,0 +1,549 @@
+import base64
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from services.comment_utils import stable_comment_id, to_epoch
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS comments (
+    platform TEXT NOT NULL,
+    profile TEXT,
+    post_url TEXT NOT NULL,
+    comment_id TEXT NOT NULL,
+    username TEXT,
+    text TEXT,
+    timestamp INTEGER,
+    likes INTEGER,
+    sentiment TEXT NOT NULL,
+    confidence REAL,
+    topic TEXT,
+    model_version TEXT,
+    analyzed_at REAL NOT NULL,
+    PRIMARY KEY (platform, post_url, comment_id)
+);
+CREATE INDEX IF NOT EXISTS idx_comments_profile_timestamp ON comments (profile, timestamp);
+CREATE INDEX IF NOT EXISTS idx_comments_post ON comments (post_url);
+CREATE INDEX IF NOT EXISTS idx_comments_sentiment_topic ON comments (sentiment, topic);
+CREATE TABLE IF NOT EXISTS post_watermarks (
+    platform TEXT NOT NULL,
+    post_url TEXT NOT NULL,
+    profile TEXT,
+    latest_comment_ts INTEGER,
+    latest_comment_id TEXT,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    reported_comment_count INTEGER,
+    post_ts INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (platform, post_url)
+);
+CREATE INDEX IF NOT EXISTS idx_post_watermarks_profile ON post_watermarks (platform, profile);
+CREATE TABLE IF NOT EXISTS rollups (
+    platform TEXT NOT NULL,
+    profile TEXT,
+    bucket TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    sentiment TEXT NOT NULL,
+    topic TEXT NOT NULL DEFAULT '',
+    count INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rollups_key ON rollups (platform, profile, bucket, bucket_start, sentiment, topic);
+-- Covering index for trend reads, so a series is served straight from the index
+CREATE INDEX IF NOT EXISTS idx_rollups_series ON rollups (bucket, profile, bucket_start, sentiment, topic, count);
+CREATE TABLE IF NOT EXISTS monitored_profiles (
+    platform TEXT NOT NULL,
+    url TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    interval_seconds INTEGER NOT NULL,
+    max_posts INTEGER NOT NULL,
+    next_run_at REAL NOT NULL,
+    last_run_at REAL,
+    last_status TEXT,
+    PRIMARY KEY (platform, profile)
+);
+CREATE TABLE IF NOT EXISTS profile_watermarks (
+    platform TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    latest_post_ts INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (platform, profile)
+);
+"""
+
+# Pre-aggregated rollup granularities (bucket name -> size in seconds)
+ROLLUP_BUCKETS = {'hour': 3600, 'day': 86400}
+
+INSERT_SQL = """
+INSERT OR REPLACE INTO comments (
+    platform, profile, post_url, comment_id, username, text, timestamp, likes,
+    sentiment, confidence, topic, model_version, analyzed_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class CommentStore:
+    """
+    Persistent SQLite store of analyzed comments for historical queries and re-aggregation
+    """
+
+    def __init__(self, db_path):
+        """
+        Open (and create if needed) the comment database
+
+        Args:
+            db_path (str): Path of the SQLite database file
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        # Databases created before post timestamps were recorded
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(post_watermarks)")}
+        if 'post_ts' not in columns:
+            conn.execute("ALTER TABLE post_watermarks ADD COLUMN post_ts INTEGER")
+        conn.commit()
+        logger.info(f"Comment store ready at {db_path}")
+
+    def _connection(self):
+        """Get this thread's connection (sqlite connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection, e.g. before forking worker processes (reopened on next use)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def save_comments(self, comments, platform, profile=None, model_version=None):
+        """
+        Bulk insert analyzed comments (re-analyzed comments replace their previous row)
+
+        Args:
+            comments (iterable): Analyzed comment dictionaries (with 'post_url' and 'sentiment')
+            platform (str): 'instagram' or 'facebook'
+            profile (str): Normalized profile/page URL, if known
+            model_version (str): Sentiment model used for the labels
+
+        Returns:
+            int: Number of rows written
+        """
+        analyzed_at = time.time()
+        rows = [
+            (
+                platform,
+                profile,
+                comment.get('post_url', ''),
+                stable_comment_id(comment),
+                comment.get('username'),
+                comment.get('text'),
+                to_epoch(comment.get('timestamp')),
+                comment.get('likes') or 0,
+                comment.get('sentiment', 'neutral'),
+                comment.get('confidence'),
+                comment.get('topic'),
+                model_version,
+                analyzed_at
+            )
+            for comment in comments
+        ]
+
+        conn = self._connection()
+        with conn:
+            # Rows being replaced may have been stored under another profile - refresh their rollups too
+            post_urls = list({row[2] for row in rows})
+            affected_profiles = {profile}
+            for start in range(0, len(post_urls), 500):
+                chunk = post_urls[start:start + 500]
+                affected_profiles.update(
+                    r[0] for r in conn.execute(
+                        f"SELECT DISTINCT profile FROM comments WHERE platform = ? "
+                        f"AND post_url IN ({', '.join('?' * len(chunk))})",
+                        [platform] + chunk
+                    )
+                )
+
+            conn.executemany(INSERT_SQL, rows)
+
+            timestamps = {row[6] for row in rows if row[6] is not None}
+            for affected_profile in affected_profiles:
+                self._rebuild_rollups(conn, platform, affected_profile, timestamps)
+
+        logger.info(f"Stored {len(rows)} analyzed comments for {profile or platform}")
+        return len(rows)
+
+    def _rebuild_rollups(self, conn, platform, profile, timestamps):
+        """
+        Recompute the hourly/daily rollup buckets touched by a batch of comment timestamps
+
+        Recomputing from the comments table (instead of incrementing) keeps rollups exact
+        when re-analyzed comments replace earlier rows.
+        """
+        if not timestamps:
+            return
+        for bucket, size in ROLLUP_BUCKETS.items():
+            starts = sorted({ts - ts % size for ts in timestamps})
+            for offset in range(0, len(starts), 500):
+                chunk = starts[offset:offset + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                conn.execute(
+                    f"DELETE FROM rollups WHERE platform = ? AND profile IS ? AND bucket = ? "
+                    f"AND bucket_start IN ({placeholders})",
+                    [platform, profile, bucket] + chunk
+                )
+                conn.execute(
+                    f"INSERT INTO rollups (platform, profile, bucket, bucket_start, sentiment, topic, count) "
+                    f"SELECT platform, profile, ?, timestamp - timestamp % ?, sentiment, COALESCE(topic, ''), COUNT(*) "
+                    f"FROM comments WHERE platform = ? AND profile IS ? AND timestamp >= ? AND timestamp < ? "
+                    f"AND timestamp - timestamp % ? IN ({placeholders}) "
+                    f"GROUP BY timestamp - timestamp % ?, sentiment, COALESCE(topic, '')",
+                    [bucket, size, platform, profile, chunk[0], chunk[-1] + size, size] + chunk + [size]
+                )
+
+    def query_rollups(self, bucket, platform=None, profile=None, since=None, until=None):
+        """
+        Read pre-aggregated sentiment/topic counts
+
+        Args:
+            bucket (str): 'hour' or 'day'
+            platform (str): Optional platform filter
+            profile (str): Optional normalized profile/page URL
+            since (int): Optional inclusive start (unix seconds)
+            until (int): Optional exclusive end (unix seconds)
+
+        Returns:
+            list: (bucket_start, sentiment, topic, count) tuples, unordered and not summed
+                  across platforms/profiles - callers group them (see services.trends)
+        """
+        clauses = ["bucket = ?"]
+        params = [bucket]
+        if platform:
+            clauses.append("platform = ?")
+            params.append(platform)
+        if profile:
+            clauses.append("profile = ?")
+            params.append(profile)
+        if since is not None:
+            clauses.append("bucket_start >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("bucket_start < ?")
+            params.append(until)
+        return self._connection().execute(
+            f"SELECT bucket_start, sentiment, topic, count FROM rollups WHERE {' AND '.join(clauses)}",
+            params
+        ).fetchall()
+
+    def _where(self, profile=None, post_url=None, sentiment=None, topic=None,
+               since=None, until=None, platform=None, post_urls=None):
+        """Build a WHERE clause and its parameters from optional filters"""
+        clauses = []
+        params = []
+        for column, value in (('platform', platform), ('profile', profile), ('post_url', post_url),
+                              ('sentiment', sentiment), ('topic', topic)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if post_urls is not None:
+            clauses.append(f"post_url IN ({', '.join('?' * len(post_urls))})" if post_urls else "0")
+            params.extend(post_urls)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return where, params
+
+    def query_comments(self, limit=100, cursor=None, **filters):
+        """
+        Get stored comments, newest first (comments without a timestamp last)
+
+        Args:
+            limit (int): Maximum rows returned
+            cursor (str): Opaque cursor from a previous page (keyset on timestamp and rowid,
+                          so rows sharing the boundary timestamp are not skipped)
+            **filters: profile, post_url, sentiment, topic, since, until, platform
+
+        Returns:
+            dict: Page with 'comments', 'count' and 'next_cursor' (None on the last page)
+        """
+        where, params = self._where(**filters)
+        if cursor:
+            timestamp, rowid = self.decode_cursor(cursor)
+            if timestamp is None:
+                keyset = "timestamp IS NULL AND rowid < ?"
+                keyset_params = [rowid]
+            else:
+                keyset = "(timestamp < ? OR (timestamp = ? AND rowid < ?) OR timestamp IS NULL)"
+                keyset_params = [timestamp, timestamp, rowid]
+            where = f"{where} AND {keyset}" if where else f"WHERE {keyset}"
+            params = params + keyset_params
+        rows = self._connection().execute(
+            f"SELECT rowid AS _rowid, * FROM comments {where} "
+            f"ORDER BY timestamp IS NULL, timestamp DESC, rowid DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        comments = [dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = self.encode_cursor(comments[-1]['timestamp'], comments[-1]['_rowid'])
+        for comment in comments:
+            del comment['_rowid']
+        return {
+            'comments': comments,
+            'count': len(comments),
+            'next_cursor': next_cursor
+        }
+
+    @staticmethod
+    def encode_cursor(timestamp, rowid):
+        """Encode the (timestamp, rowid) of the last row of a page as an opaque cursor"""
+        position = f"{'' if timestamp is None else timestamp}:{rowid}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Decode an opaque cursor back to (timestamp or None, rowid)"""
+        try:
+            timestamp, rowid = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+            return (int(timestamp) if timestamp else None), int(rowid)
+        except Exception:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    def aggregate(self, **filters):
+        """
+        Re-aggregate sentiment and topic counts from stored comments
+
+        Args:
+            **filters: profile, post_url, post_urls, sentiment, topic, since, until, platform
+
+        Returns:
+            dict: total_comments, sentiment counts, topic_stats and per-post breakdown
+        """
+        conn = self._connection()
+        where, params = self._where(**filters)
+
+        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        for row in conn.execute(f"SELECT sentiment, COUNT(*) FROM comments {where} GROUP BY sentiment", params):
+            sentiment_counts[row[0]] = row[1]
+
+        topic_where = f"{where} AND sentiment = 'negative'" if where else "WHERE sentiment = 'negative'"
+        topic_stats = {
+            (row[0] or 'Other'): row[1]
+            for row in conn.execute(f"SELECT topic, COUNT(*) FROM comments {topic_where} GROUP BY topic", params)
+        }
+
+        posts = {}
+        for row in conn.execute(
+            f"SELECT post_url, sentiment, COUNT(*) FROM comments {where} GROUP BY post_url, sentiment", params
+        ):
+            breakdown = posts.setdefault(row[0], {'positive': 0, 'negative': 0, 'neutral': 0})
+            breakdown[row[1]] = row[2]
+
+        return {
+            'total_comments': sum(sentiment_counts.values()),
+            'sentiment_counts': sentiment_counts,
+            'topic_stats': topic_stats,
+            'posts': [
+                {'post_url': post_url, 'total_comments': sum(b.values()), 'sentiment_breakdown': b}
+                for post_url, b in posts.items()
+            ]
+        }
+
+    def load_comments(self, platform, post_urls):
+        """
+        Load stored comments of some posts in the shape produced by the analyze pipeline
+
+        Args:
+            platform (str): 'instagram' or 'facebook'
+            post_urls (list): Post URLs
+
+        Returns:
+            list: Comment dictionaries (id, text, username, timestamp, likes, post_url, sentiment, confidence, topic)
+        """
+        where, params = self._where(platform=platform, post_urls=list(post_urls))
+        rows = self._connection().execute(
+            f"SELECT comment_id, text, username, timestamp, likes, post_url, sentiment, confidence, topic "
+            f"FROM comments {where}",
+            params
+        )
+        comments = []
+        for row in rows:
+            comment = {
+                'id': row[0],
+                'text': row[1],
+                'username': row[2],
+                'timestamp': row[3],
+                'likes': row[4],
+                'post_url': row[5],
+                'sentiment': row[6],
+                'confidence': row[7]
+            }
+            if row[8]:
+                comment['topic'] = row[8]
+            comments.append(comment)
+        return comments
+
+    def known_comment_ids(self, platform, post_url):
+        """
+        Get the ids of comments already stored for a post
+
+        Args:
+            platform (str): 'instagram' or 'facebook'
+            post_url (str): Post URL
+
+        Returns:
+            set: Comment ids
+        """
+        rows = self._connection().execute(
+            "SELECT comment_id FROM comments WHERE platform = ? AND post_url = ?",
+            (platform, post_url)
+        )
+        return {row[0] for row in rows}
+
+    def get_post_watermarks(self, platform, profile):
+        """
+        Get the per-post watermarks recorded for a profile/page
+
+        Args:
+            platform (str): 'instagram' or 'facebook'
+            profile (str): Normalized profile/page URL
+
+        Returns:
+            dict: post_url -> watermark dict (latest_comment_ts, latest_comment_id,
+                  comment_count, reported_comment_count, post_ts, updated_at)
+        """
+        rows = self._connection().execute(
+            "SELECT * FROM post_watermarks WHERE platform = ? AND profile = ?",
+            (platform, profile)
+        )
+        return {row['post_url']: dict(row) for row in rows}
+
+    def get_profile_watermark(self, platform, profile):
+        """
+        Get the profile-level watermark (latest post timestamp seen)
+
+        Returns:
+            dict: Watermark row, or None if the profile was never analyzed
+        """
+        row = self._connection().execute(
+            "SELECT * FROM profile_watermarks WHERE platform = ? AND profile = ?",
+            (platform, profile)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def update_watermarks(self, platform, profile, posts):
+        """
+        Recompute post watermarks from the stored comments and advance the profile watermark
+
+        Args:
+            platform (str): 'instagram' or 'facebook'
+            profile (str): Normalized profile/page URL
+            posts (list): Dictionaries with 'post_url', optional 'reported_comments_count' and 'post_timestamp'
+        """
+        conn = self._connection()
+        now = time.time()
+        latest_post_ts = None
+
+        with conn:
+            for post in posts:
+                post_url = post['post_url']
+                count, latest_ts = conn.execute(
+                    "SELECT COUNT(*), MAX(timestamp) FROM comments WHERE platform = ? AND post_url = ?",
+                    (platform, post_url)
+                ).fetchone()
+                latest = conn.execute(
+                    "SELECT comment_id FROM comments WHERE platform = ? AND post_url = ? "
+                    "ORDER BY timestamp DESC LIMIT 1",
+                    (platform, post_url)
+                ).fetchone()
+                post_ts = to_epoch(post.get('post_timestamp'))
+                conn.execute(
+                    "INSERT OR REPLACE INTO post_watermarks (platform, post_url, profile, latest_comment_ts, "
+                    "latest_comment_id, comment_count, reported_comment_count, post_ts, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (platform, post_url, profile, latest_ts, latest[0] if latest else None,
+                     count, post.get('reported_comments_count'), post_ts, now)
+                )
+
+                if post_ts is not None and (latest_post_ts is None or post_ts > latest_post_ts):
+                    latest_post_ts = post_ts
+
+            previous = self.get_profile_watermark(platform, profile)
+            if previous and previous['latest_post_ts'] is not None:
+                latest_post_ts = max(latest_post_ts or 0, previous['latest_post_ts'])
+            conn.execute(
+                "INSERT OR REPLACE INTO profile_watermarks (platform, profile, latest_post_ts, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (platform, profile, latest_post_ts, now)
+            )
+
+    def add_monitored_profile(self, platform, url, profile, interval_seconds, max_posts, next_run_at):
+        """Register (or update) a profile/page for scheduled monitoring"""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO monitored_profiles (platform, url, profile, interval_seconds, max_posts, next_run_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (platform, profile) DO UPDATE SET url = excluded.url, "
+                "interval_seconds = excluded.interval_seconds, max_posts = excluded.max_posts, "
+                "next_run_at = excluded.next_run_at",
+                (platform, url, profile, interval_seconds, max_posts, next_run_at)
+            )
+
+    def remove_monitored_profile(self, platform, profile):
+        """Stop monitoring a profile/page; returns True if it was registered"""
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM monitored_profiles WHERE platform = ? AND profile = ?",
+                (platform, profile)
+            )
+        return cursor.rowcount > 0
+
+    def list_monitored_profiles(self, due_before=None):
+        """
+        List monitored profiles/pages
+
+        Args:
+            due_before (float): Only profiles whose next run is at or before this time
+
+        Returns:
+            list: Monitored profile dictionaries
+        """
+        if due_before is None:
+            rows = self._connection().execute("SELECT * FROM monitored_profiles ORDER BY next_run_at")
+        else:
+            rows = self._connection().execute(
+                "SELECT * FROM monitored_profiles WHERE next_run_at <= ? ORDER BY next_run_at",
+                (due_before,)
+            )
+        return [dict(row) for row in rows]
+
+    def mark_monitor_run(self, platform, profile, status, next_run_at):
+        """Record the outcome of a scheduled run and when the next one is due"""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE monitored_profiles SET last_run_at = ?, last_status = ?, next_run_at = ? "
+                "WHERE platform = ? AND profile = ?",
+                (time.time(), status, next_run_at, platform, profile)
+            )
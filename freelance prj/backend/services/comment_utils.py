@@ -0,0 +1,53 @@
+import hashlib
+from datetime import datetime, timezone
+
+def stable_comment_id(comment, post_url=None):
+    """
+    Id of a scraped comment: the platform's id when the actor returned one, otherwise a
+    hash of its post, author, timestamp and text - the same comment gets the same id in
+    every run, and different comments never share a positional placeholder
+
+    Args:
+        comment (dict): Comment with optional 'id', 'username', 'timestamp' and 'text'
+        post_url (str): Post the comment belongs to (default: the comment's 'post_url')
+
+    Returns:
+        str: Comment id
+    """
+    platform_id = comment.get('id')
+    if platform_id is not None and platform_id != '':
+        return str(platform_id)
+    parts = (post_url or comment.get('post_url'), comment.get('username'), comment.get('timestamp'), comment.get('text'))
+    digest = hashlib.sha1('\x1f'.join('' if part is None else str(part) for part in parts).encode('utf-8'))
+    return f"h_{digest.hexdigest()[:24]}"
+
+def to_epoch(value):
+    """
+    Convert a scraped timestamp (ISO string, date string or unix seconds/ms) to unix seconds
+
+    Args:
+        value: Timestamp as returned by the scrapers
+
+    Returns:
+        int: Unix seconds, or None if it cannot be parsed
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        # Millisecond timestamps are common in Facebook datasets
+        return int(value / 1000) if value > 1e11 else int(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.isdigit():
+            return to_epoch(int(text))
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            try:
+                parsed = datetime.strptime(text, '%Y-%m-%d')
+            except ValueError:
+                return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+    return None
@@ -0,0 +1,47 @@
+import time
+
+class DeadlineExceeded(Exception):
+    """Raised when a step cannot finish within its share of the request deadline"""
+
+class Deadline:
+    """
+    Time budget of one request. Stages and steps take a share of it (a child deadline that
+    never ends after its parent), so one slow step cannot use up the time of the steps after it.
+    """
+
+    def __init__(self, seconds):
+        """
+        Start the budget now
+
+        Args:
+            seconds (float): Seconds until the deadline
+        """
+        self.seconds = max(0.0, seconds)
+        self.started = time.monotonic()
+        self.expires_at = self.started + self.seconds
+
+    def remaining(self):
+        """Seconds left, 0 once expired"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def until(self, fraction):
+        """
+        Child deadline for a stage that ends once `fraction` of the whole budget has elapsed,
+        keeping the rest for the stages after it
+
+        Args:
+            fraction (float): Share of the total budget, counted from the start (0..1)
+        """
+        return Deadline(self.started + self.seconds * fraction - time.monotonic())
+
+    def share(self, fraction):
+        """
+        Child deadline for a step that may use `fraction` of the time left
+
+        Args:
+            fraction (float): Share of the remaining time (0..1)
+        """
+        return Deadline(self.remaining() * min(1.0, fraction))
@@ -0,0 +1,221 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Optional dependency - exports are unavailable without it
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows')
+}
+
+def _comment_schema():
+    return pa.schema([
+        ('id', pa.string()),
+        ('post_url', pa.string()),
+        ('username', pa.string()),
+        ('text', pa.string()),
+        ('timestamp', pa.string()),
+        ('likes', pa.int64()),
+        ('sentiment', pa.dictionary(pa.int32(), pa.string())),
+        ('confidence', pa.float64()),
+        ('topic', pa.dictionary(pa.int32(), pa.string())),
+        ('duplicate_cluster_size', pa.int64())
+    ])
+
+def _post_schema():
+    return pa.schema([
+        ('post_url', pa.string()),
+        ('post_date', pa.string()),
+        ('total_comments', pa.int64()),
+        ('positive', pa.int64()),
+        ('negative', pa.int64()),
+        ('neutral', pa.int64())
+    ])
+
+def _text(value):
+    return None if value is None else str(value)
+
+def _int(value):
+    try:
+        return None if value is None or value == '' else int(value)
+    except (TypeError, ValueError):
+        return None
+
+# Column name -> how to read it from an analyzed comment dictionary
+COMMENT_COLUMNS = (
+    ('id', lambda c: _text(c.get('id'))),
+    ('post_url', lambda c: c.get('post_url')),
+    ('username', lambda c: _text(c.get('username'))),
+    ('text', lambda c: c.get('text')),
+    ('timestamp', lambda c: _text(c.get('timestamp'))),
+    ('likes', lambda c: _int(c.get('likes'))),
+    ('sentiment', lambda c: c.get('sentiment')),
+    ('confidence', lambda c: c.get('confidence')),
+    ('topic', lambda c: c.get('topic')),
+    ('duplicate_cluster_size', lambda c: c.get('duplicate_cluster_size'))
+)
+
+def require_pyarrow():
+    """Raise a clear error when pyarrow is not installed"""
+    if pa is None:
+        raise RuntimeError('pyarrow is required for Parquet/Arrow exports (pip install pyarrow)')
+
+def iter_comment_batches(comments, batch_size=50000):
+    """
+    Build Arrow record batches column by column from an iterable of analyzed comments
+
+    Args:
+        comments (iterable): Analyzed comment dictionaries (a generator keeps memory flat)
+        batch_size (int): Rows per record batch
+
+    Yields:
+        pyarrow.RecordBatch: Comment batches
+    """
+    require_pyarrow()
+    schema = _comment_schema()
+    columns = [[] for _ in COMMENT_COLUMNS]
+    getters = [getter for _, getter in COMMENT_COLUMNS]
+
+    for comment in comments:
+        for column, getter in zip(columns, getters):
+            column.append(getter(comment))
+        if len(columns[0]) >= batch_size:
+            yield _batch(columns, schema)
+            columns = [[] for _ in COMMENT_COLUMNS]
+
+    if columns[0]:
+        yield _batch(columns, schema)
+
+def iter_post_batches(posts_analysis):
+    """
+    Build an Arrow record batch of per-post sentiment breakdowns
+
+    Args:
+        posts_analysis (list): 'posts_analysis' entries from an analysis summary
+
+    Yields:
+        pyarrow.RecordBatch: One batch with the flattened breakdowns
+    """
+    require_pyarrow()
+    columns = [[] for _ in range(6)]
+    for post in posts_analysis or []:
+        breakdown = post.get('sentiment_breakdown', {})
+        for column, value in zip(columns, (
+            post.get('post_url'), _text(post.get('post_date')), post.get('total_comments', 0),
+            breakdown.get('positive', 0), breakdown.get('negative', 0), breakdown.get('neutral', 0)
+        )):
+            column.append(value)
+    if columns[0]:
+        yield _batch(columns, _post_schema())
+
+def _batch(columns, schema):
+    arrays = []
+    for values, field in zip(columns, schema):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def schema_for(table):
+    """Arrow schema of an export table ('comments' or 'posts')"""
+    require_pyarrow()
+    return _post_schema() if table == 'posts' else _comment_schema()
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def _open_writer(sink, schema, export_format):
+    if export_format == 'arrow':
+        return pa.ipc.new_stream(sink, schema)
+    return pq.ParquetWriter(sink, schema, compression='zstd')
+
+def iter_export(batches, schema, export_format='parquet'):
+    """
+    Encode record batches as a streamed Parquet file or Arrow IPC stream
+
+    Every batch is written (one Parquet row group per batch) and its bytes are yielded
+    right away, so memory holds at most one batch.
+
+    Args:
+        batches (iterable): pyarrow.RecordBatch objects
+        schema (pyarrow.Schema): Schema shared by the batches
+        export_format (str): 'parquet' or 'arrow'
+
+    Yields:
+        bytes: Encoded chunks
+    """
+    require_pyarrow()
+    sink = _ChunkSink()
+    writer = _open_writer(sink, schema, export_format)
+    rows = 0
+    for batch in batches:
+        writer.write_batch(batch)
+        rows += batch.num_rows
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+    logger.info(f"Exported {rows} rows as {export_format}")
+
+def export_comments(comments, path, export_format='parquet', batch_size=50000):
+    """
+    Write analyzed comments to a Parquet file or Arrow IPC stream file
+
+    Args:
+        comments (iterable): Analyzed comment dictionaries
+        path (str): Output file path
+        export_format (str): 'parquet' or 'arrow'
+        batch_size (int): Rows per record batch / row group
+
+    Returns:
+        str: The output path
+    """
+    with open(path, 'wb') as f:
+        for chunk in iter_export(iter_comment_batches(comments, batch_size), schema_for('comments'), export_format):
+            f.write(chunk)
+    return path
+
+def export_posts(posts_analysis, path, export_format='parquet'):
+    """
+    Write per-post sentiment breakdowns to a Parquet file or Arrow IPC stream file
+
+    Args:
+        posts_analysis (list): 'posts_analysis' entries from an analysis summary
+        path (str): Output file path
+        export_format (str): 'parquet' or 'arrow'
+
+    Returns:
+        str: The output path
+    """
+    with open(path, 'wb') as f:
+        for chunk in iter_export(iter_post_batches(posts_analysis), schema_for('posts'), export_format):
+            f.write(chunk)
+    return path
@@ -3,24 +3,74 @@ import logging
 import time
 from datetime import datetime
 
+from services.comment_utils import stable_comment_id
+from services.deadline import DeadlineExceeded
+from services.metrics import ACTOR_RUN_SECONDS, ACTOR_RUNS, DATASET_FETCH_SECONDS, timed_iter
+from services.structured_logging import SampledLog
+
 logger = logging.getLogger(__name__)
+# Per-item warnings can repeat for every item of a large dataset
+_timestamp_log = SampledLog(logger, every=100)
 
 class FacebookScraper:
     """
     Facebook scraper using Apify API - supports posts, pages, groups, and profiles
     """
     
-    def __init__(self, api_key):
+    def __init__(self, api_key, rate_limiter=None, client=None):
         """
         Initialize Apify client
         
         Args:
             api_key (str): Apify API key
+            rate_limiter (RateLimiter): Optional budget shared with other scrapers - every
+                actor run waits for it
+            client: Optional ApifyClient-compatible client (e.g. FakeApifyClient for offline
+                benchmarks) - a live ApifyClient is created from api_key when omitted
         """
-        self.client = ApifyClient(api_key)
+        self.client = client if client is not None else ApifyClient(api_key)
+        self.rate_limiter = rate_limiter
         # Using the page scraper which works better for public pages
         self.actor_id = 'apify/facebook-pages-scraper'  # Facebook pages scraper actor
     
+    def _wait_for_budget(self):
+        """Wait for the shared actor-call budget, if one is configured"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+    
+    def _run_actor(self, actor_id, run_input, deadline=None):
+        """
+        Run an actor within the shared budget, recording its duration and outcome
+
+        Raises:
+            DeadlineExceeded: The deadline left under a second, or the run did not finish in time
+        """
+        self._wait_for_budget()
+        options = {}
+        if deadline is not None:
+            seconds = int(deadline.remaining())
+            if seconds < 1:
+                raise DeadlineExceeded(f"no time left to run {actor_id}")
+            # Apify aborts the run after timeout_secs; wait_secs bounds how long call() blocks
+            options = {'timeout_secs': seconds, 'wait_secs': seconds}
+        started = time.perf_counter()
+        try:
+            run = self.client.actor(actor_id).call(run_input=run_input, **options)
+        except Exception:
+            ACTOR_RUNS.labels(actor_id, 'error').inc()
+            raise
+        if deadline is not None and (run is None or run.get('status') != 'SUCCEEDED'):
+            ACTOR_RUNS.labels(actor_id, 'timeout').inc()
+            raise DeadlineExceeded(f"{actor_id} did not finish within {options['timeout_secs']}s")
+        ACTOR_RUN_SECONDS.labels(actor_id).observe(time.perf_counter() - started)
+        ACTOR_RUNS.labels(actor_id, 'success').inc()
+        return run
+    
+    def _dataset_items(self, run, actor_id):
+        """Iterate a run's dataset, recording the time spent fetching it"""
+        return timed_iter(self.client.dataset(run["defaultDatasetId"]).iterate_items(),
+                          DATASET_FETCH_SECONDS.labels(actor_id))
+    
     def scrape_single_post(self, post_url, max_comments=1000):
         """
         Scrape comments from a single Facebook post (from any source: group, page, profile, public post)
@@ -47,14 +97,14 @@ class FacebookScraper:
             
             logger.info(f"Requesting up to {max_comments} comments with actor: {self.actor_id}")
             
-            run = self.client.actor(self.actor_id).call(run_input=run_input)
+            run = self._run_actor(self.actor_id, run_input)
             
             # Fetch results from the dataset
             comments = []
             logger.info("Fetching comment data from dataset...")
             
             items_count = 0
-            for item in self.client.dataset(run["defaultDatasetId"]).iterate_items():
+            for item in self._dataset_items(run, self.actor_id):
                 items_count += 1
                 
                 # Check for errors from Apify
@@ -64,7 +114,8 @@ class FacebookScraper:
                     logger.error(f"This usually means: 1) Post is private/restricted, 2) Post deleted, 3) Need Facebook login cookies")
                     raise Exception(f"Cannot access Facebook post: {error_msg}")
                 
-                logger.debug(f"Processing dataset item {items_count} with keys: {list(item.keys())}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Processing dataset item %d with keys: %s", items_count, list(item.keys()))
                 
                 # Get comments from the post - try multiple possible structures
                 post_comments = item.get('comments', [])
@@ -84,7 +135,7 @@ class FacebookScraper:
                     
                     if comment_text and len(comment_text.strip()) > 0:
                         comment_data = {
-                            'id': comment_item.get('id', f"fb_comment_{len(comments)}"),
+                            'id': comment_item.get('id'),
                             'text': comment_text.strip(),
                             'username': (comment_item.get('name') or 
                                        comment_item.get('author', {}).get('name') or
@@ -96,6 +147,7 @@ class FacebookScraper:
                                         comment_item.get('timestamp') or
                                         comment_item.get('date') or '')
                         }
+                        comment_data['id'] = stable_comment_id(comment_data, post_url)
                         comments.append(comment_data)
             
             if len(comments) == 0:
@@ -109,7 +161,7 @@ class FacebookScraper:
             logger.error(f"Error scraping Facebook post: {str(e)}")
             raise  # Re-raise to let the API endpoint handle it properly
         
-    def scrape_posts_bulk(self, url, from_date=None, max_posts=50):
+    def scrape_posts_bulk(self, url, from_date=None, max_posts=50, deadline=None):
         """
         Scrape posts from Facebook (groups, pages, or profiles) from a specific date onwards
         
@@ -117,113 +169,154 @@ class FacebookScraper:
             url (str): Facebook URL (group, page, or profile)
             from_date (str): Start date in format 'YYYY-MM-DD' (e.g., '2024-01-15')
             max_posts (int): Maximum number of posts to scrape
+            deadline (Deadline): Optional time limit for the actor run
             
         Returns:
             list: List of post data with URLs and dates
+            
+        Raises:
+            DeadlineExceeded: The scraper did not finish before the deadline
         """
         try:
-            logger.info(f"Scraping Facebook URL: {url} from date: {from_date}")
-            
-            # Parse the from_date if provided
-            cutoff_date = None
-            if from_date:
-                try:
-                    cutoff_date = datetime.strptime(from_date, '%Y-%m-%d')
-                    logger.info(f"Filtering posts from {cutoff_date.strftime('%Y-%m-%d')} onwards")
-                except ValueError:
-                    logger.error(f"Invalid date format: {from_date}. Expected YYYY-MM-DD")
-                    return []
+            return list(self.iter_posts_bulk(url, from_date, max_posts, deadline))
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error scraping Facebook group posts: {str(e)}")
+            return []
+    
+    def iter_posts_bulk(self, url, from_date=None, max_posts=50, deadline=None):
+        """
+        Run the Facebook scraper and yield its posts while its dataset is read page by page
+        
+        The actor returns posts together with their comments (capped per post), so one run
+        has to finish before any post is yielded - but only the page being read and the
+        caller's current post are held in memory.
+        
+        Args:
+            url (str): Facebook URL (group, page, or profile)
+            from_date (str): Start date in format 'YYYY-MM-DD' (e.g., '2024-01-15')
+            max_posts (int): Maximum number of posts to yield
+            deadline (Deadline): Optional time limit for the actor run
             
-            # Prepare input for Facebook scraper (works for groups, pages, profiles)
-            run_input = {
-                "startUrls": [url],
-                "maxPosts": max_posts * 2,  # Get more to filter by date
-                "maxPostComments": 100,  # Comments per post
-                "scrapeComments": True,
-                "scrapeReviews": False,
-                "scrapeServices": False
-            }
+        Yields:
+            dict: Post with 'post_url', 'post_date', 'post_timestamp', 'reported_comments_count',
+                  'comments' and 'comments_count'
             
-            logger.info(f"Running Facebook scraper with actor: {self.actor_id}")
-            run = self.client.actor(self.actor_id).call(run_input=run_input)
+        Raises:
+            DeadlineExceeded: The scraper did not finish before the deadline
+            Exception: The actor run or a dataset page failed (posts already yielded stay valid)
+        """
+        logger.info(f"Scraping Facebook URL: {url} from date: {from_date}")
+        
+        # Parse the from_date if provided
+        cutoff_date = None
+        if from_date:
+            try:
+                cutoff_date = datetime.strptime(from_date, '%Y-%m-%d')
+                logger.info(f"Filtering posts from {cutoff_date.strftime('%Y-%m-%d')} onwards")
+            except ValueError:
+                logger.error(f"Invalid date format: {from_date}. Expected YYYY-MM-DD")
+                return
+        
+        # Prepare input for Facebook scraper (works for groups, pages, profiles)
+        run_input = {
+            "startUrls": [url],
+            "maxPosts": max_posts * 2,  # Get more to filter by date
+            "maxPostComments": 100,  # Comments per post
+            "scrapeComments": True,
+            "scrapeReviews": False,
+            "scrapeServices": False
+        }
+        
+        logger.info(f"Running Facebook scraper with actor: {self.actor_id}")
+        run = self._run_actor(self.actor_id, run_input, deadline)
+        
+        found = 0
+        logger.info("Fetching posts from dataset...")
+        for item in self._dataset_items(run, self.actor_id):
+            post = self._parse_post(item, cutoff_date)
+            if post is None:
+                continue
+            yield post
+            found += 1
             
-            # Fetch posts from dataset
-            posts = []
-            logger.info("Fetching posts from dataset...")
+            if found >= max_posts:
+                logger.info(f"Reached max_posts limit of {max_posts}")
+                break
+        
+        logger.info(f"Found {found} posts from {from_date or 'all time'}")
+    
+    def _parse_post(self, item, cutoff_date):
+        """
+        Convert a dataset item into a post with its comments
+        
+        Args:
+            item (dict): Post from the actor's dataset
+            cutoff_date (datetime): Optional earliest post date
             
-            for item in self.client.dataset(run["defaultDatasetId"]).iterate_items():
-                # Extract post URL and timestamp
-                post_url = item.get('url', item.get('postUrl', ''))
-                timestamp = item.get('time', item.get('timestamp', item.get('created_time', '')))
-                comments = item.get('comments', [])
-                
-                # Parse timestamp if available
-                post_date = None
-                if timestamp:
+        Returns:
+            dict: Post, or None if it is older than cutoff_date
+        """
+        # Extract post URL and timestamp
+        post_url = item.get('url', item.get('postUrl', ''))
+        timestamp = item.get('time', item.get('timestamp', item.get('created_time', '')))
+        comments = item.get('comments', [])
+        
+        # Parse timestamp if available
+        post_date = None
+        if timestamp:
+            try:
+                if isinstance(timestamp, str):
+                    # Try ISO format
                     try:
-                        if isinstance(timestamp, str):
-                            # Try ISO format
-                            try:
-                                post_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                            except:
-                                try:
-                                    post_date = datetime.strptime(timestamp, '%Y-%m-%d')
-                                except:
-                                    logger.warning(f"Could not parse string timestamp: {timestamp}")
-                        elif isinstance(timestamp, (int, float)):
-                            post_date = datetime.fromtimestamp(timestamp)
-                    except Exception as e:
-                        logger.warning(f"Error parsing timestamp {timestamp}: {str(e)}")
-                
-                logger.debug(f"Post URL: {post_url}, Date: {post_date}, Comments: {len(comments)}")
-                
-                # Filter by date if cutoff_date is provided
-                include_post = False
-                if cutoff_date and post_date:
-                    if post_date >= cutoff_date:
-                        include_post = True
-                        logger.info(f"Including post from {post_date.strftime('%Y-%m-%d')}")
-                    else:
-                        logger.debug(f"Skipping post from {post_date.strftime('%Y-%m-%d')}")
-                elif not cutoff_date:
-                    include_post = True
-                else:
-                    logger.warning(f"Post {post_url} has no date, including anyway")
-                    include_post = True
-                
-                if include_post:
-                    # Process comments
-                    processed_comments = []
-                    for comment in comments:
-                        comment_text = comment.get('text', comment.get('message', ''))
-                        if comment_text and len(comment_text.strip()) > 0:
-                            processed_comments.append({
-                                'id': comment.get('id', f"comment_{len(processed_comments)}"),
-                                'text': comment_text,
-                                'username': comment.get('author', {}).get('name', comment.get('from', {}).get('name', 'unknown')),
-                                'timestamp': comment.get('time', comment.get('created_time', '')),
-                                'likes': comment.get('likes', comment.get('like_count', 0))
-                            })
-                    
-                    posts.append({
-                        'post_url': post_url,
-                        'post_date': post_date.strftime('%Y-%m-%d') if post_date else 'unknown',
-                        'comments': processed_comments,
-                        'comments_count': len(processed_comments)
-                    })
-                
-                if len(posts) >= max_posts:
-                    logger.info(f"Reached max_posts limit of {max_posts}")
-                    break
-            
-            logger.info(f"Found {len(posts)} posts from {from_date or 'all time'}")
-            return posts
-            
-        except Exception as e:
-            logger.error(f"Error scraping Facebook group posts: {str(e)}")
-            return []
+                        post_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                    except:
+                        try:
+                            post_date = datetime.strptime(timestamp, '%Y-%m-%d')
+                        except:
+                            _timestamp_log.warning("Could not parse string timestamp: %s", timestamp)
+                elif isinstance(timestamp, (int, float)):
+                    post_date = datetime.fromtimestamp(timestamp)
+            except Exception as e:
+                _timestamp_log.warning("Error parsing timestamp %s: %s", timestamp, e)
+        
+        logger.debug("Post URL: %s, Date: %s, Comments: %d", post_url, post_date, len(comments))
+        
+        # Filter by date if cutoff_date is provided
+        if cutoff_date and post_date:
+            if post_date < cutoff_date:
+                logger.debug("Skipping post from %s", post_date.date())
+                return None
+            logger.debug("Including post from %s", post_date.date())
+        elif cutoff_date:
+            _timestamp_log.warning("Post %s has no date, including anyway", post_url)
+        
+        # Process comments
+        processed_comments = []
+        for comment in comments:
+            comment_text = comment.get('text', comment.get('message', ''))
+            if comment_text and len(comment_text.strip()) > 0:
+                comment_data = {
+                    'id': comment.get('id'),
+                    'text': comment_text,
+                    'username': comment.get('author', {}).get('name', comment.get('from', {}).get('name', 'unknown')),
+                    'timestamp': comment.get('time', comment.get('created_time', '')),
+                    'likes': comment.get('likes', comment.get('like_count', 0))
+                }
+                comment_data['id'] = stable_comment_id(comment_data, post_url)
+                processed_comments.append(comment_data)
+        
+        return {
+            'post_url': post_url,
+            'post_date': post_date.strftime('%Y-%m-%d') if post_date else 'unknown',
+            'post_timestamp': timestamp,
+            'reported_comments_count': item.get('commentsCount', item.get('comments_count')),
+            'comments': processed_comments,
+            'comments_count': len(processed_comments)
+        }
     
-    def scrape_posts_comments_bulk(self, url, from_date=None, max_posts=50):
+    def scrape_posts_comments_bulk(self, url, from_date=None, max_posts=50, deadline=None):
         """
         Scrape all posts from Facebook (groups, pages, profiles) since a given date and collect all comments
         
@@ -231,14 +324,19 @@ class FacebookScraper:
             url (str): Facebook URL (group, page, or profile)
             from_date (str): Start date in format 'YYYY-MM-DD'
             max_posts (int): Maximum number of posts to scrape
+            deadline (Deadline): Optional time limit - posts and comments come from one actor
+                run, so it either finishes in time or nothing is scraped
             
         Returns:
             dict: Dictionary with posts and their comments
+            
+        Raises:
+            DeadlineExceeded: The scraper did not finish before the deadline
         """
         try:
             # Get all posts with comments
             logger.info(f"Starting bulk Facebook scraping...")
-            posts = self.scrape_posts_bulk(url, from_date, max_posts)
+            posts = self.scrape_posts_bulk(url, from_date, max_posts, deadline)
             
             if not posts:
                 logger.warning("No posts found")
@@ -263,6 +361,8 @@ class FacebookScraper:
                 'posts': posts
             }
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error in bulk Facebook scraping: {str(e)}")
             return {
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+# Synthetic comments are assembled from these parts so near-duplicate clustering
+# sees realistic variety instead of a handful of repeated strings
+OPENERS = ['', 'Honestly ', 'Wow ', 'Not gonna lie, ', 'Ugh ', 'Hey, ', 'So ', 'Mashallah ']
+BODIES = [
+    'love this so much',
+    'this looks amazing',
+    'terrible quality, it broke after two days',
+    'still waiting for my order, delivery is so slow',
+    'where can I buy this? what is the price',
+    'customer service never answered my messages',
+    'way too expensive for what it is',
+    'the size was wrong and the color faded',
+    'ok',
+    'nice',
+    'can you ship to Tashkent',
+    'worst purchase ever, want a refund',
+    'great work, keep it up',
+    'bu juda qimmat, narxi nechi',
+]
+CLOSERS = ['', '!', '!!', ' ❤️', ' 🔥', ' 😡', '...', ' 🙏', ' lol']
+
+BASE_DATE = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+# A hung run only ends when the caller's timeout_secs/wait_secs cut it off
+HANG_SECONDS = 3600
+
+class FakeApifyError(Exception):
+    """Injected actor run failure"""
+
+def recording_key(actor_id, run_input):
+    """Stable file name for an actor run - the same actor and input replay the same dataset"""
+    digest = hashlib.sha1(json.dumps(run_input, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+    return f"{actor_id.replace('/', '__')}-{digest}"
+
+class FakeApifyClient:
+    """
+    Offline stand-in for ApifyClient covering the surface the scrapers use
+    (actor(id).call(run_input=..., timeout_secs=..., wait_secs=...) and dataset(id).iterate_items())
+
+    Runs replay a recorded dataset when one exists for the actor and input, otherwise a
+    deterministic synthetic dataset shaped like the real actors' output.
+    """
+
+    def __init__(self, recordings_dir=None, latency=0.0, latency_jitter=0.0, failure_rate=0.0,
+                 comments_per_post=50, posts_per_profile=None, seed=0, hang_rate=0.0):
+        """
+        Initialize the fake client
+
+        Args:
+            recordings_dir (str): Optional directory of datasets saved by RecordingApifyClient
+            latency (float): Seconds every actor run takes
+            latency_jitter (float): Extra random seconds (0..jitter) added to each run
+            failure_rate (float): Probability that an actor run raises FakeApifyError
+            comments_per_post (int): Synthetic comments per post (capped by the run's limits)
+            posts_per_profile (int): Synthetic posts per profile/page (default: the run's limit)
+            seed (int): Seed for synthetic data, latency jitter and failures
+            hang_rate (float): Probability that an actor run hangs until the caller's timeout
+        """
+        self.recordings_dir = recordings_dir
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.comments_per_post = comments_per_post
+        self.posts_per_profile = posts_per_profile
+        self.seed = seed
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._datasets = {}
+        self._stats = {'runs': 0, 'failures': 0, 'timeouts': 0, 'replayed': 0, 'synthetic': 0, 'items': 0,
+                       'in_flight': 0, 'peak_in_flight': 0}
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a fake client from APIFY_FAKE_* environment variables
+        (APIFY_FAKE_RECORDINGS, APIFY_FAKE_LATENCY, APIFY_FAKE_JITTER, APIFY_FAKE_FAILURE_RATE,
+        APIFY_FAKE_HANG_RATE, APIFY_FAKE_COMMENTS_PER_POST, APIFY_FAKE_POSTS, APIFY_FAKE_SEED)
+        """
+        posts = os.getenv('APIFY_FAKE_POSTS')
+        return cls(
+            recordings_dir=os.getenv('APIFY_FAKE_RECORDINGS') or None,
+            latency=float(os.getenv('APIFY_FAKE_LATENCY', 0)),
+            latency_jitter=float(os.getenv('APIFY_FAKE_JITTER', 0)),
+            failure_rate=float(os.getenv('APIFY_FAKE_FAILURE_RATE', 0)),
+            comments_per_post=int(os.getenv('APIFY_FAKE_COMMENTS_PER_POST', 50)),
+            posts_per_profile=int(posts) if posts else None,
+            seed=int(os.getenv('APIFY_FAKE_SEED', 0)),
+            hang_rate=float(os.getenv('APIFY_FAKE_HANG_RATE', 0))
+        )
+
+    def actor(self, actor_id):
+        return _FakeActor(self, actor_id)
+
+    def dataset(self, dataset_id):
+        return _FakeDataset(self, dataset_id)
+
+    def stats(self):
+        """Get run/failure/item counters and the peak number of concurrent runs"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _run(self, actor_id, run_input, timeout_secs=None, wait_secs=None):
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['in_flight'] += 1
+            self._stats['peak_in_flight'] = max(self._stats['peak_in_flight'], self._stats['in_flight'])
+            delay = self.latency + self._rng.uniform(0, self.latency_jitter)
+            failed = self._rng.random() < self.failure_rate
+            if self._rng.random() < self.hang_rate:
+                delay = HANG_SECONDS
+        try:
+            # Like Apify: the run is aborted after timeout_secs, call() returns after wait_secs
+            limit = min(s for s in (timeout_secs, wait_secs, delay) if s is not None)
+            if limit < delay:
+                time.sleep(limit)
+                self._count('timeouts')
+                status = 'TIMED-OUT' if timeout_secs is not None and timeout_secs <= limit else 'RUNNING'
+                return {'id': uuid.uuid4().hex, 'status': status, 'defaultDatasetId': uuid.uuid4().hex}
+            if delay > 0:
+                time.sleep(delay)
+            if failed:
+                self._count('failures')
+                raise FakeApifyError(f"Injected failure for actor {actor_id}")
+
+            items = self._replay(actor_id, run_input)
+            if items is not None:
+                self._count('replayed')
+                source = lambda: iter(items)
+            else:
+                self._count('synthetic')
+                source = lambda: self._synthesize(actor_id, run_input)
+
+            dataset_id = uuid.uuid4().hex
+            with self._lock:
+                self._datasets[dataset_id] = source
+            return {'id': uuid.uuid4().hex, 'status': 'SUCCEEDED', 'defaultDatasetId': dataset_id}
+        finally:
+            with self._lock:
+                self._stats['in_flight'] -= 1
+
+    def _iterate(self, dataset_id):
+        with self._lock:
+            source = self._datasets.pop(dataset_id, None)
+        if source is None:
+            raise FakeApifyError(f"Unknown dataset {dataset_id}")
+        for item in source():
+            self._count('items')
+            yield item
+
+    def _replay(self, actor_id, run_input):
+        if not self.recordings_dir:
+            return None
+        path = os.path.join(self.recordings_dir, recording_key(actor_id, run_input) + '.json')
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['items']
+
+    def _synthesize(self, actor_id, run_input):
+        # Seeded by the run itself, so concurrent runs stay reproducible whatever their order
+        rng = random.Random(f"{self.seed}:{recording_key(actor_id, run_input)}")
+
+        if 'facebook' in actor_id:
+            return self._facebook_posts(rng, run_input)
+        if run_input.get('resultsType') == 'posts':
+            return self._instagram_posts(rng, run_input)
+        limit = run_input.get('resultsLimit') or run_input.get('maxComments') or self.comments_per_post
+        return self._instagram_comments(rng, min(self.comments_per_post, limit))
+
+    @staticmethod
+    def _text(rng):
+        return f"{rng.choice(OPENERS)}{rng.choice(BODIES)}{rng.choice(CLOSERS)}".strip()
+
+    def _instagram_comments(self, rng, count):
+        for _ in range(count):
+            yield {
+                'id': f"{rng.getrandbits(48)}",
+                'text': self._text(rng),
+                'ownerUsername': f"user{rng.randrange(5000)}",
+                'timestamp': (BASE_DATE - timedelta(minutes=rng.randrange(60 * 24 * 30))).isoformat(),
+                'likesCount': int(rng.paretovariate(1.5)) - 1
+            }
+
+    def _instagram_posts(self, rng, run_input):
+        profile = run_input.get('directUrls', [''])[0].rstrip('/').rsplit('/', 1)[-1] or 'profile'
+        count = self.posts_per_profile or run_input.get('resultsLimit', 50)
+        for idx in range(count):
+            yield {
+                'url': f"https://www.instagram.com/p/{profile}{idx:04d}/",
+                'timestamp': (BASE_DATE - timedelta(days=idx)).isoformat(),
+                'commentsCount': self.comments_per_post + rng.randrange(5)
+            }
+
+    def _facebook_posts(self, rng, run_input):
+        page = run_input.get('startUrls', [''])[0].rstrip('/').rsplit('/', 1)[-1] or 'page'
+        count = self.posts_per_profile or run_input.get('maxPosts', 1)
+        per_post = min(self.comments_per_post, run_input.get('maxPostComments', self.comments_per_post))
+        for idx in range(count):
+            authors = [f"User {rng.randrange(5000)}" for _ in range(per_post)]
+            yield {
+                'url': f"https://www.facebook.com/{page}/posts/{idx}",
+                'time': (BASE_DATE - timedelta(days=idx)).isoformat(),
+                'commentsCount': per_post,
+                'comments': [
+                    {
+                        'id': f"{rng.getrandbits(48)}",
+                        'text': self._text(rng),
+                        'name': author,
+                        'author': {'name': author},
+                        'time': (BASE_DATE - timedelta(days=idx, minutes=rng.randrange(60 * 24))).isoformat(),
+                        'likes': int(rng.paretovariate(1.5)) - 1
+                    }
+                    for author in authors
+                ]
+            }
+
+class _FakeActor:
+    def __init__(self, client, actor_id):
+        self.client = client
+        self.actor_id = actor_id
+
+    def call(self, run_input=None, timeout_secs=None, wait_secs=None, **kwargs):
+        return self.client._run(self.actor_id, run_input or {}, timeout_secs, wait_secs)
+
+class _FakeDataset:
+    def __init__(self, client, dataset_id):
+        self.client = client
+        self.dataset_id = dataset_id
+
+    def iterate_items(self, **kwargs):
+        return self.client._iterate(self.dataset_id)
+
+class RecordingApifyClient:
+    """
+    Wrap a real ApifyClient and save every dataset the scrapers read, so the same
+    scrape can later be replayed offline with FakeApifyClient(recordings_dir=...)
+    """
+
+    def __init__(self, client, recordings_dir):
+        """
+        Args:
+            client (ApifyClient): Live client
+            recordings_dir (str): Directory the datasets are written to
+        """
+        self.client = client
+        self.recordings_dir = recordings_dir
+        self._runs = {}
+        os.makedirs(recordings_dir, exist_ok=True)
+
+    def actor(self, actor_id):
+        return _RecordingActor(self, actor_id)
+
+    def dataset(self, dataset_id):
+        return _RecordingDataset(self, dataset_id)
+
+    def _iterate(self, dataset_id):
+        items = list(self.client.dataset(dataset_id).iterate_items())
+        actor_id, run_input = self._runs.pop(dataset_id, (None, None))
+        if actor_id is not None:
+            path = os.path.join(self.recordings_dir, recording_key(actor_id, run_input) + '.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'actor_id': actor_id, 'run_input': run_input, 'items': items}, f,
+                          ensure_ascii=False, default=str)
+            logger.info(f"Recorded {len(items)} items of {actor_id} to {path}")
+        return iter(items)
+
+class _RecordingActor:
+    def __init__(self, recorder, actor_id):
+        self.recorder = recorder
+        self.actor_id = actor_id
+
+    def call(self, run_input=None, **kwargs):
+        run = self.recorder.client.actor(self.actor_id).call(run_input=run_input, **kwargs)
+        self.recorder._runs[run['defaultDatasetId']] = (self.actor_id, run_input or {})
+        return run
+
+class _RecordingDataset:
+    def __init__(self, recorder, dataset_id):
+        self.recorder = recorder
+        self.dataset_id = dataset_id
+
+    def iterate_items(self, **kwargs):
+        return self.recorder._iterate(self.dataset_id)
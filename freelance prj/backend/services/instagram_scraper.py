@@ -3,34 +3,98 @@ import logging
 import time
 from datetime import datetime
 
+from services.comment_utils import stable_comment_id
+from services.deadline import DeadlineExceeded
+from services.metrics import (
+    ACTOR_RUN_SECONDS, ACTOR_RUNS, DATASET_FETCH_SECONDS, FALLBACK_ACTOR_RUNS, SKIPPED_POSTS, timed_iter
+)
+from services.structured_logging import SampledLog
+
 logger = logging.getLogger(__name__)
+# Per-item warnings can repeat for every item of a large dataset
+_missing_url_log = SampledLog(logger, every=100)
+_timestamp_log = SampledLog(logger, every=100)
+
+# Splitting a scraping deadline: listing the profile may use this share of it, and each
+# post at least this share of what is left (or twice its even split, if that is more)
+LISTING_DEADLINE_SHARE = 0.5
+MIN_POST_DEADLINE_SHARE = 0.25
 
 class InstagramScraper:
     """
     Instagram comment scraper using Apify API
     """
     
-    def __init__(self, api_key):
+    def __init__(self, api_key, rate_limiter=None, client=None, post_delay=2):
         """
         Initialize Apify client
         
         Args:
             api_key (str): Apify API key
+            rate_limiter (RateLimiter): Optional budget shared with other scrapers - every
+                actor run waits for it
+            client: Optional ApifyClient-compatible client (e.g. FakeApifyClient for offline
+                benchmarks) - a live ApifyClient is created from api_key when omitted
+            post_delay (float): Seconds to pause between the posts of a bulk scrape
         """
-        self.client = ApifyClient(api_key)
+        self.client = client if client is not None else ApifyClient(api_key)
+        self.rate_limiter = rate_limiter
+        self.post_delay = post_delay
         self.actor_id = 'apify/instagram-comment-scraper'  # Official Apify Instagram scraper
         self.profile_actor_id = 'apify/instagram-scraper'  # For profile scraping
         
-    def scrape_comments(self, post_url, max_comments=1000):
+    def _wait_for_budget(self):
+        """Wait for the shared actor-call budget, if one is configured"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+    
+    def _run_actor(self, actor_id, run_input, deadline=None):
+        """
+        Run an actor within the shared budget, recording its duration and outcome
+
+        Raises:
+            DeadlineExceeded: The deadline left under a second, or the run did not finish in time
+        """
+        self._wait_for_budget()
+        options = {}
+        if deadline is not None:
+            seconds = int(deadline.remaining())
+            if seconds < 1:
+                raise DeadlineExceeded(f"no time left to run {actor_id}")
+            # Apify aborts the run after timeout_secs; wait_secs bounds how long call() blocks
+            options = {'timeout_secs': seconds, 'wait_secs': seconds}
+        started = time.perf_counter()
+        try:
+            run = self.client.actor(actor_id).call(run_input=run_input, **options)
+        except Exception:
+            ACTOR_RUNS.labels(actor_id, 'error').inc()
+            raise
+        if deadline is not None and (run is None or run.get('status') != 'SUCCEEDED'):
+            ACTOR_RUNS.labels(actor_id, 'timeout').inc()
+            raise DeadlineExceeded(f"{actor_id} did not finish within {options['timeout_secs']}s")
+        ACTOR_RUN_SECONDS.labels(actor_id).observe(time.perf_counter() - started)
+        ACTOR_RUNS.labels(actor_id, 'success').inc()
+        return run
+    
+    def _dataset_items(self, run, actor_id):
+        """Iterate a run's dataset, recording the time spent fetching it"""
+        return timed_iter(self.client.dataset(run["defaultDatasetId"]).iterate_items(),
+                          DATASET_FETCH_SECONDS.labels(actor_id))
+    
+    def scrape_comments(self, post_url, max_comments=1000, deadline=None):
         """
         Scrape comments from an Instagram post or reel
         
         Args:
             post_url (str): Instagram post/reel URL
             max_comments (int): Maximum number of comments to scrape
+            deadline (Deadline): Optional time limit for the actor runs
             
         Returns:
             list: List of comment dictionaries
+            
+        Raises:
+            DeadlineExceeded: The comment scraper did not finish before the deadline
         """
         try:
             logger.info(f"Starting Apify scraper for: {post_url}")
@@ -53,14 +117,14 @@ class InstagramScraper:
             logger.info(f"Requesting up to {max_comments} comments with actor: {self.actor_id}")
             logger.info(f"Post URL: {post_url}")
             
-            run = self.client.actor(self.actor_id).call(run_input=run_input)
+            run = self._run_actor(self.actor_id, run_input, deadline)
             
             # Fetch results from the dataset
             comments = []
             logger.info("Fetching comment data from dataset...")
             
             items_count = 0
-            for item in self.client.dataset(run["defaultDatasetId"]).iterate_items():
+            for item in self._dataset_items(run, self.actor_id):
                 items_count += 1
                 
                 # Try multiple field names as different actors use different field names
@@ -70,14 +134,8 @@ class InstagramScraper:
                                item.get('ownerComment', {}).get('text', '') or
                                item.get('caption', ''))
                 
-                # Generate unique ID if not present
-                comment_id = (item.get('id') or 
-                            item.get('commentId') or 
-                            item.get('pk') or 
-                            f"comment_{items_count}")
-                
                 comment_data = {
-                    'id': comment_id,
+                    'id': item.get('id') or item.get('commentId') or item.get('pk'),
                     'text': comment_text,
                     'username': (item.get('ownerUsername') or 
                                 item.get('username') or 
@@ -86,6 +144,8 @@ class InstagramScraper:
                     'timestamp': item.get('timestamp', item.get('createdAt', item.get('created_time', ''))),
                     'likes': item.get('likesCount', item.get('likes', item.get('like_count', 0)))
                 }
+                # Content-derived id when the actor returned none
+                comment_data['id'] = stable_comment_id(comment_data, post_url)
                 
                 # Only add comments with text
                 if comment_data['text'] and len(comment_data['text'].strip()) > 0:
@@ -97,7 +157,7 @@ class InstagramScraper:
             # If we got very few comments, try alternative method
             if len(comments) < 10:
                 logger.warning(f"Only got {len(comments)} comments, trying alternative scraper...")
-                alt_comments = self.scrape_comments_alternative(post_url, max_comments)
+                alt_comments = self.scrape_comments_alternative(post_url, max_comments, deadline)
                 if len(alt_comments) > len(comments):
                     logger.info(f"Alternative scraper got more comments: {len(alt_comments)}")
                     return alt_comments
@@ -106,12 +166,14 @@ class InstagramScraper:
             
             return comments
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error scraping Instagram comments: {str(e)}")
             # Return empty list on error
             return []
     
-    def scrape_comments_alternative(self, post_url, max_comments=1000):
+    def scrape_comments_alternative(self, post_url, max_comments=1000, deadline=None):
         """
         Alternative scraper using a different Apify actor
         Useful as a fallback option
@@ -119,6 +181,7 @@ class InstagramScraper:
         Args:
             post_url (str): Instagram post/reel URL
             max_comments (int): Maximum number of comments to scrape
+            deadline (Deadline): Optional time limit for the actor runs
             
         Returns:
             list: List of comment dictionaries
@@ -142,21 +205,23 @@ class InstagramScraper:
             for actor_name, run_input in alternative_actors:
                 try:
                     logger.info(f"Trying alternative actor: {actor_name}")
-                    run = self.client.actor(actor_name).call(run_input=run_input)
+                    FALLBACK_ACTOR_RUNS.labels(actor_name).inc()
+                    run = self._run_actor(actor_name, run_input, deadline)
                     
                     comments = []
-                    for item in self.client.dataset(run["defaultDatasetId"]).iterate_items():
+                    for item in self._dataset_items(run, actor_name):
                         comment_text = (item.get('text') or 
                                        item.get('comment') or 
                                        item.get('commentText') or '')
                         
                         comment_data = {
-                            'id': item.get('id', item.get('commentId', '')),
+                            'id': item.get('id', item.get('commentId')),
                             'text': comment_text,
                             'username': item.get('username', item.get('ownerUsername', 'unknown')),
                             'timestamp': item.get('timestamp', item.get('createdAt', '')),
                             'likes': item.get('likes', item.get('likesCount', 0))
                         }
+                        comment_data['id'] = stable_comment_id(comment_data, post_url)
                         
                         if comment_data['text'] and len(comment_data['text'].strip()) > 0:
                             comments.append(comment_data)
@@ -175,7 +240,7 @@ class InstagramScraper:
             logger.error(f"Alternative scraper error: {str(e)}")
             return []
     
-    def scrape_profile_posts(self, profile_url, from_date=None, max_posts=50):
+    def scrape_profile_posts(self, profile_url, from_date=None, max_posts=50, deadline=None):
         """
         Scrape posts from an Instagram profile from a specific date onwards
         
@@ -183,9 +248,14 @@ class InstagramScraper:
             profile_url (str): Instagram profile URL (e.g., https://www.instagram.com/username/)
             from_date (str): Start date in format 'YYYY-MM-DD' (e.g., '2024-01-15')
             max_posts (int): Maximum number of posts to scrape
+            deadline (Deadline): Optional scraping deadline - listing uses part of it and
+                leaves the rest for the posts' comments
             
         Returns:
             list: List of post URLs from the specified date onwards
+            
+        Raises:
+            DeadlineExceeded: The profile scraper did not finish in time
         """
         try:
             logger.info(f"Scraping profile: {profile_url} from date: {from_date}")
@@ -215,20 +285,21 @@ class InstagramScraper:
             }
             
             logger.info(f"Running profile scraper with actor: {self.profile_actor_id}")
-            run = self.client.actor(self.profile_actor_id).call(run_input=run_input)
+            listing_deadline = deadline.share(LISTING_DEADLINE_SHARE) if deadline is not None else None
+            run = self._run_actor(self.profile_actor_id, run_input, listing_deadline)
             
             # Fetch posts from dataset
             posts = []
             logger.info("Fetching posts from dataset...")
             
             items_found = 0
-            for item in self.client.dataset(run["defaultDatasetId"]).iterate_items():
+            for item in self._dataset_items(run, self.profile_actor_id):
                 items_found += 1
                 
                 # Log the first item to see what fields are available
-                if items_found == 1:
-                    logger.info(f"First item keys: {list(item.keys())}")
-                    logger.info(f"Sample item (first 500 chars): {str(item)[:500]}")
+                if items_found == 1 and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("First item keys: %s", list(item.keys()))
+                    logger.debug("Sample item (first 500 chars): %s", str(item)[:500])
                 
                 # Extract post URL - try multiple field names
                 post_url = (item.get('url') or 
@@ -241,16 +312,16 @@ class InstagramScraper:
                     post_url = f"https://www.instagram.com/p/{post_url}/"
                 
                 if not post_url:
-                    logger.warning(f"Item {items_found}: No URL found")
+                    _missing_url_log.warning("Item %d: No URL found", items_found)
                     continue
                 
                 # Extract timestamp - try multiple field names and formats
                 timestamp = (item.get('timestamp') or 
                            item.get('ownerTimestamp') or 
-                           item.get('latestComments', [{}])[0].get('timestamp') if item.get('latestComments') else None or
+                           (item['latestComments'][0].get('timestamp') if item.get('latestComments') else None) or
                            item.get('time'))
                 
-                logger.debug(f"Item {items_found}: URL={post_url}, timestamp={timestamp}")
+                logger.debug("Item %d: URL=%s, timestamp=%s", items_found, post_url, timestamp)
                 
                 # Parse timestamp if available
                 post_date = None
@@ -269,37 +340,38 @@ class InstagramScraper:
                                     # Make it timezone-aware
                                     post_date = post_date.replace(tzinfo=timezone.utc)
                                 except:
-                                    logger.warning(f"Could not parse string timestamp: {timestamp}")
+                                    _timestamp_log.warning("Could not parse string timestamp: %s", timestamp)
                         elif isinstance(timestamp, (int, float)):
                             # Unix timestamp - make it timezone-aware
                             post_date = datetime.fromtimestamp(timestamp, tz=timezone.utc)
                     except Exception as e:
-                        logger.warning(f"Error parsing timestamp {timestamp}: {str(e)}")
+                        _timestamp_log.warning("Error parsing timestamp %s: %s", timestamp, e)
                 
                 # Log the post details for debugging
-                logger.debug(f"Post URL: {post_url}, Date: {post_date}, Timestamp: {timestamp}")
+                logger.debug("Post URL: %s, Date: %s, Timestamp: %s", post_url, post_date, timestamp)
                 
                 # Filter by date if cutoff_date is provided
                 include_post = False
                 if cutoff_date and post_date:
                     if post_date >= cutoff_date:
                         include_post = True
-                        logger.info(f"Including post from {post_date.strftime('%Y-%m-%d')} (after cutoff {cutoff_date.strftime('%Y-%m-%d')})")
+                        logger.debug("Including post from %s (after cutoff %s)", post_date.date(), cutoff_date.date())
                     else:
-                        logger.debug(f"Skipping post from {post_date.strftime('%Y-%m-%d')} (before cutoff)")
+                        logger.debug("Skipping post from %s (before cutoff)", post_date.date())
                 elif not cutoff_date:
                     # If no date filter, add all posts
                     include_post = True
                 else:
                     # If cutoff_date exists but post_date is None, include it (can't filter)
-                    logger.warning(f"Post {post_url} has no date, including anyway")
+                    _timestamp_log.warning("Post %s has no date, including anyway", post_url)
                     include_post = True
                 
                 if include_post:
                     posts.append({
                         'url': post_url,
                         'timestamp': timestamp,
-                        'date': post_date.strftime('%Y-%m-%d') if post_date else 'unknown'
+                        'date': post_date.strftime('%Y-%m-%d') if post_date else 'unknown',
+                        'comments_count': item.get('commentsCount')
                     })
                 
                 # Stop if we have enough posts
@@ -317,11 +389,14 @@ class InstagramScraper:
             
             return posts
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error scraping profile posts: {str(e)}")
             return []
     
-    def scrape_posts_comments_bulk(self, profile_url, from_date=None, max_posts=50, max_comments_per_post=1000):
+    def scrape_posts_comments_bulk(self, profile_url, from_date=None, max_posts=50, max_comments_per_post=1000,
+                                   watermarks=None, deadline=None):
         """
         Scrape all posts from a profile since a given date and collect all comments
         
@@ -330,14 +405,22 @@ class InstagramScraper:
             from_date (str): Start date in format 'YYYY-MM-DD'
             max_posts (int): Maximum number of posts to scrape
             max_comments_per_post (int): Maximum comments per post
+            watermarks (dict): Optional per-post watermarks from a previous run
+                ({post_url: {'reported_comment_count': n, ...}}) - posts whose comment count
+                has not grown since are not re-scraped
+            deadline (Deadline): Optional scraping deadline - posts that cannot be scraped
+                in time are skipped (see iter_posts_comments)
             
         Returns:
             dict: Dictionary with posts and their comments
+            
+        Raises:
+            DeadlineExceeded: The posts could not be listed before the deadline
         """
         try:
             # Step 1: Get all posts from the profile
             logger.info(f"Step 1: Getting posts from profile...")
-            posts = self.scrape_profile_posts(profile_url, from_date, max_posts)
+            posts = self.scrape_profile_posts(profile_url, from_date, max_posts, deadline)
             
             if not posts:
                 logger.warning("No posts found")
@@ -350,26 +433,7 @@ class InstagramScraper:
             
             # Step 2: Scrape comments from each post
             logger.info(f"Step 2: Scraping comments from {len(posts)} posts...")
-            results = []
-            
-            for idx, post in enumerate(posts, 1):
-                post_url = post['url']
-                logger.info(f"Scraping post {idx}/{len(posts)}: {post_url}")
-                
-                comments = self.scrape_comments(post_url, max_comments_per_post)
-                
-                results.append({
-                    'post_url': post_url,
-                    'post_date': post.get('date', 'unknown'),
-                    'comments_count': len(comments),
-                    'comments': comments
-                })
-                
-                logger.info(f"  → Scraped {len(comments)} comments")
-                
-                # Add small delay between posts to avoid rate limiting
-                if idx < len(posts):
-                    time.sleep(2)
+            results = list(self.iter_posts_comments(posts, max_comments_per_post, watermarks, deadline))
             
             total_comments = sum(post['comments_count'] for post in results)
             logger.info(f"Completed! Total: {len(posts)} posts, {total_comments} comments")
@@ -382,6 +446,8 @@ class InstagramScraper:
                 'posts': results
             }
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error in bulk scraping: {str(e)}")
             return {
@@ -392,3 +458,82 @@ class InstagramScraper:
                 'posts': [],
                 'error': str(e)
             }
+
+    def iter_posts_comments(self, posts, max_comments_per_post=1000, watermarks=None, deadline=None):
+        """
+        Scrape the comments of profile posts one post at a time
+        
+        Args:
+            posts (list): Posts from scrape_profile_posts
+            max_comments_per_post (int): Maximum comments per post
+            watermarks (dict): Optional per-post watermarks (see scrape_posts_comments_bulk)
+            deadline (Deadline): Optional scraping deadline - each post gets a share of the time
+                left, so one hanging actor run cannot hold up the rest
+            
+        Yields:
+            dict: Post with its comments - only one post's comments are held at a time
+                  unless the caller keeps them. Posts that could not be scraped in time come
+                  without comments, with 'skipped': True and a 'skip_reason'
+        """
+        scraped_any = False
+        for idx, post in enumerate(posts, 1):
+            post_url = post['url']
+            reported_count = post.get('comments_count')
+            
+            # Skip posts whose comment count has not grown since the last run
+            watermark = (watermarks or {}).get(post_url)
+            if (watermark and reported_count is not None
+                    and watermark.get('reported_comment_count') is not None
+                    and reported_count <= watermark['reported_comment_count']):
+                logger.info(f"Post {idx}/{len(posts)} unchanged since last run, skipping: {post_url}")
+                yield {
+                    'post_url': post_url,
+                    'post_date': post.get('date', 'unknown'),
+                    'post_timestamp': post.get('timestamp'),
+                    'reported_comments_count': reported_count,
+                    'comments_count': 0,
+                    'comments': [],
+                    'unchanged': True
+                }
+                continue
+            
+            # Add small delay between posts to avoid rate limiting
+            if scraped_any and self.post_delay > 0:
+                time.sleep(min(self.post_delay, deadline.remaining()) if deadline is not None else self.post_delay)
+            scraped_any = True
+            
+            logger.info(f"Scraping post {idx}/{len(posts)}: {post_url}")
+            
+            try:
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceeded('request deadline reached before the post was scraped')
+                post_deadline = None
+                if deadline is not None:
+                    posts_left = len(posts) - idx + 1
+                    post_deadline = deadline.share(max(2 / posts_left, MIN_POST_DEADLINE_SHARE))
+                comments = self.scrape_comments(post_url, max_comments_per_post, post_deadline)
+            except DeadlineExceeded as e:
+                logger.warning(f"Post {idx}/{len(posts)} skipped ({e}): {post_url}")
+                SKIPPED_POSTS.inc()
+                yield {
+                    'post_url': post_url,
+                    'post_date': post.get('date', 'unknown'),
+                    'post_timestamp': post.get('timestamp'),
+                    'reported_comments_count': reported_count,
+                    'comments_count': 0,
+                    'comments': [],
+                    'skipped': True,
+                    'skip_reason': str(e)
+                }
+                continue
+            
+            logger.info(f"  → Scraped {len(comments)} comments")
+            
+            yield {
+                'post_url': post_url,
+                'post_date': post.get('date', 'unknown'),
+                'post_timestamp': post.get('timestamp'),
+                'reported_comments_count': reported_count,
+                'comments_count': len(comments),
+                'comments': comments
+            }
@@ -0,0 +1,156 @@
+import logging
+import os
+import time
+
+import prometheus_client
+from prometheus_client import CollectorRegistry, Counter, generate_latest, multiprocess
+
+from services import tracing
+
+# Metrics are prometheus_client metrics in its default registry. With several gunicorn workers,
+# PROMETHEUS_MULTIPROC_DIR must be set before prometheus_client is imported (gunicorn.conf.py
+# does): each process then writes its values to mmap files there, and render() sums the
+# files of every worker, including exited ones.
+
+# Default latency buckets in seconds (Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+# Apify actor runs take seconds to minutes
+ACTOR_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+CONTENT_TYPE = prometheus_client.CONTENT_TYPE_LATEST
+REGISTRY = prometheus_client.REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# prometheus_client creates its files there as soon as the metrics below are defined
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+class Histogram(prometheus_client.Histogram):
+    """prometheus_client Histogram whose observations can also be spans of the request trace"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, span=None, **kwargs):
+        """
+        Args:
+            span (str): Optional span name - observations are also recorded as spans of the current
+                request trace; may reference labels, e.g. 'sentiment_{tier}'
+        """
+        super().__init__(name, documentation, labelnames, buckets=buckets, **kwargs)
+        # Passed on to the children labels() creates
+        self._kwargs['span'] = span
+        labelvalues = kwargs.get('_labelvalues')
+        self._span = span
+        if span is not None and labelvalues:
+            self._span = span.format(**dict(zip(self._labelnames, labelvalues)))
+
+    def observe(self, amount, exemplar=None):
+        super().observe(amount, exemplar)
+        if self._span is not None:
+            tracing.record(self._span, amount)
+
+def multiprocess_dir():
+    """Directory the workers share their metrics through, or None in single-process mode"""
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR') or None
+
+def clear_multiprocess_dir():
+    """Remove the metric files of a previous run - in the gunicorn master, before forking"""
+    directory = multiprocess_dir()
+    if directory is None:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith('.db'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+def mark_process_dead(pid):
+    """Drop the live gauges of an exited worker (its counters and histograms are kept)"""
+    if multiprocess_dir() is not None:
+        multiprocess.mark_process_dead(pid)
+
+def render(directory=None):
+    """
+    Prometheus text exposition of every metric
+
+    Args:
+        directory (str): Multi-process directory to sum up (default: PROMETHEUS_MULTIPROC_DIR;
+            this process's registry when neither is set)
+
+    Returns:
+        bytes: Exposition in CONTENT_TYPE
+    """
+    directory = directory or multiprocess_dir()
+    if directory is None:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=directory)
+    return generate_latest(registry)
+
+def timed_iter(iterable, histogram):
+    """
+    Yield from an iterable and observe the time spent waiting on it - not the time the
+    consumer spends on each item - once it is exhausted or closed
+    """
+    waited = 0.0
+    iterator = iter(iterable)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                waited += time.perf_counter() - started
+            yield item
+    finally:
+        # Also runs when the consumer stops early and the generator is closed
+        histogram.observe(waited)
+
+# Scraping
+ACTOR_RUN_SECONDS = Histogram(
+    'apify_actor_run_seconds', 'Duration of Apify actor runs', ('actor',), buckets=ACTOR_BUCKETS,
+    span='apify_run')
+ACTOR_RUNS = Counter(
+    'apify_actor_runs_total', 'Apify actor runs by outcome', ('actor', 'outcome'))
+DATASET_FETCH_SECONDS = Histogram(
+    'apify_dataset_fetch_seconds', 'Time spent reading Apify datasets', ('actor',), span='apify_fetch')
+FALLBACK_ACTOR_RUNS = Counter(
+    'apify_fallback_actor_runs_total', 'Runs of fallback comment scraper actors', ('actor',))
+SKIPPED_POSTS = Counter(
+    'deadline_skipped_posts_total', 'Posts left out of an analysis because its deadline ran out')
+
+# Analysis
+PREPROCESS_SECONDS = Histogram(
+    'sentiment_preprocess_seconds', 'Text preprocessing time per classification call', span='preprocess')
+SENTIMENT_TIER_SECONDS = Histogram(
+    'sentiment_tier_seconds', 'Time per classification call spent in each sentiment tier', ('tier',),
+    span='sentiment_{tier}')
+SENTIMENT_TIER_COMMENTS = Counter(
+    'sentiment_tier_comments_total', 'Comments decided by each sentiment tier', ('tier',))
+MODEL_BATCH_SECONDS = Histogram(
+    'sentiment_model_batch_seconds', 'Latency of batched sentiment model calls', span='model_batch')
+MODEL_BATCH_SIZE = Histogram(
+    'sentiment_model_batch_size', 'Texts per sentiment model call', buckets=BATCH_SIZE_BUCKETS)
+TOPIC_CLASSIFICATION_SECONDS = Histogram(
+    'topic_classification_seconds', 'Topic classification time per call', span='topics')
+COMMENTS_ANALYZED = Counter(
+    'comments_analyzed_total', 'Comments classified for sentiment')
+
+# Serving
+SERIALIZATION_SECONDS = Histogram(
+    'json_serialization_seconds', 'Time to serialize JSON payloads', span='serialize')
+RESPONSE_CACHE_LOOKUPS = Counter(
+    'response_cache_lookups_total', 'Response cache lookups by result (memory, disk, stale, miss)', ('result',))
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('endpoint', 'method', 'status'))
+ADMISSION_DECISIONS = Counter(
+    'admission_decisions_total', 'Admission control decisions (admitted, queued, rejected_*)', ('endpoint', 'outcome'))
+ADMISSION_WAIT_SECONDS = Histogram(
+    'admission_queue_wait_seconds', 'Time requests waited for an admission slot', ('endpoint',),
+    buckets=(0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0), span='admission_queue')
+SINGLE_FLIGHT_CALLS = Counter(
+    'single_flight_calls_total', 'Computations run (executed) or joined while in flight (coalesced)', ('outcome',))
@@ -0,0 +1,66 @@
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Weights are memory-mapped from local safetensors files instead of being deserialized into
+# private memory: their pages sit in the OS page cache, shared by every process mapping the
+# same file (gunicorn workers, separately started servers), and are paged in on first use.
+# Export a Hugging Face model once and point SENTIMENT_MODEL_PATH at the directory:
+#   python -m services.model_loading nlptown/bert-base-multilingual-uncased-sentiment models/sentiment
+
+def load_mmap_model(model_dir):
+    """
+    Build a sequence classification model whose weights are memory-mapped from model_dir
+
+    The parameters are created on the meta device and the safetensors files are opened
+    with safetensors' own mmap loader, so the weights are neither initialized randomly nor
+    copied into private memory first.
+
+    Args:
+        model_dir (str): Directory with config.json and model.safetensors (or a sharded index)
+
+    Returns:
+        PreTrainedModel: Model in eval mode
+
+    Raises:
+        OSError: model_dir has no safetensors weights
+        ValueError: Weights of some parameters are missing from the files
+    """
+    from transformers import AutoModelForSequenceClassification
+
+    model, loading_info = AutoModelForSequenceClassification.from_pretrained(
+        model_dir,
+        use_safetensors=True,
+        low_cpu_mem_usage=True,
+        local_files_only=True,
+        output_loading_info=True
+    )
+    # from_pretrained would run with randomly initialized weights instead
+    missing = sorted(loading_info['missing_keys'])
+    if missing:
+        raise ValueError(f"{model_dir} has no weights for: {', '.join(missing[:5])}")
+    if loading_info['unexpected_keys']:
+        logger.warning(f"Ignoring {len(loading_info['unexpected_keys'])} unexpected weights in {model_dir}")
+    return model.eval()
+
+def export_model(model_name, output_dir):
+    """
+    Save a Hugging Face model and its tokenizer as a local safetensors directory
+
+    Args:
+        model_name (str): Hugging Face model id
+        output_dir (str): Directory to write
+    """
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.save_pretrained(output_dir, safe_serialization=True)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+    logger.info(f"Exported {model_name} to {output_dir}")
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python -m services.model_loading <hugging face model id> <output dir>")
+    logging.basicConfig(level=logging.INFO)
+    export_model(sys.argv[1], sys.argv[2])
@@ -0,0 +1,105 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class ProfileMonitor:
+    """
+    Scheduler that periodically runs incremental analysis for registered
+    Instagram profiles and Facebook pages
+    """
+
+    def __init__(self, store, run_analysis, max_concurrent=2, jitter=0.1, poll_seconds=30):
+        """
+        Initialize the monitor
+
+        Args:
+            store (CommentStore): Store holding the monitored profiles
+            run_analysis (callable): Function (platform, url, max_posts) -> (status_code, body, comment_lists)
+            max_concurrent (int): Maximum profiles analyzed at the same time
+            jitter (float): Random +/- fraction applied to every interval so runs do not align
+            poll_seconds (int): How often the scheduler looks for due profiles
+        """
+        self.store = store
+        self.run_analysis = run_analysis
+        self.max_concurrent = max_concurrent
+        self.jitter = jitter
+        self.poll_seconds = poll_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='monitor')
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def jittered(self, interval_seconds):
+        """Spread an interval by +/- jitter"""
+        return interval_seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def register(self, platform, url, profile, interval_seconds, max_posts):
+        """
+        Start monitoring a profile/page; the first run is spread over the first interval
+
+        Args:
+            platform (str): 'instagram' or 'facebook'
+            url (str): Profile/page URL as submitted
+            profile (str): Normalized profile/page URL
+            interval_seconds (int): Seconds between runs
+            max_posts (int): Maximum posts per run
+        """
+        first_run = time.time() + random.uniform(0, interval_seconds * self.jitter)
+        self.store.add_monitored_profile(platform, url, profile, interval_seconds, max_posts, first_run)
+        logger.info(f"Monitoring {platform} {profile} every {interval_seconds}s")
+
+    def start(self):
+        """Start the scheduler thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='profile-monitor', daemon=True)
+        self._thread.start()
+        logger.info(f"Profile monitor started (max {self.max_concurrent} concurrent runs)")
+
+    def stop(self):
+        """Stop scheduling new runs"""
+        self._stop.set()
+
+    def running(self):
+        """Profiles currently being analyzed"""
+        with self._lock:
+            return sorted(f"{platform}:{profile}" for platform, profile in self._running)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Profile monitor tick failed: {str(e)}", exc_info=True)
+            self._stop.wait(self.poll_seconds)
+
+    def tick(self):
+        """Submit every due profile that is not already running, up to the concurrency cap"""
+        for entry in self.store.list_monitored_profiles(due_before=time.time()):
+            key = (entry['platform'], entry['profile'])
+            with self._lock:
+                if key in self._running or len(self._running) >= self.max_concurrent:
+                    continue
+                self._running.add(key)
+            self._executor.submit(self._run, entry)
+
+    def _run(self, entry):
+        platform, profile = entry['platform'], entry['profile']
+        status = 'error'
+        try:
+            logger.info(f"Scheduled incremental analysis for {platform} {profile}")
+            status_code, body, _ = self.run_analysis(platform, entry['url'], entry['max_posts'])
+            status = 'ok' if status_code == 200 else f"http_{status_code}"
+        except Exception as e:
+            logger.error(f"Scheduled analysis failed for {profile}: {str(e)}", exc_info=True)
+        finally:
+            next_run_at = time.time() + self.jittered(entry['interval_seconds'])
+            self.store.mark_monitor_run(platform, profile, status, next_run_at)
+            with self._lock:
+                self._running.discard((platform, profile))
@@ -0,0 +1,116 @@
+import logging
+import re
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MENTION_URL_PATTERN = re.compile(r'@\w+|#\w+|https?://\S+|www\.\S+')
+NON_WORD_PATTERN = re.compile(r'[^\w\s]|_')
+SPACE_PATTERN = re.compile(r'\s+')
+
+class NearDuplicateClusterer:
+    """
+    Cluster near-identical comments (copy-paste spam, bot campaigns) with MinHash + LSH,
+    so each cluster is scored once
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, shingle_size=3, seed=1):
+        """
+        Initialize the clusterer
+
+        Args:
+            threshold (float): Estimated Jaccard similarity above which comments are merged
+            num_perm (int): MinHash signature length
+            shingle_size (int): Character shingle length
+            seed (int): Seed for the hash functions
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = self._band_layout(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: ((a * x + b) mod 2^64) >> 32 with odd a
+        self._a = rng.integers(1, 2 ** 63, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=(num_perm, 1), dtype=np.uint64)
+
+    @staticmethod
+    def _band_layout(threshold, num_perm):
+        """Pick (bands, rows) whose LSH threshold (1/bands)^(1/rows) is closest to the target"""
+        layouts = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+        return min(layouts, key=lambda layout: abs((1 / layout[0]) ** (1 / layout[1]) - threshold))
+
+    def normalize(self, text):
+        """Drop mentions, hashtags, URLs, emojis and punctuation - the parts spam variants differ in"""
+        text = MENTION_URL_PATTERN.sub(' ', (text or '').lower())
+        text = NON_WORD_PATTERN.sub(' ', text)
+        return SPACE_PATTERN.sub(' ', text).strip()
+
+    def signature(self, normalized):
+        """MinHash signature of a normalized text's character shingles"""
+        k = self.shingle_size
+        shingles = {normalized[i:i + k] for i in range(max(1, len(normalized) - k + 1))}
+        # crc32, not hash(): str hashes are salted per process, and every gunicorn worker and
+        # restart must put the same comments in the same clusters
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((self._a * hashes + self._b) >> np.uint64(32)).min(axis=1)
+
+    def cluster(self, texts):
+        """
+        Assign a cluster id to every text
+
+        Args:
+            texts (list): Comment texts
+
+        Returns:
+            list: Cluster id per text - the id is the index of the cluster's first member
+        """
+        labels = list(range(len(texts)))
+
+        # Exact duplicates after normalization share one signature
+        first_by_text = {}
+        unique = []
+        for idx, text in enumerate(texts):
+            # Emoji-only comments normalize to nothing - keep them apart unless identical
+            normalized = self.normalize(text) or (text or '')
+            first = first_by_text.setdefault(normalized, idx)
+            if first == idx:
+                unique.append((idx, normalized))
+            else:
+                labels[idx] = first
+
+        parent = {idx: idx for idx, _ in unique}
+
+        def find(idx):
+            while parent[idx] != idx:
+                parent[idx] = parent[parent[idx]]
+                idx = parent[idx]
+            return idx
+
+        # Texts too short to shingle only merge as exact duplicates
+        signatures = {idx: self.signature(normalized) for idx, normalized in unique
+                      if len(normalized) >= self.shingle_size * 2}
+
+        # LSH: texts sharing a band bucket are compared with the bucket's first text only,
+        # which keeps the work linear in the number of texts
+        for band in range(self.bands):
+            start = band * self.rows
+            buckets = {}
+            for idx, sig in signatures.items():
+                key = sig[start:start + self.rows].tobytes()
+                head = buckets.setdefault(key, idx)
+                if head == idx:
+                    continue
+                root_a, root_b = find(head), find(idx)
+                if root_a != root_b and np.mean(signatures[head] == sig) >= self.threshold:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        for idx in range(len(texts)):
+            labels[idx] = find(labels[idx])
+
+        clusters = len(set(labels))
+        logger.info(f"Clustered {len(texts)} comments into {clusters} groups "
+                    f"({len(texts) - clusters} near-duplicates)")
+        return labels
@@ -0,0 +1,89 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by every scraper, so concurrent analyses
+    stay inside one global budget of Apify actor calls. With a state_path the
+    bucket lives in a file locked with flock, so every process using the same
+    file (e.g. the gunicorn workers) draws from one budget instead of each
+    worker getting the full rate.
+    """
+
+    def __init__(self, rate_per_second, burst=1, state_path=None):
+        """
+        Initialize the bucket
+
+        Args:
+            rate_per_second (float): Sustained calls per second (0 or less disables limiting)
+            burst (int): Calls allowed back to back before the rate applies
+            state_path (str): Optional file holding the bucket for all processes on this host
+        """
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self.state_path = state_path
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._waited = 0.0
+        if state_path:
+            os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+
+    def acquire(self):
+        """Block until a call is allowed"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                wait = self._take_shared() if self.state_path else self._take_local()
+                if wait <= 0:
+                    return
+                self._waited += wait
+            time.sleep(wait)
+
+    def _take_local(self):
+        """Take a token from this process's bucket; returns the seconds to wait if there is none"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    def _take_shared(self):
+        """Take a token from the bucket in state_path (wall clock, as processes share no monotonic clock)"""
+        with open(self.state_path, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or '{}')
+                tokens, updated = float(state['tokens']), float(state['updated'])
+            except (ValueError, KeyError, TypeError):
+                tokens, updated = float(self.burst), time.time()
+            now = time.time()
+            # A clock stepped backwards must not drain the bucket
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            if wait <= 0:
+                tokens -= 1
+            f.seek(0)
+            f.truncate()
+            json.dump({'tokens': tokens, 'updated': now}, f)
+            return wait
+
+    def stats(self):
+        """Get the configured budget and the total time this process's callers spent waiting"""
+        with self._lock:
+            return {
+                'rate_per_second': self.rate,
+                'burst': self.burst,
+                'shared': bool(self.state_path),
+                'waited_seconds': round(self._waited, 3)
+            }
@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from services.metrics import RESPONSE_CACHE_LOOKUPS
+from services.serialization import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    Two-level cache (memory LRU in front of a disk tier) for final analysis outcomes,
+    with ETags and stale-while-revalidate. Only the status and response body are cached -
+    the analyzed comments stay in the ResultStore the body's result_id points to.
+    """
+
+    def __init__(self, cache_dir, max_entries=32, ttl_seconds=900, stale_seconds=3600, single_flight=None,
+                 is_valid=None):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir (str): Directory for the disk tier (None disables it)
+            max_entries (int): Entries kept in the memory LRU
+            ttl_seconds (int): Seconds an entry is fresh
+            stale_seconds (int): Grace window after expiry during which the stale entry
+                is served while a background refresh runs
+            single_flight (SingleFlight): Optional coalescing layer so concurrent misses
+                and refreshes of one key compute (and write) only once
+            is_valid (callable): Optional check of a cached outcome on every lookup (e.g. that
+                the result it references was not evicted) - invalid entries count as misses
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.single_flight = single_flight
+        self.is_valid = is_valid
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._hits = {'memory': 0, 'disk': 0, 'stale': 0, 'miss': 0}
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(parts):
+        """Hash the key parts (endpoint, normalized URL, parameters) into a cache key"""
+        return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, key, compute, force_refresh=False):
+        """
+        Get a cached outcome, computing it on a miss
+
+        Args:
+            key (str): Cache key from make_key()
+            compute (callable): Zero-argument function returning (status_code, body, comment_lists)
+            force_refresh (bool): Skip the cache and recompute
+
+        Returns:
+            tuple: (entry, cache_status) - entry holds 'outcome' (status_code, body, None),
+                   'etag' and 'created_at'; cache_status is 'HIT', 'STALE' or 'MISS'
+        """
+        if not force_refresh:
+            entry, source = self._lookup(key)
+            if entry is not None:
+                age = time.time() - entry['created_at']
+                if age <= self.ttl_seconds:
+                    self._count(source)
+                    return entry, 'HIT'
+                if age <= self.ttl_seconds + self.stale_seconds:
+                    self._count('stale')
+                    self._refresh_in_background(key, compute)
+                    return entry, 'STALE'
+
+        self._count('miss')
+        return self._compute_and_store(key, compute), 'MISS'
+
+    def stats(self):
+        """Get hit/miss counters"""
+        with self._lock:
+            return {**self._hits, 'memory_entries': len(self._memory)}
+
+    def _lookup(self, key):
+        """Find a valid entry in memory, then on disk (promoting disk hits into memory)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        source = 'memory'
+        if entry is None:
+            entry = self._read_disk(key)
+            source = 'disk'
+        if entry is None:
+            return None, None
+
+        if self.is_valid is not None and not self.is_valid(entry['outcome']):
+            logger.info(f"Dropping cache entry {key[:12]} - its stored result is gone")
+            with self._lock:
+                self._memory.pop(key, None)
+            if self.cache_dir:
+                self._remove(self._path(key))
+            return None, None
+        if source == 'disk':
+            self._remember(key, entry)
+        return entry, source
+
+    def _compute_and_store(self, key, compute):
+        """Compute an outcome and cache it, coalescing concurrent computations of the same key"""
+        if self.single_flight is None:
+            return self._store(key, compute())
+        return self.single_flight.do(key, lambda: self._store(key, compute()))
+
+    def _store(self, key, outcome):
+        """Cache a successful, complete outcome; errors and partial (deadline-cut) results are returned uncached"""
+        status_code, body, _ = outcome
+        entry = {
+            'created_at': time.time(),
+            'etag': hashlib.sha1(dumps_bytes(body)).hexdigest(),
+            # The comment lists are not kept - they are served from the ResultStore
+            'outcome': (status_code, body, None)
+        }
+        if status_code == 200 and not body.get('data', {}).get('partial'):
+            self._remember(key, entry)
+            self._write_disk(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        """Put an entry in the memory LRU"""
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _refresh_in_background(self, key, compute):
+        """Recompute a stale entry on a daemon thread (one refresh per key at a time)"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._compute_and_store(key, compute)
+                logger.info(f"Refreshed stale cache entry {key[:12]}")
+            except Exception as e:
+                logger.error(f"Background refresh failed for {key[:12]}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _count(self, name):
+        with self._lock:
+            self._hits[name] += 1
+        RESPONSE_CACHE_LOOKUPS.labels(name).inc()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        """Load an entry from the disk tier, dropping it once past the grace window"""
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache file {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+        if time.time() - entry['created_at'] > self.ttl_seconds + self.stale_seconds:
+            self._remove(path)
+            return None
+        return entry
+
+    def _write_disk(self, key, entry):
+        """Write an entry atomically to the disk tier"""
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        # Unique per process and thread - gunicorn workers share the cache directory and
+        # thread idents repeat across processes
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write cache file {path}: {str(e)}")
+            self._remove(tmp_path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
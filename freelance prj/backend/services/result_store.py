@@ -0,0 +1,502 @@
+import base64
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import closing
+
+from services.serialization import dumps_bytes, loads_bytes
+
+logger = logging.getLogger(__name__)
+
+class ResultStore:
+    """
+    Server-side store for analysis results, so endpoints can answer with aggregates
+    and serve the analyzed comments page by page
+    """
+
+    def __init__(self, max_results=50, ttl_seconds=3600, spill_dir=None, shared=False, sweep_seconds=300):
+        """
+        Initialize the store
+
+        Args:
+            max_results (int): Maximum number of results kept (least recently used are evicted)
+            ttl_seconds (int): Seconds a result stays available after it was saved
+            spill_dir (str): Directory for disk-backed (spilled) results; defaults to the temp dir
+            shared (bool): Spill every result, so any process using the same spill_dir (e.g. the
+                other gunicorn workers) can serve it - results are never held only in memory
+            sweep_seconds (int): Minimum seconds between sweeps of expired spill files left
+                behind by other or earlier processes
+        """
+        self.max_results = max_results
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir or os.path.join(tempfile.gettempdir(), 'result_spills')
+        self.shared = shared
+        self.sweep_seconds = sweep_seconds
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+    def save(self, comments, summary=None, result_id=None):
+        """
+        Store analyzed comments and build the filter indexes
+
+        Args:
+            comments (list): Analyzed comment dictionaries (with 'sentiment', optional 'topic' and 'post_url')
+            summary (dict): Aggregates returned by the analyze endpoint
+            result_id (str): Optional id to store under (used to restore results served from cache)
+
+        Returns:
+            str: Result id
+        """
+        if self.shared:
+            spill = self.create_spill(result_id)
+            spill.add(comments)
+            return self.save_spill(spill, summary)
+
+        result_id = result_id or uuid.uuid4().hex
+
+        # Index lists hold comment positions in ascending order, so cursors stay stable
+        by_sentiment = {}
+        by_topic = {}
+        by_post = {}
+        for idx, comment in enumerate(comments):
+            by_sentiment.setdefault(comment.get('sentiment', 'neutral'), []).append(idx)
+            if comment.get('topic'):
+                by_topic.setdefault(comment['topic'], []).append(idx)
+            if comment.get('post_url'):
+                by_post.setdefault(comment['post_url'], []).append(idx)
+
+        entry = {
+            'created_at': time.time(),
+            'comments': comments,
+            'summary': summary or {},
+            'indexes': {
+                'sentiment': by_sentiment,
+                'topic': by_topic,
+                'post': by_post
+            }
+        }
+
+        self._add(result_id, entry)
+        logger.info(f"Stored analysis result {result_id} with {len(comments)} comments")
+        return result_id
+
+    def create_spill(self, result_id=None):
+        """
+        Start a disk-backed result for comments that should never be held in memory at once
+
+        Args:
+            result_id (str): Optional id to store under
+
+        Returns:
+            ResultSpill: Writer to add analyzed comments to; register it with save_spill()
+        """
+        result_id = result_id or uuid.uuid4().hex
+        return ResultSpill(os.path.join(self.spill_dir, f"{result_id}.db"), result_id)
+
+    def save_spill(self, spill, summary=None):
+        """
+        Finish a spilled result and make it available like an in-memory one
+
+        Args:
+            spill (ResultSpill): Writer returned by create_spill()
+            summary (dict): Aggregates returned by the analyze endpoint
+
+        Returns:
+            str: Result id
+        """
+        # The summary is kept in the file too, for processes that reopen the result
+        spill.close(summary)
+        self._add(spill.result_id, {
+            'created_at': time.time(),
+            'spill': spill,
+            'summary': summary or {},
+            'owned': True
+        })
+        logger.info(f"Stored spilled analysis result {spill.result_id} with {spill.count} comments")
+        return spill.result_id
+
+    def _add(self, result_id, entry):
+        """Register an entry, evicting expired and least recently used results"""
+        with self._lock:
+            self._evict_expired()
+            self._sweep_spill_dir()
+            self._results[result_id] = entry
+            while len(self._results) > self.max_results:
+                evicted_id, evicted = self._results.popitem(last=False)
+                self._discard(evicted)
+                logger.info(f"Evicted analysis result {evicted_id}")
+
+    def get(self, result_id):
+        """
+        Get a stored result
+
+        Args:
+            result_id (str): Result id returned by save()
+
+        Returns:
+            dict: Stored entry or None if unknown/expired
+        """
+        with self._lock:
+            entry = self._results.get(result_id)
+            if entry is None:
+                return self._reopen_spill(result_id)
+            if time.time() - entry['created_at'] > self.ttl_seconds:
+                self._discard(self._results.pop(result_id))
+                return None
+            if 'spill' in entry and not os.path.exists(entry['spill'].path):
+                # Deleted by the process that owns it (evicted there)
+                self._results.pop(result_id)
+                return None
+            self._results.move_to_end(result_id)
+            return entry
+
+    def _reopen_spill(self, result_id):
+        """
+        Register a spilled result written by another process - a gunicorn worker sharing the
+        spill directory, or a previous run (caller must hold the lock)
+        """
+        if not result_id or not result_id.isalnum():
+            return None
+        path = os.path.join(self.spill_dir, f"{result_id}.db")
+        try:
+            created_at = os.path.getmtime(path)
+        except OSError:
+            return None
+        if time.time() - created_at > self.ttl_seconds:
+            self._remove_file(path)
+            return None
+        spill = ResultSpill(path, result_id, existing=True)
+        try:
+            summary = spill.read_summary()
+        except sqlite3.Error:
+            # Still being written, or removed in the meantime
+            return None
+        # Not owned: evicting it here drops the handle, the file stays for the other processes
+        entry = {'created_at': created_at, 'spill': spill, 'summary': summary, 'owned': False}
+        self._results[result_id] = entry
+        while len(self._results) > self.max_results:
+            _, evicted = self._results.popitem(last=False)
+            self._discard(evicted)
+        return entry
+
+    def query_comments(self, result_id, sentiment=None, topic=None, post=None,
+                       cursor=None, limit=100, fields=None):
+        """
+        Page through stored comments filtered by sentiment, topic and post
+
+        Args:
+            result_id (str): Result id
+            sentiment (str): Optional sentiment filter
+            topic (str): Optional topic filter
+            post (str): Optional post URL filter
+            cursor (str): Opaque cursor from a previous page
+            limit (int): Page size
+            fields (list): Optional list of fields to project
+
+        Returns:
+            dict: Page with 'comments', 'count' and 'next_cursor', or None if the result is unknown
+        """
+        entry = self.get(result_id)
+        if entry is None:
+            return None
+
+        page = []
+        next_cursor = None
+
+        for idx, comment in self._matches(entry, sentiment, topic, post, self.decode_cursor(cursor), limit + 1):
+            if len(page) == limit:
+                next_cursor = self.encode_cursor(idx)
+                break
+            page.append(comment)
+
+        if fields:
+            page = [self._project(comment, fields) for comment in page]
+
+        return {
+            'comments': page,
+            'count': len(page),
+            'next_cursor': next_cursor
+        }
+
+    def iter_comments(self, result_id, sentiment=None, topic=None, post=None,
+                      cursor=None, fields=None):
+        """
+        Iterate over every matching comment, for streaming responses
+
+        Args:
+            result_id (str): Result id
+            sentiment (str): Optional sentiment filter
+            topic (str): Optional topic filter
+            post (str): Optional post URL filter
+            cursor (str): Optional cursor to start from
+            fields (list): Optional list of fields to project
+
+        Returns:
+            generator: Matching comments, or None if the result is unknown
+        """
+        entry = self.get(result_id)
+        if entry is None:
+            return None
+
+        start = self.decode_cursor(cursor)
+
+        def generate():
+            for _, comment in self._matches(entry, sentiment, topic, post, start):
+                yield self._project(comment, fields) if fields else comment
+
+        return generate()
+
+    @classmethod
+    def _matches(cls, entry, sentiment, topic, post, start, limit=None):
+        """Yield (position, comment) pairs matching all filters, from start onwards"""
+        if 'spill' in entry:
+            yield from entry['spill'].iter_matches(sentiment, topic, post, start, limit)
+            return
+        comments = entry['comments']
+        for idx in cls._matching_positions(entry, sentiment, topic, post, start):
+            yield idx, comments[idx]
+
+    @staticmethod
+    def _matching_positions(entry, sentiment, topic, post, start):
+        """Yield positions of comments matching all filters, from start onwards"""
+        indexes = entry['indexes']
+
+        # Pick the index list for each active filter; the shortest one drives the scan
+        candidates = []
+        for name, value in (('sentiment', sentiment), ('topic', topic), ('post', post)):
+            if value:
+                candidates.append(indexes[name].get(value, []))
+
+        if not candidates:
+            yield from range(start, len(entry['comments']))
+            return
+
+        candidates.sort(key=len)
+        driver = candidates[0]
+        others = [set(c) for c in candidates[1:]]
+        for idx in driver[bisect_left(driver, start):]:
+            if all(idx in other for other in others):
+                yield idx
+
+    @staticmethod
+    def _project(comment, fields):
+        """Keep only the requested fields of a comment"""
+        return {field: comment.get(field) for field in fields}
+
+    @staticmethod
+    def encode_cursor(position):
+        """Encode a comment position as an opaque cursor"""
+        return base64.urlsafe_b64encode(str(position).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Decode an opaque cursor back to a comment position"""
+        if not cursor:
+            return 0
+        try:
+            return max(0, int(base64.urlsafe_b64decode(cursor.encode()).decode()))
+        except Exception:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    def _evict_expired(self):
+        """Drop expired results (caller must hold the lock)"""
+        now = time.time()
+        expired = [rid for rid, entry in self._results.items()
+                   if now - entry['created_at'] > self.ttl_seconds]
+        for rid in expired:
+            self._discard(self._results.pop(rid))
+
+    def _sweep_spill_dir(self):
+        """
+        Delete expired spill files nobody evicts - left by reopened results, other workers or
+        earlier runs (caller must hold the lock; runs at most every sweep_seconds)
+        """
+        now = time.time()
+        if now - self._last_sweep < self.sweep_seconds:
+            return
+        self._last_sweep = now
+        try:
+            names = os.listdir(self.spill_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.db'):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            try:
+                expired = now - os.path.getmtime(path) > self.ttl_seconds
+            except OSError:
+                continue
+            if expired:
+                self._remove_file(path)
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _discard(entry):
+        """Delete the file behind a spilled entry this process created"""
+        if 'spill' in entry and entry.get('owned', True):
+            entry['spill'].remove()
+
+
+class ResultSpill:
+    """
+    Disk-backed analysis result: comments are appended in batches to a private SQLite
+    file with filter indexes, so memory use does not grow with the number of comments
+    """
+
+    def __init__(self, path, result_id, batch_size=1000, existing=False):
+        """
+        Initialize the spill
+
+        Args:
+            path (str): SQLite file the comments are written to
+            result_id (str): Result id the spill will be registered under
+            batch_size (int): Comments buffered before they are written
+            existing (bool): Open a finished spill instead of creating a new one
+        """
+        self.path = path
+        self.result_id = result_id
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer = []
+        self._conn = None
+
+        if not existing:
+            # Scratch data - durability is not needed, write speed is
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.executescript("""
+                PRAGMA journal_mode = OFF;
+                PRAGMA synchronous = OFF;
+                CREATE TABLE comments (
+                    pos INTEGER PRIMARY KEY,
+                    sentiment TEXT,
+                    topic TEXT,
+                    post_url TEXT,
+                    data BLOB NOT NULL
+                );
+                CREATE TABLE meta (
+                    key TEXT PRIMARY KEY,
+                    value BLOB
+                );
+            """)
+
+    def add(self, comments):
+        """
+        Append analyzed comments
+
+        Args:
+            comments (iterable): Analyzed comment dictionaries
+        """
+        for comment in comments:
+            self._buffer.append((
+                self.count,
+                comment.get('sentiment', 'neutral'),
+                comment.get('topic'),
+                comment.get('post_url'),
+                dumps_bytes(comment)
+            ))
+            self.count += 1
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+
+    def close(self, summary=None):
+        """
+        Write remaining comments and build the filter indexes (faster after the bulk load)
+
+        Args:
+            summary (dict): Optional aggregates stored with the comments (see read_summary)
+        """
+        if self._conn is None:
+            return
+        self._flush()
+        self._conn.executescript("""
+            CREATE INDEX idx_spill_sentiment ON comments (sentiment, pos);
+            CREATE INDEX idx_spill_topic ON comments (topic, pos);
+            CREATE INDEX idx_spill_post ON comments (post_url, pos);
+        """)
+        self._conn.execute("INSERT INTO meta (key, value) VALUES ('summary', ?)", (dumps_bytes(summary or {}),))
+        self._conn.commit()
+        self._conn.close()
+        self._conn = None
+
+    def read_summary(self):
+        """
+        Aggregates stored by close()
+
+        Returns:
+            dict: Summary ({} for spills written before summaries were stored)
+
+        Raises:
+            sqlite3.Error: The spill is missing or not finished yet
+        """
+        with closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)) as conn:
+            has_meta = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'").fetchone()
+            if not has_meta:
+                return {}
+            row = conn.execute("SELECT value FROM meta WHERE key = 'summary'").fetchone()
+        if row is None:
+            raise sqlite3.OperationalError('spill is not finished')
+        return loads_bytes(row[0])
+
+    def iter_matches(self, sentiment=None, topic=None, post=None, start=0, limit=None):
+        """
+        Yield (position, comment) pairs matching all filters, in position order
+
+        Rows are read in pages on a short-lived connection, so a slow streaming
+        client does not pin a cursor (or the thread that opened it)
+        """
+        clauses = ["pos >= ?"]
+        filters = []
+        for column, value in (('sentiment', sentiment), ('topic', topic), ('post_url', post)):
+            if value:
+                clauses.append(f"{column} = ?")
+                filters.append(value)
+        query = f"SELECT pos, data FROM comments WHERE {' AND '.join(clauses)} ORDER BY pos LIMIT ?"
+
+        page_size = min(limit, self.batch_size) if limit else self.batch_size
+        remaining = limit
+        position = start
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            with closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)) as conn:
+                rows = conn.execute(query, [position, *filters, size]).fetchall()
+            for pos, data in rows:
+                yield pos, loads_bytes(data)
+            if len(rows) < size:
+                return
+            position = rows[-1][0] + 1
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def remove(self):
+        """Delete the spill file"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _flush(self):
+        if self._buffer:
+            self._conn.executemany(
+                "INSERT INTO comments (pos, sentiment, topic, post_url, data) VALUES (?, ?, ?, ?, ?)",
+                self._buffer
+            )
+            self._conn.commit()
+            self._buffer = []
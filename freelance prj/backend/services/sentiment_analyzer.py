@@ -1,4 +1,4 @@
-from transformers import BertTokenizer, BertForSequenceClassification, pipeline
+from transformers import AutoTokenizer, BertTokenizer, BertForSequenceClassification, pipeline
 import torch
 import logging
 from textblob import TextBlob
@@ -6,8 +6,20 @@ import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import re
+import time
+
+from services.metrics import (
+    COMMENTS_ANALYZED, MODEL_BATCH_SECONDS, MODEL_BATCH_SIZE, PREPROCESS_SECONDS,
+    SENTIMENT_TIER_COMMENTS, SENTIMENT_TIER_SECONDS
+)
+from services import tracing
+from services.model_loading import load_mmap_model
+from services.sampling import sample_sentiment
+from services.structured_logging import SampledLog
 
 logger = logging.getLogger(__name__)
+# Per-text failures (e.g. a broken model) would otherwise log once for every comment
+_per_text_errors = SampledLog(logger, every=100)
 
 # Download required NLTK data
 try:
@@ -22,10 +34,18 @@ class SentimentAnalyzer:
     Sentiment analysis using BERT model and NLTK
     """
     
-    def __init__(self):
+    def __init__(self, batch_size=32, model_path=None):
         """
         Initialize lightweight multilingual sentiment analysis model
+        
+        Args:
+            batch_size (int): Texts per model inference call
+            model_path (str): Optional local safetensors model directory - memory-mapped, so
+                processes loading the same files share the weights
         """
+        self.batch_size = batch_size
+        if model_path and self.load_local_model(model_path):
+            return
         try:
             logger.info("Loading lightweight sentiment analysis model...")
             
@@ -57,6 +77,44 @@ class SentimentAnalyzer:
             self.sentiment_pipeline = None
             self.is_multilingual = False
     
+    def load_local_model(self, model_path):
+        """
+        Load the model from a local directory with memory-mapped safetensors weights
+        
+        Args:
+            model_path (str): Directory with config.json, tokenizer files and model.safetensors
+            
+        Returns:
+            bool: True if loaded; False (after logging why) to fall back to the hub models
+        """
+        try:
+            started = time.perf_counter()
+            model = load_mmap_model(model_path)
+            self.sentiment_pipeline = pipeline(
+                "sentiment-analysis",
+                model=model,
+                tokenizer=AutoTokenizer.from_pretrained(model_path)
+            )
+            self.model_name = model_path
+            # nlptown-style models label 1-5 stars, binary models POSITIVE/NEGATIVE
+            self.is_multilingual = any('star' in str(label) for label in model.config.id2label.values())
+            logger.info(f"Memory-mapped sentiment model from {model_path} in {time.perf_counter() - started:.2f}s")
+            return True
+        except Exception as e:
+            logger.error(f"Could not load local model from {model_path}, using the hub models: {str(e)}")
+            return False
+    
+    def get_model_version(self):
+        """
+        Identify the model producing the sentiment labels
+        
+        Returns:
+            str: Hugging Face model name, or 'textblob' when running on the fallback
+        """
+        if self.sentiment_pipeline:
+            return self.model_name
+        return 'textblob'
+    
     def preprocess_text(self, text):
         """
         Clean and preprocess text for analysis
@@ -98,46 +156,78 @@ class SentimentAnalyzer:
                 text = text[:512]
             
             result = self.sentiment_pipeline(text)[0]
+            return self.map_model_output(result)
             
-            # Handle different model outputs
-            label = result['label']
-            score = result['score']
+        except Exception as e:
+            _per_text_errors.error("Model analysis error: %s", e)
+            return self.analyze_sentiment_textblob(text)
+    
+    def analyze_sentiment_bert_batch(self, texts):
+        """
+        Analyze sentiment of several texts in one model call
+        
+        Args:
+            texts (list): Cleaned comment texts
             
-            # Map model labels to our sentiment categories
-            if self.is_multilingual:
-                # nlptown model returns: 1 star, 2 stars, 3 stars, 4 stars, 5 stars
-                if '1 star' in label or '2 stars' in label:
-                    sentiment = 'negative'
-                elif '3 stars' in label:
-                    sentiment = 'neutral'
-                elif '4 stars' in label or '5 stars' in label:
-                    sentiment = 'positive'
-                else:
-                    # Fallback based on score
-                    sentiment = 'neutral' if score < 0.6 else 'positive'
-            else:
-                # DistilBERT returns: POSITIVE or NEGATIVE
-                label_upper = label.upper()
-                if 'POSITIVE' in label_upper:
-                    sentiment = 'positive'
-                elif 'NEGATIVE' in label_upper:
-                    sentiment = 'negative'
-                else:
-                    sentiment = 'neutral' if score < 0.6 else 'positive'
+        Returns:
+            list: Sentiment results with label and confidence, in input order
+        """
+        try:
+            # Truncate texts if too long (BERT has max token limit)
+            truncated = [text[:512] for text in texts]
+            with MODEL_BATCH_SECONDS.time():
+                results = self.sentiment_pipeline(truncated, batch_size=len(truncated), truncation=True)
+            MODEL_BATCH_SIZE.observe(len(truncated))
+            return [self.map_model_output(result) for result in results]
+        except Exception as e:
+            logger.error(f"Batched model analysis error, scoring texts one by one: {str(e)}")
+            return [self.analyze_sentiment_bert(text) for text in texts]
+    
+    def map_model_output(self, result):
+        """
+        Map a model prediction to our sentiment categories
+        
+        Args:
+            result (dict): Pipeline output with 'label' and 'score'
             
-            # Override to neutral if confidence is too low
-            if score < 0.55 and sentiment != 'neutral':
+        Returns:
+            dict: Sentiment result with label and confidence
+        """
+        # Handle different model outputs
+        label = result['label']
+        score = result['score']
+        
+        # Map model labels to our sentiment categories
+        if self.is_multilingual:
+            # nlptown model returns: 1 star, 2 stars, 3 stars, 4 stars, 5 stars
+            if '1 star' in label or '2 stars' in label:
+                sentiment = 'negative'
+            elif '3 stars' in label:
                 sentiment = 'neutral'
-            
-            return {
-                'sentiment': sentiment,
-                'confidence': round(score, 4),
-                'raw_label': label
-            }
-            
-        except Exception as e:
-            logger.error(f"Model analysis error: {str(e)}")
-            return self.analyze_sentiment_textblob(text)
+            elif '4 stars' in label or '5 stars' in label:
+                sentiment = 'positive'
+            else:
+                # Fallback based on score
+                sentiment = 'neutral' if score < 0.6 else 'positive'
+        else:
+            # DistilBERT returns: POSITIVE or NEGATIVE
+            label_upper = label.upper()
+            if 'POSITIVE' in label_upper:
+                sentiment = 'positive'
+            elif 'NEGATIVE' in label_upper:
+                sentiment = 'negative'
+            else:
+                sentiment = 'neutral' if score < 0.6 else 'positive'
+        
+        # Override to neutral if confidence is too low
+        if score < 0.55 and sentiment != 'neutral':
+            sentiment = 'neutral'
+        
+        return {
+            'sentiment': sentiment,
+            'confidence': round(score, 4),
+            'raw_label': label
+        }
     
     def analyze_sentiment_textblob(self, text):
         """
@@ -167,7 +257,7 @@ class SentimentAnalyzer:
             }
             
         except Exception as e:
-            logger.error(f"TextBlob analysis error: {str(e)}")
+            _per_text_errors.error("TextBlob analysis error: %s", e)
             return {
                 'sentiment': 'neutral',
                 'confidence': 0.0,
@@ -259,81 +349,250 @@ class SentimentAnalyzer:
         
         return False
     
-    def analyze_single(self, comment_data):
+    def classify_text(self, text):
         """
-        Analyze sentiment for a single comment with multilingual support
+        Classify a comment text without touching any comment dictionary
         
         Args:
-            comment_data (dict): Comment dictionary with 'text' field
+            text (str): Raw comment text
             
         Returns:
-            dict: Comment data with sentiment added
+            tuple: (sentiment, confidence, cleaned_text) - cleaned_text is None for empty text
         """
-        text = comment_data.get('text', '')
-        
-        if not text or len(text.strip()) == 0:
-            comment_data['sentiment'] = 'neutral'
-            comment_data['confidence'] = 0.0
-            return comment_data
+        return self.classify_texts([text])[0]
+    
+    def classify_texts(self, texts, groups=None):
+        """
+        Classify many comment texts - rule-based detection runs per text, the remaining
+        texts go through the model in batches of batch_size
         
-        # Priority 1: Check for neutral questions first
-        if self.detect_neutral_questions(text):
-            comment_data['sentiment'] = 'neutral'
-            comment_data['confidence'] = 0.90
-            comment_data['cleaned_text'] = text
-            return comment_data
+        Args:
+            texts (list): Raw comment texts
+            groups (list): Optional near-duplicate cluster id per text - texts left for the
+                model are scored once per cluster and share that label
+            
+        Returns:
+            list: (sentiment, confidence, cleaned_text) tuples in input order
+        """
+        results = [None] * len(texts)
+        pending = []
+        # Stage timings are summed locally and observed once per call to keep the loop cheap
+        question_seconds = positive_seconds = preprocess_seconds = 0.0
+        questions = positives = 0
         
-        # Priority 2: Check for positive indicators (emojis, blessings, prayers)
-        if self.detect_positive_indicators(text):
-            comment_data['sentiment'] = 'positive'
-            comment_data['confidence'] = 0.85
-            comment_data['cleaned_text'] = text
-            return comment_data
+        for idx, text in enumerate(texts):
+            try:
+                if not text or len(text.strip()) == 0:
+                    results[idx] = ('neutral', 0.0, None)
+                    continue
+                # Priority 1: Check for neutral questions first
+                started = time.perf_counter()
+                is_question = self.detect_neutral_questions(text)
+                checked = time.perf_counter()
+                question_seconds += checked - started
+                if is_question:
+                    results[idx] = ('neutral', 0.90, text)
+                    questions += 1
+                    continue
+                # Priority 2: Check for positive indicators (emojis, blessings, prayers)
+                is_positive = self.detect_positive_indicators(text)
+                started = time.perf_counter()
+                positive_seconds += started - checked
+                if is_positive:
+                    results[idx] = ('positive', 0.85, text)
+                    positives += 1
+                    continue
+                # Preprocess text
+                pending.append((idx, self.preprocess_text(text)))
+                preprocess_seconds += time.perf_counter() - started
+            except Exception as e:
+                _per_text_errors.error("Error analyzing comment %d: %s", idx, e)
+                results[idx] = ('neutral', 0.0, None)
         
-        # Preprocess text
-        cleaned_text = self.preprocess_text(text)
+        # Rules have run per text, so '?' and emojis still decide a text's label; only the
+        # first model-tier text of each cluster is scored
+        followers = []
+        if groups is not None:
+            leaders = {}
+            unique = []
+            for idx, cleaned in pending:
+                leader = leaders.setdefault(groups[idx], idx)
+                if leader == idx:
+                    unique.append((idx, cleaned))
+                else:
+                    followers.append((idx, leader, cleaned))
+            pending = unique
         
         # Priority 3: Analyze sentiment with BERT/TextBlob
-        if self.sentiment_pipeline:
-            result = self.analyze_sentiment_bert(cleaned_text)
-        else:
-            result = self.analyze_sentiment_textblob(cleaned_text)
+        tier = 'model' if self.sentiment_pipeline else 'textblob'
+        started = time.perf_counter()
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            cleaned_texts = [cleaned for _, cleaned in batch]
+            if self.sentiment_pipeline:
+                scored = self.analyze_sentiment_bert_batch(cleaned_texts)
+            else:
+                scored = [self.analyze_sentiment_textblob(cleaned) for cleaned in cleaned_texts]
+            for (idx, cleaned), result in zip(batch, scored):
+                results[idx] = (result['sentiment'], result['confidence'], cleaned)
+        for idx, leader, cleaned in followers:
+            results[idx] = (results[leader][0], results[leader][1], cleaned)
+        
+        COMMENTS_ANALYZED.inc(len(texts))
+        SENTIMENT_TIER_SECONDS.labels('question_rule').observe(question_seconds)
+        SENTIMENT_TIER_SECONDS.labels('positive_rule').observe(positive_seconds)
+        SENTIMENT_TIER_COMMENTS.labels('question_rule').inc(questions)
+        SENTIMENT_TIER_COMMENTS.labels('positive_rule').inc(positives)
+        PREPROCESS_SECONDS.observe(preprocess_seconds)
+        if pending:
+            SENTIMENT_TIER_SECONDS.labels(tier).observe(time.perf_counter() - started)
+            SENTIMENT_TIER_COMMENTS.labels(tier).inc(len(pending))
+        
+        return results
+    
+    def analyze_single(self, comment_data):
+        """
+        Analyze sentiment for a single comment with multilingual support
+        
+        Args:
+            comment_data (dict): Comment dictionary with 'text' field
+            
+        Returns:
+            dict: Comment data with sentiment added
+        """
+        sentiment, confidence, cleaned_text = self.classify_text(comment_data.get('text', ''))
         
         # Add sentiment data to comment
-        comment_data['sentiment'] = result['sentiment']
-        comment_data['confidence'] = result['confidence']
-        comment_data['cleaned_text'] = cleaned_text
+        comment_data['sentiment'] = sentiment
+        comment_data['confidence'] = confidence
+        if cleaned_text is not None:
+            comment_data['cleaned_text'] = cleaned_text
         
         return comment_data
     
-    def analyze_batch(self, comments_list):
+    def analyze_batch(self, comments_list, clusterer=None):
         """
         Analyze sentiment for multiple comments
         
         Args:
             comments_list (list): List of comment dictionaries
+            clusterer (NearDuplicateClusterer): Optional near-duplicate stage - rules still run per
+                comment, the model scores one comment per cluster and its label is copied to the
+                cluster's other model-tier comments
             
         Returns:
             list: Comments with sentiment analysis added
         """
+        if clusterer is not None and len(comments_list) > 1:
+            return self._analyze_clustered(comments_list, clusterer)
+        
         logger.info(f"Analyzing sentiment for {len(comments_list)} comments...")
         
-        analyzed_comments = []
-        for i, comment in enumerate(comments_list):
+        results = self.classify_texts([comment.get('text', '') for comment in comments_list])
+        for comment, (sentiment, confidence, cleaned_text) in zip(comments_list, results):
+            comment['sentiment'] = sentiment
+            comment['confidence'] = confidence
+            if cleaned_text is not None:
+                comment['cleaned_text'] = cleaned_text
+        
+        logger.info("Sentiment analysis completed")
+        return comments_list
+    
+    def _analyze_clustered(self, comments_list, clusterer):
+        """Score near-duplicate clusters once for the model tier and mark their members"""
+        texts = [comment.get('text', '') for comment in comments_list]
+        with tracing.span('dedup'):
+            labels = clusterer.cluster(texts)
+        
+        sizes = {}
+        for label in labels:
+            sizes[label] = sizes.get(label, 0) + 1
+        
+        results = self.classify_texts(texts, groups=labels)
+        for comment, label, (sentiment, confidence, cleaned_text) in zip(comments_list, labels, results):
+            comment['sentiment'] = sentiment
+            comment['confidence'] = confidence
+            if cleaned_text is not None:
+                comment['cleaned_text'] = cleaned_text
+            if sizes[label] > 1:
+                comment['duplicate_cluster'] = label
+                comment['duplicate_cluster_size'] = sizes[label]
+        
+        return comments_list
+    
+    def analyze_sample(self, comments_list, tolerance=0.02, confidence=0.95, strata_by='likes',
+                       max_sample=None, seed=None, clusterer=None):
+        """
+        Sampling mode - score a stratified random sample (by likes or time) instead of
+        every comment, stopping once the sentiment confidence intervals are narrow enough
+        
+        Args:
+            comments_list (list): Comment dictionaries with 'text' field
+            tolerance (float): Target confidence interval width (0.02 = +/- 1 point)
+            confidence (float): Confidence level of the intervals
+            strata_by (str): 'likes' or 'time'
+            max_sample (int): Optional cap on scored comments
+            seed (int): Optional random seed
+            clusterer (NearDuplicateClusterer): Optional near-duplicate stage, applied per sampling round
+            
+        Returns:
+            tuple: (analyzed_sample, estimate) - see services.sampling.sample_sentiment
+        """
+        def classify_round(comments):
             try:
-                analyzed_comment = self.analyze_single(comment)
-                analyzed_comments.append(analyzed_comment)
-                
-                # Log progress every 50 comments
-                if (i + 1) % 50 == 0:
-                    logger.info(f"Analyzed {i + 1}/{len(comments_list)} comments")
-                    
+                return self.analyze_batch(comments, clusterer=clusterer)
             except Exception as e:
-                logger.error(f"Error analyzing comment {i}: {str(e)}")
-                # Add comment with neutral sentiment on error
-                comment['sentiment'] = 'neutral'
-                comment['confidence'] = 0.0
-                analyzed_comments.append(comment)
+                logger.error(f"Error analyzing sampled comments: {str(e)}")
+                for comment in comments:
+                    comment['sentiment'] = 'neutral'
+                    comment['confidence'] = 0.0
+                return comments
         
-        logger.info("Sentiment analysis completed")
-        return analyzed_comments
+        # Each sampling round is scored as one batch through classify_texts
+        return sample_sentiment(
+            comments_list,
+            classify_round,
+            tolerance=tolerance,
+            confidence=confidence,
+            strata_by=strata_by,
+            max_sample=max_sample,
+            seed=seed
+        )
+    
+    def aggregate_batch(self, comments_list, topic_classifier=None):
+        """
+        Lean aggregation mode - count sentiments (and negative topics) without
+        mutating, copying or retaining the comment dictionaries
+        
+        Args:
+            comments_list (iterable): Comment dictionaries with 'text' field
+            topic_classifier (TopicClassifier): Optional classifier used to count
+                topics of negative comments
+            
+        Returns:
+            dict: Counters with 'total', 'positive', 'negative', 'neutral' and 'topics'
+        """
+        counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        topic_counts = {}
+        
+        def count(texts):
+            for text, (sentiment, _, cleaned_text) in zip(texts, self.classify_texts(texts)):
+                counts[sentiment] += 1
+                if sentiment == 'negative' and topic_classifier is not None:
+                    topic = topic_classifier.classify_text(cleaned_text or text)
+                    topic_counts[topic] = topic_counts.get(topic, 0) + 1
+        
+        # Only the texts of one inference batch are held at a time
+        texts = []
+        for comment in comments_list:
+            texts.append(comment.get('text', ''))
+            if len(texts) >= self.batch_size:
+                count(texts)
+                texts = []
+        count(texts)
+        
+        counts['total'] = counts['positive'] + counts['negative'] + counts['neutral']
+        counts['topics'] = topic_counts
+        
+        logger.info(f"Aggregated sentiment for {counts['total']} comments")
+        return counts
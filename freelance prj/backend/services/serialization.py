@@ -0,0 +1,253 @@
+import gzip
+import json
+import logging
+import zlib
+
+from flask.json.provider import DefaultJSONProvider
+
+from services.metrics import SERIALIZATION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Optional fast serializers - fall back to the standard library when missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/plain')
+
+
+def dumps_bytes(obj):
+    """
+    Serialize an object to UTF-8 JSON bytes, using orjson when available
+
+    Args:
+        obj: JSON-serializable object
+
+    Returns:
+        bytes: Encoded JSON
+    """
+    with SERIALIZATION_SECONDS.time():
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                # e.g. integers above 64 bit - let the standard library handle them
+                pass
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads_bytes(data):
+    """
+    Deserialize JSON bytes or text, using orjson when available
+
+    Args:
+        data (bytes): Encoded JSON
+
+    Returns:
+        object: Decoded value
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _default(obj):
+    """Serialize types neither serializer handles natively"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that serializes with orjson (falls back to the stdlib json module)
+    """
+
+    def dumps(self, obj, **kwargs):
+        """Serialize to a JSON string"""
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        """Deserialize JSON text or bytes"""
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """Build a JSON response straight from bytes, skipping the str round trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def iter_ndjson(items):
+    """
+    Encode items as newline-delimited JSON, one line per item
+
+    Args:
+        items (iterable): JSON-serializable objects
+
+    Yields:
+        bytes: One encoded line per item
+    """
+    for item in items:
+        yield dumps_bytes(item) + b'\n'
+
+
+def iter_gzip(chunks, level=6):
+    """
+    Gzip a stream of byte chunks incrementally
+
+    Args:
+        chunks (iterable): Byte chunks
+        level (int): Compression level
+
+    Yields:
+        bytes: Compressed chunks
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    buffered = []
+    buffered_size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        buffered_size += len(chunk)
+        # Flush in ~64KB blocks so clients start parsing early without tiny gzip frames
+        if buffered_size >= 65536:
+            yield compressor.compress(b''.join(buffered)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            buffered = []
+            buffered_size = 0
+    if buffered:
+        yield compressor.compress(b''.join(buffered))
+    yield compressor.flush()
+
+
+def iter_brotli(chunks, quality=5):
+    """
+    Brotli-compress a stream of byte chunks incrementally (requires the brotli package)
+
+    Args:
+        chunks (iterable): Byte chunks
+        quality (int): Brotli quality level
+
+    Yields:
+        bytes: Compressed chunks
+    """
+    compressor = brotli.Compressor(quality=quality)
+    buffered = []
+    buffered_size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        buffered_size += len(chunk)
+        if buffered_size >= 65536:
+            yield compressor.process(b''.join(buffered)) + compressor.flush()
+            buffered = []
+            buffered_size = 0
+    if buffered:
+        yield compressor.process(b''.join(buffered))
+    yield compressor.finish()
+
+
+def iter_encoded(chunks, encoding):
+    """
+    Compress a stream of byte chunks with the encoding picked by choose_encoding()
+
+    Args:
+        chunks (iterable): Byte chunks
+        encoding (str): 'br', 'gzip' or None (chunks are passed through)
+
+    Returns:
+        iterable: Encoded chunks
+    """
+    if encoding == 'br':
+        return iter_brotli(chunks)
+    if encoding == 'gzip':
+        return iter_gzip(chunks)
+    return chunks
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the best supported content encoding from an Accept-Encoding header
+
+    Args:
+        accept_encoding (str): Raw Accept-Encoding header value
+
+    Returns:
+        str: 'br', 'gzip' or None
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        pieces = part.strip().split(';')
+        coding = pieces[0].strip().lower()
+        quality = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+
+def compress_response(response, accept_encoding, min_size=1024, gzip_level=6, brotli_quality=5):
+    """
+    Compress a buffered response body when the client accepts it and it is big enough
+
+    Args:
+        response (flask.Response): Outgoing response
+        accept_encoding (str): Request Accept-Encoding header
+        min_size (int): Minimum body size in bytes worth compressing
+        gzip_level (int): Gzip compression level
+        brotli_quality (int): Brotli quality level
+
+    Returns:
+        flask.Response: The same response, possibly compressed
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+
+    encoding = choose_encoding(accept_encoding)
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=brotli_quality)
+    elif encoding == 'gzip':
+        compressed = gzip.compress(body, compresslevel=gzip_level)
+    else:
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from the identity body, so they can only share a weak validator
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    logger.debug(f"Compressed response {len(body)} -> {len(compressed)} bytes ({encoding})")
+    return response
@@ -0,0 +1,88 @@
+import logging
+import threading
+
+from services.metrics import SINGLE_FLIGHT_CALLS
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    """A computation in flight, shared by every caller with the same key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    In-process request coalescing: concurrent calls with the same key wait on
+    one shared computation instead of each running their own
+    """
+
+    def __init__(self):
+        """Initialize the in-flight table and metrics"""
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn once per key at a time; duplicates wait and share the outcome
+
+        Args:
+            key (hashable): Identity of the computation
+            fn (callable): Zero-argument function computing the result
+
+        Returns:
+            Result of fn (shared between callers - treat as read-only)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                SINGLE_FLIGHT_CALLS.labels('coalesced').inc()
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+                SINGLE_FLIGHT_CALLS.labels('executed').inc()
+                leader = True
+
+        if not leader:
+            logger.info(f"Coalescing request with in-flight computation for {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.info(f"Shared result for {key} with {call.waiters} coalesced request(s)")
+
+    def stats(self):
+        """
+        Get coalescing metrics
+
+        Returns:
+            dict: executions, coalesced and in_flight counts
+        """
+        with self._lock:
+            return {
+                'executions': self._executions,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls)
+            }
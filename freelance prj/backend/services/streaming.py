@@ -0,0 +1,122 @@
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StreamingAggregator:
+    """
+    Memory-bounded analysis: comments are scored in fixed-size chunks, folded into
+    running counters and handed to sinks (spilled result, persistent store), then dropped.
+    Only counters and one small summary per post are kept.
+    """
+
+    def __init__(self, sentiment_analyzer, topic_classifier, sinks=None, chunk_size=500, clusterer=None):
+        """
+        Initialize the aggregator
+
+        Args:
+            sentiment_analyzer (SentimentAnalyzer): Scores comment sentiment
+            topic_classifier (TopicClassifier): Classifies topics of negative comments
+            sinks (list): Callables receiving every analyzed chunk (list of comment dicts)
+            chunk_size (int): Comments scored and handed to the sinks at a time
+            clusterer (NearDuplicateClusterer): Optional near-duplicate stage, applied per chunk
+        """
+        self.sentiment_analyzer = sentiment_analyzer
+        self.topic_classifier = topic_classifier
+        self.sinks = sinks or []
+        self.chunk_size = chunk_size
+        self.clusterer = clusterer
+        self.sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        self.topic_stats = {}
+        self.posts_analysis = []
+        self.total_posts = 0
+        self.duplicate_clusters = 0
+        self.duplicate_comments = 0
+        # (size, text, sentiment) of the largest clusters seen so far
+        self._largest_clusters = []
+
+    @property
+    def total_comments(self):
+        return sum(self.sentiment_counts.values())
+
+    def duplicate_stats(self, top=5):
+        """Near-duplicate summary in the shape of the non-streaming responses' duplicate_stats"""
+        total = self.total_comments
+        return {
+            'clusters': self.duplicate_clusters,
+            'duplicate_comments': self.duplicate_comments,
+            'duplicate_percentage': round(self.duplicate_comments / total * 100, 2) if total else 0,
+            'largest_clusters': [
+                {'size': size, 'text': text, 'sentiment': sentiment}
+                for size, text, sentiment in sorted(self._largest_clusters, reverse=True)[:top]
+            ]
+        }
+
+    def add_post(self, post_url, post_date, comments):
+        """
+        Analyze the comments of one post
+
+        Args:
+            post_url (str): Post URL
+            post_date (str): Post date ('YYYY-MM-DD' or 'unknown')
+            comments (iterable): Raw comment dictionaries - consumed chunk by chunk
+        """
+        breakdown = {'positive': 0, 'negative': 0, 'neutral': 0}
+        for chunk in self._chunks(comments):
+            for comment in chunk:
+                comment['post_url'] = post_url
+            self._add_chunk(chunk, breakdown)
+
+        self.total_posts += 1
+        self.posts_analysis.append({
+            'post_url': post_url,
+            'post_date': post_date,
+            'total_comments': sum(breakdown.values()),
+            'sentiment_breakdown': breakdown
+        })
+
+    def _add_chunk(self, chunk, breakdown):
+        analyzed = self.sentiment_analyzer.analyze_batch(chunk, clusterer=self.clusterer)
+        self._count_duplicates(analyzed)
+
+        negative = [c for c in analyzed if c['sentiment'] == 'negative']
+        if negative:
+            self.topic_classifier.classify_topics(negative)
+            for comment in negative:
+                topic = comment.get('topic', 'Other')
+                self.topic_stats[topic] = self.topic_stats.get(topic, 0) + 1
+
+        for comment in analyzed:
+            self.sentiment_counts[comment['sentiment']] += 1
+            if breakdown is not None:
+                breakdown[comment['sentiment']] += 1
+
+        for sink in self.sinks:
+            sink(analyzed)
+
+    def _count_duplicates(self, analyzed, keep=5):
+        """Fold the chunk's near-duplicate clusters (ids are local to the chunk) into the running stats"""
+        clusters = {}
+        for comment in analyzed:
+            label = comment.get('duplicate_cluster')
+            if label is not None and label not in clusters:
+                clusters[label] = comment
+        for comment in clusters.values():
+            self.duplicate_clusters += 1
+            self.duplicate_comments += comment['duplicate_cluster_size']
+            entry = (comment['duplicate_cluster_size'], comment.get('text', ''), comment['sentiment'])
+            if len(self._largest_clusters) < keep:
+                heapq.heappush(self._largest_clusters, entry)
+            else:
+                heapq.heappushpop(self._largest_clusters, entry)
+
+    def _chunks(self, comments):
+        """Group an iterable of comments into lists of at most chunk_size"""
+        chunk = []
+        for comment in comments:
+            chunk.append(comment)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -0,0 +1,141 @@
+import atexit
+import copy
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+from services import tracing
+
+# Attributes every LogRecord has - anything else was passed with extra= and is emitted as a field
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'trace_id'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, trace_id, extra fields, exception"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if getattr(record, 'trace_id', None):
+            entry['trace_id'] = record.trace_id
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Plain text with the trace id, for local development"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(trace_id)s] %(message)s')
+
+    def format(self, record):
+        if not getattr(record, 'trace_id', None):
+            record.trace_id = '-'
+        return super().format(record)
+
+class _TraceIdFilter(logging.Filter):
+    """Stamp records with the current request's trace id on the logging thread"""
+
+    def filter(self, record):
+        trace = tracing.current_trace()
+        record.trace_id = trace.trace_id if trace is not None else None
+        return True
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that only resolves the message (args are merged now, while they still
+    hold the values being logged) and leaves formatting to the listener thread
+    """
+
+    def prepare(self, record):
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+_listener = None
+_queue_handler = None
+
+def _start_listener(handler):
+    global _listener
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+
+def configure_logging(level='INFO', log_format='json'):
+    """
+    Route all logging through a non-blocking queue: callers only enqueue records, a
+    background thread formats and writes them to stderr
+
+    Args:
+        level (str): Root log level (e.g. 'INFO', 'DEBUG')
+        log_format (str): 'json' (one object per line) or 'text'
+    """
+    global _queue_handler
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if log_format == 'json' else TextFormatter())
+
+    _queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+    _queue_handler.addFilter(_TraceIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _start_listener(handler)
+    atexit.register(lambda: _listener.stop())
+    # Forked workers (gunicorn) inherit the handler but not the listener thread
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: _start_listener(handler))
+
+class SampledLog:
+    """
+    Log a repeated message only on its 1st, (every+1)th, (2*every+1)th... occurrence, with the
+    running count appended - for per-item log sites in hot loops
+    """
+
+    def __init__(self, logger, every=100):
+        """
+        Args:
+            logger (logging.Logger): Logger to write to
+            every (int): Log one occurrence out of this many
+        """
+        self.logger = logger
+        self.every = every
+        self._counter = itertools.count()
+
+    def log(self, level, msg, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        n = next(self._counter)
+        if n % self.every == 0:
+            self.logger.log(level, msg + ' (occurrence %d, logging 1 in %d)', *args, n + 1, self.every)
+
+    def error(self, msg, *args):
+        self.log(logging.ERROR, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(logging.WARNING, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(logging.INFO, msg, *args)
@@ -5,8 +5,11 @@ import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import re
+import time
 from collections import Counter
 
+from services.metrics import TOPIC_CLASSIFICATION_SECONDS
+
 logger = logging.getLogger(__name__)
 
 class TopicClassifier:
@@ -233,6 +236,23 @@ class TopicClassifier:
         # If no keywords matched, use semantic analysis
         return self.analyze_sentiment_context(text)
     
+    def classify_text(self, text):
+        """
+        Classify the topic of a single negative comment text (no keyword extraction)
+        
+        Args:
+            text (str): Comment text
+            
+        Returns:
+            str: Topic category
+        """
+        if not text or len(text.strip()) == 0:
+            # Even empty comments get a topic based on context
+            return 'Bad Quality'
+        
+        # Classify topic using keyword matching (with semantic fallback)
+        return self.classify_topic_by_keywords(text)
+    
     def classify_topics(self, negative_comments):
         """
         Classify topics for all negative comments with intelligent fallback
@@ -249,25 +269,24 @@ class TopicClassifier:
             return negative_comments
         
         # Classify each comment
+        started = time.perf_counter()
         for comment in negative_comments:
             text = comment.get('cleaned_text', comment.get('text', ''))
             
+            topic = self.classify_text(text)
+            comment['topic'] = topic
+            
             if not text or len(text.strip()) == 0:
-                # Even empty comments get a topic based on context
-                comment['topic'] = 'Bad Quality'
                 comment['keywords'] = []
                 continue
             
-            # Classify topic using keyword matching (with semantic fallback)
-            topic = self.classify_topic_by_keywords(text)
-            comment['topic'] = topic
-            
             # Extract key phrases for this comment
             keywords = self.extract_keywords(text)
             comment['keywords'] = keywords[:5]  # Top 5 keywords
             
             # Log individual classification for debugging
-            logger.debug(f"Comment: '{text[:50]}...' -> Topic: {topic}")
+            logger.debug("Comment: '%.50s...' -> Topic: %s", text, topic)
+        TOPIC_CLASSIFICATION_SECONDS.observe(time.perf_counter() - started)
         
         # Log topic distribution
         topic_counts = Counter([c['topic'] for c in negative_comments])
@@ -0,0 +1,175 @@
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Optional sampling profiler - cProfile (deterministic, stdlib) is used without it
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    SamplingProfiler = None
+
+MAX_SPANS = 200
+SPAN_NAME_PATTERN = re.compile(r'[^A-Za-z0-9_.-]')
+
+_current = contextvars.ContextVar('trace', default=None)
+_profiler_lock = threading.Lock()
+
+class Trace:
+    """Spans recorded while serving one request - thread-safe, spans may nest or overlap"""
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self._stages = {}
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, ended=None):
+        """Add a finished span of `seconds` ending at `ended` (perf_counter, default now)"""
+        ended = ended if ended is not None else time.perf_counter()
+        with self._lock:
+            stage = self._stages.setdefault(name, [0.0, 0])
+            stage[0] += seconds
+            stage[1] += 1
+            if len(self._spans) < MAX_SPANS:
+                self._spans.append((name, ended - seconds - self.started, seconds))
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def stages(self):
+        """Total time and span count per stage name, in first-seen order"""
+        with self._lock:
+            return {name: {'ms': round(total * 1000, 3), 'count': count}
+                    for name, (total, count) in self._stages.items()}
+
+    def server_timing(self):
+        """Server-Timing header value - one metric per stage plus the request total"""
+        parts = []
+        for name, stage in self.stages().items():
+            metric = SPAN_NAME_PATTERN.sub('_', name)
+            desc = f';desc="{stage["count"]} spans"' if stage['count'] > 1 else ''
+            parts.append(f"{metric};dur={stage['ms']:.1f}{desc}")
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ', '.join(parts)
+
+    def to_dict(self):
+        """Timings block for JSON responses"""
+        with self._lock:
+            spans = [{'name': name, 'start_ms': round(start * 1000, 3), 'ms': round(seconds * 1000, 3)}
+                     for name, start, seconds in self._spans]
+        return {
+            'trace_id': self.trace_id,
+            'total_ms': round(self.elapsed_ms(), 3),
+            'stages': self.stages(),
+            'spans': spans
+        }
+
+def start_trace(trace_id=None):
+    """Make a new trace current for this thread/context; returns (trace, token for end_trace)"""
+    trace = Trace(trace_id)
+    return trace, _current.set(trace)
+
+def end_trace(token):
+    _current.reset(token)
+
+def current_trace():
+    return _current.get()
+
+def record(name, seconds):
+    """Add a finished span to the current trace (no-op outside a traced request)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.record(name, seconds)
+
+class span:
+    """Context manager timing its block as a span of the current trace"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+        return False
+
+def propagate(fn):
+    """Wrap fn so it records into the caller's trace when run on an executor thread"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+class RequestProfiler:
+    """
+    Profile one request on its handling thread - pyinstrument (sampling, HTML flame graph)
+    when installed, cProfile otherwise (.prof file for snakeviz/flameprof plus a text summary)
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self._profiler = None
+
+    @property
+    def kind(self):
+        return 'pyinstrument' if SamplingProfiler is not None else 'cprofile'
+
+    def start(self):
+        """Start profiling; returns False when another request is already being profiled"""
+        # Only one profiler can be active per process
+        if not _profiler_lock.acquire(blocking=False):
+            return False
+        try:
+            if SamplingProfiler is not None:
+                self._profiler = SamplingProfiler()
+                self._profiler.start()
+            else:
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+        except Exception:
+            _profiler_lock.release()
+            raise
+        return True
+
+    def stop(self, name):
+        """
+        Stop profiling and write the output
+
+        Args:
+            name (str): File name without extension (the trace id)
+
+        Returns:
+            str: Path of the written profile
+        """
+        try:
+            if SamplingProfiler is not None:
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+        finally:
+            _profiler_lock.release()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        if SamplingProfiler is not None:
+            path = os.path.join(self.output_dir, f"{name}.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self._profiler.output_html())
+            return path
+
+        path = os.path.join(self.output_dir, f"{name}.prof")
+        self._profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(self._profiler, stream=summary).sort_stats('cumulative').print_stats(40)
+        with open(os.path.join(self.output_dir, f"{name}.txt"), 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        return path
@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Rollup bucket each trend bucket is read from; weeks are regrouped from daily rollups
+TREND_SOURCES = {'hour': 'hour', 'day': 'day', 'week': 'day'}
+BUCKET_SECONDS = {'hour': 3600, 'day': 86400, 'week': 7 * 86400}
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+def bucket_floor(timestamps, bucket):
+    """
+    Floor unix timestamps to the start of their bucket (weeks start on Monday, UTC)
+
+    Args:
+        timestamps (np.ndarray): Unix seconds
+        bucket (str): 'hour', 'day' or 'week'
+
+    Returns:
+        np.ndarray: Bucket start for every timestamp
+    """
+    if bucket == 'week':
+        # 1970-01-01 was a Thursday, so shift by 3 days to land on Mondays
+        days = timestamps // 86400
+        return (days - (days + 3) % 7) * 86400
+    size = BUCKET_SECONDS[bucket]
+    return timestamps // size * size
+
+def build_trend_series(rows, bucket, fill_gaps=True):
+    """
+    Turn rollup rows into a time series of sentiment and topic counts
+
+    Args:
+        rows (list): (bucket_start, sentiment, topic, count) tuples from CommentStore.query_rollups
+        bucket (str): 'hour', 'day' or 'week'
+        fill_gaps (bool): Emit zero-count points for empty buckets between the first and last one
+
+    Returns:
+        list: Points with 'bucket_start' (ISO), 'positive', 'negative', 'neutral', 'total' and 'topics'
+    """
+    if not rows:
+        return []
+
+    df = pd.DataFrame.from_records(rows, columns=['bucket_start', 'sentiment', 'topic', 'count'])
+    df['bucket_start'] = bucket_floor(df['bucket_start'].to_numpy(dtype=np.int64), bucket)
+
+    sentiments = (
+        df.pivot_table(index='bucket_start', columns='sentiment', values='count', aggfunc='sum', fill_value=0)
+        .reindex(columns=list(SENTIMENTS), fill_value=0)
+    )
+    if fill_gaps:
+        step = BUCKET_SECONDS[bucket]
+        full_index = np.arange(sentiments.index.min(), sentiments.index.max() + step, step)
+        sentiments = sentiments.reindex(full_index, fill_value=0)
+    sentiments['total'] = sentiments[list(SENTIMENTS)].sum(axis=1)
+
+    topics = {}
+    topic_counts = df[df['topic'] != ''].groupby(['bucket_start', 'topic'], sort=False)['count'].sum()
+    for (start, topic), count in topic_counts.items():
+        topics.setdefault(start, {})[topic] = int(count)
+
+    series = []
+    for start, positive, negative, neutral, total in sentiments.itertuples(name=None):
+        series.append({
+            'bucket_start': datetime.fromtimestamp(int(start), tz=timezone.utc).isoformat(),
+            'positive': int(positive),
+            'negative': int(negative),
+            'neutral': int(neutral),
+            'total': int(total),
+            'topics': topics.get(start, {})
+        })
+    return series
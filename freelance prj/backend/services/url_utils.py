@@ -0,0 +1,48 @@
+from urllib.parse import urlsplit, urlunsplit
+
+# Query parameters that only track where a link was shared from - matched by exact name, so
+# real parameters that merely start with the same letters (refid, ...) are kept
+TRACKING_PARAMS = frozenset(('igshid', 'igsh', 'fbclid', 'mibextid', '__tn__', 'ref', 'rdid', 'share_url'))
+# Tracking parameter families (utm_source, __cft__[0], ...)
+TRACKING_PARAM_PREFIXES = ('utm_', '__cft__')
+
+
+def is_tracking_param(pair):
+    """Whether a "name=value" query pair only tracks where the link was shared from"""
+    name = pair.split('=', 1)[0].lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+def normalize_url(url):
+    """
+    Normalize an Instagram/Facebook URL so equivalent links map to the same key
+
+    Lowercases scheme and host, drops "www."/"m." prefixes, tracking query
+    parameters, fragments and the trailing slash.
+
+    Args:
+        url (str): Raw URL as submitted by the client
+
+    Returns:
+        str: Normalized URL
+    """
+    if not url:
+        return ''
+
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    for prefix in ('www.', 'm.', 'web.', 'mobile.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+
+    query = '&'.join(
+        pair for pair in parts.query.split('&')
+        if pair and not is_tracking_param(pair)
+    )
+    path = parts.path.rstrip('/') or '/'
+
+    return urlunsplit(('https', host, path, query, ''))
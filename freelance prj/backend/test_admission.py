@@ -0,0 +1,168 @@
+"""
+Test script for admission control (concurrency limit with fair, bounded queuing)
+Checks rejections when the queue or a client's share of it is full, round-robin hand-over
+between clients, a timeout that races a hand-over, and the Retry-After estimate
+
+Run directly (python test_admission.py) or with pytest
+"""
+
+import threading
+import time
+
+import services.admission as admission
+from services.admission import AdmissionController, AdmissionRejected
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    assert condition()
+
+def queue_up(controller, client, admitted):
+    """Start a request that waits for a slot and records `client` in `admitted` once it has one"""
+    queued = controller.stats()['queued']
+
+    def worker():
+        controller.acquire(client)
+        admitted.append(client)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    # Wait until it is queued so requests enter the queue in a known order
+    wait_for(lambda: controller.stats()['queued'] == queued + 1)
+    return thread
+
+def rejection(controller, client):
+    try:
+        controller.acquire(client)
+    except AdmissionRejected as e:
+        return e
+    raise AssertionError('the request should have been rejected')
+
+def test_queue_full():
+    controller = AdmissionController('test', max_concurrent=1, max_queue=1, queue_timeout=5)
+    controller.acquire('a')
+    admitted = []
+    thread = queue_up(controller, 'b', admitted)
+
+    rejected = rejection(controller, 'c')
+    assert rejected.reason == 'too many analyses running and queued'
+    assert controller.stats()['rejected'] == 1
+
+    controller.release(0.1)
+    thread.join(5)
+    assert admitted == ['b']
+    assert controller.stats()['running'] == 1 and controller.stats()['queued'] == 0
+
+def test_per_client_cap():
+    """A client at its queue share is rejected while other clients can still queue"""
+    controller = AdmissionController('test', max_concurrent=1, max_queue=4, queue_timeout=5,
+                                     max_queued_per_client=1)
+    controller.acquire('a')
+    admitted = []
+    threads = [queue_up(controller, 'a', admitted)]
+
+    rejected = rejection(controller, 'a')
+    assert rejected.reason == 'too many queued requests from this client'
+    threads.append(queue_up(controller, 'b', admitted))
+
+    for _ in threads:
+        controller.release(0.1)
+    for thread in threads:
+        thread.join(5)
+    assert admitted == ['a', 'b']
+
+def test_round_robin_order():
+    """Slots go to the waiting clients in turn, not in arrival order"""
+    controller = AdmissionController('test', max_concurrent=1, max_queue=8, queue_timeout=5,
+                                     max_queued_per_client=3)
+    controller.acquire('holder')
+    admitted = []
+    threads = [queue_up(controller, client, admitted) for client in ('a', 'a', 'a', 'b', 'c', 'b')]
+    assert controller.stats()['queued_clients'] == 3
+
+    for count in range(1, len(threads) + 1):
+        controller.release(0.1)
+        wait_for(lambda: len(admitted) == count)
+    assert admitted == ['a', 'b', 'c', 'a', 'b', 'a']
+
+def test_timeout_racing_handover():
+    """A slot handed over just after the wait timed out is kept, not leaked or rejected"""
+    controller = AdmissionController('test', max_concurrent=1, max_queue=1, queue_timeout=0.01)
+    controller.acquire('a')
+
+    class HandedOverAfterTimeout:
+        """Event whose wait times out, with the slot released right after (before the re-check)"""
+
+        def __init__(self):
+            self.event = threading.Event()
+
+        def set(self):
+            self.event.set()
+
+        def wait(self, timeout):
+            self.event.wait(timeout)
+            controller.release(0.1)
+            return False
+
+    class RacingWaiter(admission._Waiter):
+        def __init__(self):
+            super().__init__()
+            self.event = HandedOverAfterTimeout()
+
+    original = admission._Waiter
+    admission._Waiter = RacingWaiter
+    try:
+        controller.acquire('b')
+    finally:
+        admission._Waiter = original
+
+    stats = controller.stats()
+    assert stats['running'] == 1 and stats['queued'] == 0 and stats['rejected'] == 0
+    controller.release(0.1)
+    assert controller.stats()['running'] == 0
+
+def test_timeout_rejects_and_leaves_queue():
+    controller = AdmissionController('test', max_concurrent=1, max_queue=2, queue_timeout=0.05)
+    controller.acquire('a')
+    rejected = rejection(controller, 'b')
+    assert rejected.reason.startswith('waited')
+    stats = controller.stats()
+    assert stats['queued'] == 0 and stats['queued_clients'] == 0
+
+def test_retry_after():
+    """Retry-After grows with the queue ahead, from the average time a slot is held"""
+    controller = AdmissionController('test', max_concurrent=2, max_queue=2, queue_timeout=5)
+    # Without a measured service time the estimate assumes 10s per request
+    controller.acquire('a')
+    controller.acquire('b')
+    admitted = []
+    threads = [queue_up(controller, client, admitted) for client in ('c', 'd')]
+    assert rejection(controller, 'e').retry_after == 15
+
+    # The waiting requests take over the two slots, which were held 4s each
+    controller.release(4.0)
+    controller.release(4.0)
+    for thread in threads:
+        thread.join(5)
+    threads = [queue_up(controller, client, admitted) for client in ('f', 'g')]
+    assert rejection(controller, 'h').retry_after == 6
+
+    for _ in range(4):
+        controller.release(4.0)
+    for thread in threads:
+        thread.join(5)
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Admission Control Test")
+    print("="*60)
+
+    test_queue_full()
+    test_per_client_cap()
+    test_round_robin_order()
+    test_timeout_racing_handover()
+    test_timeout_rejects_and_leaves_queue()
+    test_retry_after()
+
+    print("\n✅ Admission control queues fairly and sheds load")
@@ -0,0 +1,214 @@
+"""
+Test script for the HTTP API
+Runs the Flask app against the offline Apify stand-in (APIFY_FAKE) with scratch stores, so
+no network, Apify key or model download is needed
+
+Run directly (python test_api.py) or with pytest
+"""
+
+import atexit
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix='test_api_')
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+# Must be set before the app module builds its services
+os.environ.update({
+    'APIFY_FAKE': '1',
+    'APIFY_CALLS_PER_SECOND': '0',
+    'MONITOR_ENABLED': 'false',
+    'LOG_FORMAT': 'text',
+    'RESULT_SPILL_DIR': os.path.join(SCRATCH_DIR, 'spills'),
+    'RESPONSE_CACHE_DIR': os.path.join(SCRATCH_DIR, 'cache'),
+    'COMMENT_STORE_PATH': os.path.join(SCRATCH_DIR, 'comments.db')
+})
+os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+import brotli
+import pyarrow as pa
+
+import app as backend
+from services.admission import AdmissionController
+
+client = backend.app.test_client()
+
+POST_URLS = ['https://www.instagram.com/p/batch1/', 'https://www.instagram.com/p/batch2/']
+
+def test_batch_result_has_summary():
+    """Batch results are stored with their summary, so the posts table can be exported"""
+    response = client.post('/api/analyze-batch', json={'urls': POST_URLS, 'max_comments': 20, 'refresh': True})
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert [post['post_url'] for post in data['posts_analysis']] == POST_URLS
+    assert all(result['comments_url'].startswith(data['comments_url']) for result in data['results'])
+
+    stored = backend.result_store.get(data['result_id'])
+    assert stored['summary']['total_comments'] == data['total_comments']
+
+    export = client.get(f"/api/results/{data['result_id']}/export?format=arrow&table=posts")
+    assert export.status_code == 200
+    table = pa.ipc.open_stream(io.BytesIO(export.data)).read_all()
+    assert table.column('post_url').to_pylist() == POST_URLS
+    assert sum(table.column('total_comments').to_pylist()) == data['total_comments']
+
+def test_stats_match_full_analysis():
+    """The lean /api/stats counters equal the counts of the full per-comment analysis"""
+    url = 'https://www.instagram.com/p/stats/'
+    response = client.post('/api/stats', json={'url': url})
+    assert response.status_code == 200
+    lean = response.get_json()['data']
+
+    # The fake Apify client serves the same comments for the same run
+    comments = backend.sentiment_analyzer.analyze_batch(backend.instagram_scraper.scrape_comments(url))
+    positive, negative, neutral, _, topic_stats = backend.analyze_comments(comments)
+
+    assert lean['stats'] == {'total_comments': len(comments), 'positive': len(positive),
+                             'negative': len(negative), 'neutral': len(neutral)}
+    assert negative and lean['topics'] == topic_stats
+
+def test_ndjson_comments_negotiated():
+    """format=ndjson streams every comment, compressed as the client accepts"""
+    response = client.post('/api/analyze', json={'url': 'https://www.instagram.com/p/ndjson/', 'refresh': True})
+    data = response.get_json()['data']
+    page = client.get(f"{data['comments_url']}?limit=500").get_json()['data']
+
+    for accept, decode in (('', lambda body: body), ('gzip', gzip.decompress), ('br, gzip', brotli.decompress)):
+        response = client.get(f"{data['comments_url']}?format=ndjson", headers={'Accept-Encoding': accept})
+        assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+        assert response.headers.get('Content-Encoding') == (accept.split(',')[0] or None)
+        assert 'Accept-Encoding' in response.headers['Vary']
+        lines = [json.loads(line) for line in decode(response.data).splitlines()]
+        assert len(lines) == data['total_comments'] and lines == page['comments']
+
+def test_identical_requests_share_one_scrape():
+    """Concurrent identical analyses wait for one computation: one actor run, one result"""
+    apify_runs = backend.apify_client.stats()['runs']
+    coalesced = backend.single_flight.stats()['coalesced']
+    backend.apify_client.latency = 0.5
+    responses = []
+
+    def request():
+        responses.append(backend.app.test_client().post(
+            '/api/analyze', json={'url': 'https://www.instagram.com/p/coalesced/', 'refresh': True}))
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+    finally:
+        backend.apify_client.latency = 0.0
+
+    assert [response.status_code for response in responses] == [200] * 6
+    assert len({response.get_json()['data']['result_id'] for response in responses}) == 1
+    assert backend.apify_client.stats()['runs'] == apify_runs + 1
+    assert backend.single_flight.stats()['coalesced'] == coalesced + 5
+
+def test_trace_timings():
+    """Server-Timing has one metric per stage plus the total; timings=true adds the same spans to the body"""
+    response = client.post('/api/analyze?timings=true', json={'url': 'https://www.instagram.com/p/traced/', 'refresh': True},
+                           headers={'Origin': 'https://app.example'})
+    assert response.status_code == 200
+
+    metrics = response.headers['Server-Timing'].split(', ')
+    for metric in metrics:
+        assert re.fullmatch(r'[A-Za-z0-9_.-]+;dur=\d+\.\d(;desc="\d+ spans")?', metric), metric
+    assert metrics[-1].startswith('total;dur=')
+
+    timings = response.get_json()['timings']
+    assert timings['trace_id'] == response.headers['X-Trace-Id']
+    assert timings['total_ms'] > 0
+    assert {'apify_run', 'dedup', 'topics'} <= set(timings['stages'])
+    for name, stage in timings['stages'].items():
+        assert any(metric.startswith(f"{name};") for metric in metrics)
+        assert stage['count'] == sum(1 for span in timings['spans'] if span['name'] == name)
+    # Timings differ on every request, so they must not carry a cacheable ETag
+    assert 'ETag' not in response.headers
+
+    # Browser clients can only read these headers when CORS exposes them
+    exposed = {header.strip().lower() for header in response.headers['Access-Control-Expose-Headers'].split(',')}
+    assert {'server-timing', 'x-trace-id'} <= exposed
+
+def test_shed_request_retry_after():
+    """A shed analysis gets 429 with a Retry-After header the browser is allowed to read"""
+    controller = AdmissionController('analyze', max_concurrent=1, max_queue=0)
+    original = backend.admission_controllers.get('analyze')
+    backend.admission_controllers['analyze'] = controller
+    controller.acquire('other client')
+    try:
+        response = client.post('/api/analyze', json={'url': 'https://www.instagram.com/p/busy/', 'refresh': True},
+                                headers={'Origin': 'https://app.example'})
+    finally:
+        controller.release(1.0)
+        backend.admission_controllers['analyze'] = original
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == str(response.get_json()['retry_after'])
+    assert int(response.headers['Retry-After']) >= 1
+    exposed = {header.strip().lower() for header in response.headers['Access-Control-Expose-Headers'].split(',')}
+    assert 'retry-after' in exposed
+
+def test_invalid_numbers_rejected():
+    """Malformed or out-of-range numeric fields are client errors (400) on every endpoint, never 500"""
+    post = {'url': 'https://www.instagram.com/p/numbers/'}
+    profile = {'profile_url': 'https://www.instagram.com/acme/'}
+    cases = [
+        ('/api/analyze', dict(post, max_comments='abc')),
+        ('/api/analyze', dict(post, max_comments=2.5)),
+        ('/api/analyze', dict(post, max_comments=0)),
+        ('/api/analyze', dict(post, sample=True, tolerance='wide')),
+        ('/api/analyze', dict(post, sample=True, confidence=1)),
+        ('/api/analyze', dict(post, sample=True, tolerance=-0.1)),
+        ('/api/analyze-batch', {'urls': [post['url']], 'max_comments': [10]}),
+        ('/api/analyze-profile', dict(profile, max_posts='many')),
+        ('/api/analyze-profile', dict(profile, max_posts=-1)),
+        ('/api/analyze-profile', dict(profile, timeout_seconds='abc')),
+        ('/api/analyze-profile', dict(profile, timeout_seconds=-5)),
+        ('/api/analyze-profile', dict(profile, timeout_seconds=True)),
+        ('/api/analyze-profile', dict(profile, timeout_seconds='nan')),
+        ('/api/analyze-facebook-group', {'group_url': 'https://www.facebook.com/acme', 'max_posts': 'x'}),
+        ('/api/analyze-facebook-group', {'group_url': 'https://www.facebook.com/acme', 'timeout_seconds': 0}),
+        ('/api/analyze-portfolio', {'profiles': [profile['profile_url']], 'max_posts': '1e400'}),
+        ('/api/analyze-portfolio', {'profiles': [profile['profile_url']], 'timeout_seconds': 'soon'}),
+        ('/api/monitor/profiles', {'url': profile['profile_url'], 'interval_minutes': 'hourly'}),
+        ('/api/monitor/profiles', {'url': profile['profile_url'], 'interval_minutes': -60}),
+        ('/api/monitor/profiles', {'url': profile['profile_url'], 'max_posts': 0}),
+    ]
+    for path, body in cases:
+        response = client.post(path, json=body)
+        assert response.status_code == 400, (path, body, response.status_code)
+        error = response.get_json()['error']
+        assert any(name in error for name in body if name not in ('url', 'urls', 'profile_url', 'group_url', 'profiles', 'sample')), error
+
+    for path in ('/api/analyze?url=https://www.instagram.com/p/numbers/&max_comments=lots',
+                 '/api/results/unknown/comments?limit=x', '/api/results/unknown/comments?limit=0',
+                 '/api/history/comments?limit=1.5'):
+        assert client.get(path).status_code == 400, path
+
+    # Valid numbers, also as strings, still go through
+    response = client.post('/api/analyze', json=dict(post, max_comments='20', sample=True, tolerance='0.2'))
+    assert response.status_code == 200
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("HTTP API Test")
+    print("="*60)
+
+    test_batch_result_has_summary()
+    test_stats_match_full_analysis()
+    test_ndjson_comments_negotiated()
+    test_identical_requests_share_one_scrape()
+    test_trace_timings()
+    test_shed_request_retry_after()
+    test_invalid_numbers_rejected()
+
+    print("\n✅ API endpoints work")
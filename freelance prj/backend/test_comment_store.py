@@ -0,0 +1,125 @@
+"""
+Test script for the persistent comment store
+Checks keyset pagination (rows sharing a timestamp and rows without one are neither
+skipped nor repeated) and that saving the same comments again replaces their rows and
+keeps the rollups exact
+
+Run directly (python test_comment_store.py) or with pytest
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+from services.comment_store import CommentStore
+
+PROFILE = 'https://www.instagram.com/acme'
+POST_URL = 'https://www.instagram.com/p/acme1/'
+BASE_TS = 1717243200  # 2024-06-01 12:00 UTC
+
+def make_comments(count=25):
+    """Comments with runs of equal timestamps, every fifth one without a timestamp"""
+    sentiments = ('positive', 'negative', 'neutral')
+    return [
+        {
+            'id': f"c{idx}",
+            'post_url': POST_URL,
+            'username': f"user{idx}",
+            'text': f"comment {idx}",
+            'timestamp': None if idx % 5 == 4 else BASE_TS - (idx // 3) * 60,
+            'sentiment': sentiments[idx % 3],
+            'topic': 'Shipping' if idx % 3 == 1 else None
+        }
+        for idx in range(count)
+    ]
+
+@contextmanager
+def scratch_store():
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        store = CommentStore(os.path.join(scratch_dir, 'comments.db'))
+        try:
+            yield store
+        finally:
+            store.close()
+
+def all_pages(store, limit, **filters):
+    pages = []
+    cursor = None
+    while True:
+        page = store.query_comments(limit=limit, cursor=cursor, **filters)
+        pages.append(page['comments'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+def test_keyset_pagination():
+    with scratch_store() as store:
+        comments = make_comments()
+        store.save_comments(comments, 'instagram', profile=PROFILE)
+
+        pages = all_pages(store, limit=4)
+        rows = [row for page in pages for row in page]
+
+        assert len(pages) == 7 and all(len(page) == 4 for page in pages[:-1])
+        assert sorted(row['comment_id'] for row in rows) == sorted(c['id'] for c in comments)
+        timestamps = [row['timestamp'] for row in rows]
+        dated = [ts for ts in timestamps if ts is not None]
+        # Newest first, undated comments last
+        assert dated == sorted(dated, reverse=True)
+        assert timestamps[len(dated):] == [None] * (len(timestamps) - len(dated))
+
+        negative = [row for page in all_pages(store, limit=2, sentiment='negative') for row in page]
+        assert sorted(row['comment_id'] for row in negative) == sorted(
+            c['id'] for c in comments if c['sentiment'] == 'negative')
+
+def test_invalid_cursor():
+    with scratch_store() as store:
+        try:
+            store.query_comments(cursor='not a cursor')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('an invalid cursor should be rejected')
+
+def test_save_is_idempotent():
+    """Saving comments again replaces their rows - counts and rollups do not double"""
+    with scratch_store() as store:
+        comments = make_comments()
+        store.save_comments(comments, 'instagram', profile=PROFILE)
+        aggregate = store.aggregate(platform='instagram')
+        rollups = sorted(map(tuple, store.query_rollups('day', platform='instagram')))
+
+        store.save_comments(comments, 'instagram', profile=PROFILE)
+
+        assert store.aggregate(platform='instagram') == aggregate
+        assert sorted(map(tuple, store.query_rollups('day', platform='instagram'))) == rollups
+        assert aggregate['total_comments'] == 25
+        assert sum(row[3] for row in rollups) == len([c for c in comments if c['timestamp'] is not None])
+
+def test_reanalysis_replaces_labels():
+    """A re-analyzed comment moves to its new sentiment in the counts and the rollups"""
+    with scratch_store() as store:
+        comments = make_comments(3)
+        store.save_comments(comments, 'instagram', profile=PROFILE)
+
+        store.save_comments([dict(comments[0], sentiment='negative', topic='Quality')], 'instagram', profile=PROFILE)
+
+        aggregate = store.aggregate(platform='instagram')
+        assert aggregate['sentiment_counts'] == {'positive': 0, 'negative': 2, 'neutral': 1}
+        assert aggregate['topic_stats'] == {'Quality': 1, 'Shipping': 1}
+        day_counts = {}
+        for _, sentiment, _, count in store.query_rollups('day', platform='instagram'):
+            day_counts[sentiment] = day_counts.get(sentiment, 0) + count
+        assert day_counts == {'negative': 2, 'neutral': 1}
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Comment Store Test")
+    print("="*60)
+
+    test_keyset_pagination()
+    test_invalid_cursor()
+    test_save_is_idempotent()
+    test_reanalysis_replaces_labels()
+
+    print("\n✅ Comment pages are complete and saves are idempotent")
@@ -0,0 +1,255 @@
+"""
+Test script for incremental profile analysis and scheduled monitoring runs
+Drives the app's incremental pipeline against a scripted FakeApifyClient (the test decides
+which posts and comments the profile has) and a scratch CommentStore
+
+Run directly (python test_incremental.py) or with pytest
+"""
+
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+# Importing test_api sets up the app against the offline Apify stand-in
+from test_api import backend, client
+from services.comment_store import CommentStore
+from services.fake_apify import FakeApifyClient
+from services.result_store import ResultStore
+
+PROFILE_URL = 'https://www.instagram.com/acme/'
+NEWEST_POST = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+class ScriptedApify(FakeApifyClient):
+    """FakeApifyClient serving one profile whose posts and comments the test sets up"""
+
+    def __init__(self):
+        super().__init__()
+        self.posts = []
+        self.comments = {}
+        self.listings = []
+        self.comment_runs = []
+        # Cleared to hold listings until the test releases them
+        self.listing_gate = threading.Event()
+        self.listing_gate.set()
+
+    def add_post(self, days_old, comments=12):
+        """Add a post `days_old` days before NEWEST_POST with `comments` comments (newest first)"""
+        url = f"https://www.instagram.com/p/acme{days_old:04d}/"
+        posted = NEWEST_POST - timedelta(days=days_old)
+        self.posts.append({'url': url, 'timestamp': posted.isoformat()})
+        self.posts.sort(key=lambda post: post['timestamp'], reverse=True)
+        self.comments[url] = []
+        self.add_comments(url, comments, posted)
+        return url
+
+    def add_comments(self, url, count, after):
+        """Add `count` comments to a post, posted after `after`"""
+        existing = self.comments[url]
+        for _ in range(count):
+            idx = len(existing)
+            existing.append({
+                'id': f"{url.rsplit('/', 2)[-2]}-c{idx}",
+                'text': f"comment number {idx} on this post",
+                'ownerUsername': f"user{idx}",
+                'timestamp': (after + timedelta(minutes=idx + 1)).isoformat()
+            })
+
+    def _synthesize(self, actor_id, run_input):
+        if run_input.get('resultsType') == 'posts':
+            self.listings.append(run_input)
+            self.listing_gate.wait(10)
+            return iter([dict(post, commentsCount=len(self.comments[post['url']])) for post in self.posts])
+        url = run_input['directUrls'][0]
+        self.comment_runs.append(url)
+        return iter(list(self.comments.get(url, [])))
+
+@contextmanager
+def scripted_backend():
+    """Point the app's Instagram scraper, comment store and result store at scratch instances"""
+    apify = ScriptedApify()
+    saved = backend.instagram_scraper.client, backend.comment_store, backend.result_store
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        backend.instagram_scraper.client = apify
+        backend.comment_store = CommentStore(os.path.join(scratch_dir, 'comments.db'))
+        backend.result_store = ResultStore(spill_dir=os.path.join(scratch_dir, 'spills'))
+        try:
+            yield apify
+        finally:
+            backend.instagram_scraper.client, backend.comment_store, backend.result_store = saved
+
+def analyze(max_posts=5, from_date=None):
+    """An incremental=true profile request, bypassing the response cache"""
+    response = client.post('/api/analyze-profile', json={
+        'profile_url': PROFILE_URL, 'incremental': True, 'refresh': True,
+        'max_posts': max_posts, 'from_date': from_date
+    })
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']
+
+def in_background(fn):
+    """Run fn on a thread, returning the thread and a list that receives its result"""
+    results = []
+    thread = threading.Thread(target=lambda: results.append(fn()), daemon=True)
+    thread.start()
+    return thread, results
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+def stored_rows(platform='instagram'):
+    return backend.comment_store._connection().execute(
+        "SELECT COUNT(*), COUNT(DISTINCT comment_id) FROM comments WHERE platform = ?", (platform,)
+    ).fetchone()
+
+def test_first_run_sets_watermarks():
+    """A first run stores every comment and records per-post and profile watermarks"""
+    with scripted_backend() as apify:
+        urls = [apify.add_post(days_old) for days_old in (0, 1, 2)]
+
+        data = analyze()
+
+        assert data['incremental']['new_posts'] == 3 and data['incremental']['new_comments'] == 36
+        assert data['total_comments'] == 36 and tuple(stored_rows()) == (36, 36)
+        profile = backend.normalize_url(PROFILE_URL)
+        watermarks = backend.comment_store.get_post_watermarks('instagram', profile)
+        assert set(watermarks) == set(urls)
+        newest_comment = max(comment['timestamp'] for comment in apify.comments[urls[0]])
+        assert watermarks[urls[0]]['latest_comment_ts'] == backend.to_epoch(newest_comment)
+        assert watermarks[urls[0]]['comment_count'] == watermarks[urls[0]]['reported_comment_count'] == 12
+        profile_watermark = backend.comment_store.get_profile_watermark('instagram', profile)
+        assert profile_watermark['latest_post_ts'] == int(NEWEST_POST.timestamp())
+
+def test_second_run_fetches_only_new_comments():
+    """Only posts whose comment count grew are scraped again, and only their new comments are scored"""
+    with scripted_backend() as apify:
+        urls = [apify.add_post(days_old) for days_old in (0, 1, 2)]
+        analyze()
+        apify.comment_runs.clear()
+        apify.add_comments(urls[1], 3, NEWEST_POST)
+
+        data = analyze()
+
+        assert apify.comment_runs == [urls[1]]
+        assert data['incremental']['new_comments'] == 3
+        assert data['incremental']['new_posts'] == 0 and data['incremental']['unchanged_posts'] == 2
+        assert data['total_comments'] == 39 and tuple(stored_rows()) == (39, 39)
+
+def test_refetched_comments_not_duplicated():
+    """Re-scraped posts return their old comments too - these are matched by id, not stored twice"""
+    with scripted_backend() as apify:
+        recent = apify.add_post(10)
+        apify.add_post(20)
+        analyze()
+        apify.add_comments(recent, 2, NEWEST_POST)
+        # An edit that changes the text keeps the platform id
+        apify.comments[recent][0]['text'] = 'edited: comment number 0 on this post'
+
+        first = analyze()
+        second = analyze()
+
+        assert first['incremental']['new_comments'] == 2 and second['incremental']['new_comments'] == 0
+        assert apify.comment_runs.count(recent) == 2
+        assert second['total_comments'] == 26 and tuple(stored_rows()) == (26, 26)
+
+def test_profile_watermark_bounds_listing():
+    """
+    Posts older than the profile watermark minus INCREMENTAL_LOOKBACK_DAYS are not scraped
+    again; they are reported from the comment store
+    """
+    with scripted_backend() as apify:
+        apify.add_post(0)
+        recent = apify.add_post(10)
+        old = apify.add_post(backend.INCREMENTAL_LOOKBACK_DAYS + 15)
+        analyze(from_date='2024-01-01')
+        apify.comment_runs.clear()
+        apify.add_comments(recent, 1, NEWEST_POST)
+        apify.add_comments(old, 5, NEWEST_POST)
+
+        data = analyze(from_date='2024-01-01')
+
+        bound = NEWEST_POST - timedelta(days=backend.INCREMENTAL_LOOKBACK_DAYS)
+        assert data['incremental']['listed_from'] == bound.strftime('%Y-%m-%d')
+        # The old post's new comments wait for a full (non-incremental) run
+        assert apify.comment_runs == [recent]
+        assert data['total_posts'] == 3
+        assert data['total_comments'] == 37
+        assert {post['post_url'] for post in data['posts_analysis']} == {apify.posts[0]['url'], recent, old}
+
+def test_monitor_run_only_updates_comment_store():
+    """Scheduled runs merge comments into the store without filling the ResultStore"""
+    with scripted_backend() as apify:
+        for days_old in (0, 1, 2):
+            apify.add_post(days_old)
+
+        status_code, body, comment_lists = backend.run_monitored_analysis('instagram', PROFILE_URL, 5)
+
+        assert status_code == 200 and comment_lists is None
+        assert 'result_id' not in body['data'] and body['data']['total_comments'] == 36
+        assert backend.comment_store.aggregate(platform='instagram')['total_comments'] == 36
+        assert len(backend.result_store._results) == 0
+
+def test_monitor_and_request_share_one_ingest():
+    """A request arriving during a scheduled run of the same profile waits for it instead of scraping again"""
+    with scripted_backend() as apify:
+        for days_old in (0, 1, 2):
+            apify.add_post(days_old)
+        apify.listing_gate.clear()
+        coalesced = backend.single_flight.stats()['coalesced']
+
+        monitor, monitor_results = in_background(lambda: backend.run_monitored_analysis('instagram', PROFILE_URL, 5))
+        wait_for(lambda: len(apify.listings) == 1)
+        request, request_results = in_background(analyze)
+        wait_for(lambda: backend.single_flight.stats()['coalesced'] > coalesced)
+        apify.listing_gate.set()
+        monitor.join(10)
+        request.join(10)
+
+        assert len(apify.listings) == 1
+        assert sorted(apify.comment_runs) == sorted(apify.comments)
+        data = request_results[0]
+        assert data['total_comments'] == monitor_results[0][1]['data']['total_comments'] == 36
+        assert backend.result_store.get(data['result_id']) is not None
+
+def test_request_with_other_parameters_runs_after():
+    """A request with another post limit waits for the scheduled run, then only lists again"""
+    with scripted_backend() as apify:
+        for days_old in (0, 1, 2):
+            apify.add_post(days_old)
+        apify.listing_gate.clear()
+        coalesced = backend.single_flight.stats()['coalesced']
+
+        monitor, _ = in_background(lambda: backend.run_monitored_analysis('instagram', PROFILE_URL, 5))
+        wait_for(lambda: len(apify.listings) == 1)
+        request, request_results = in_background(lambda: analyze(max_posts=2))
+        wait_for(lambda: backend.single_flight.stats()['coalesced'] > coalesced)
+        apify.listing_gate.set()
+        monitor.join(10)
+        request.join(10)
+
+        # The second listing finds every post unchanged, so no comments are scraped twice
+        assert len(apify.listings) == 2
+        assert sorted(apify.comment_runs) == sorted(apify.comments)
+        data = request_results[0]
+        assert data['total_posts'] == 2 and data['total_comments'] == 24
+        assert data['incremental']['unchanged_posts'] == 2
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Incremental Analysis Test")
+    print("="*60)
+
+    test_first_run_sets_watermarks()
+    test_second_run_fetches_only_new_comments()
+    test_refetched_comments_not_duplicated()
+    test_profile_watermark_bounds_listing()
+    test_monitor_run_only_updates_comment_store()
+    test_monitor_and_request_share_one_ingest()
+    test_request_with_other_parameters_runs_after()
+
+    print("\n✅ Incremental runs merge deltas and share one ingest per profile")
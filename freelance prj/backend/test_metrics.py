@@ -0,0 +1,127 @@
+"""
+Test script for the Prometheus metrics
+Checks that /metrics sums the metric files of every gunicorn worker (prometheus_client
+multiprocess mode) and keeps the counts of workers that have exited, that histograms with
+a span also record it in the request trace, and that coalesced requests are counted
+
+Run directly (python test_metrics.py) or with pytest
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from services import metrics, tracing
+from services.single_flight import SingleFlight
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WORKER = '''
+import sys
+from services.metrics import ACTOR_RUNS, ADMISSION_WAIT_SECONDS
+ACTOR_RUNS.labels('test-actor', 'success').inc(int(sys.argv[1]))
+ADMISSION_WAIT_SECONDS.labels('analyze').observe(float(sys.argv[2]))
+'''
+
+def run_worker(directory, runs, waited):
+    """Record metrics in a separate process, like a gunicorn worker, and let it exit"""
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory)
+    subprocess.run([sys.executable, '-c', WORKER, str(runs), str(waited)], cwd=BACKEND_DIR, env=env, check=True)
+
+@contextmanager
+def multiprocess_env(directory):
+    """Point PROMETHEUS_MULTIPROC_DIR at directory, as gunicorn.conf.py does for the master"""
+    previous = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = directory
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ['PROMETHEUS_MULTIPROC_DIR']
+        else:
+            os.environ['PROMETHEUS_MULTIPROC_DIR'] = previous
+
+def test_render_sums_workers():
+    """The files of two worker pids are summed, after both workers have exited"""
+    with tempfile.TemporaryDirectory() as directory:
+        run_worker(directory, 3, 0.05)
+        run_worker(directory, 4, 2.0)
+        assert len([name for name in os.listdir(directory) if name.startswith('counter_')]) == 2
+
+        text = metrics.render(directory).decode()
+
+        assert 'apify_actor_runs_total{actor="test-actor",outcome="success"} 7.0' in text
+        assert 'admission_queue_wait_seconds_bucket{endpoint="analyze",le="0.1"} 1.0' in text
+        assert 'admission_queue_wait_seconds_bucket{endpoint="analyze",le="2.5"} 2.0' in text
+        assert 'admission_queue_wait_seconds_count{endpoint="analyze"} 2.0' in text
+
+def test_recycled_worker_counts_kept():
+    """A worker recycled after max_requests is marked dead, but its counts stay in /metrics"""
+    with tempfile.TemporaryDirectory() as directory:
+        run_worker(directory, 5, 0.05)
+        pid = int(next(name for name in os.listdir(directory) if name.startswith('counter_'))[8:-3])
+
+        with multiprocess_env(directory):
+            metrics.mark_process_dead(pid)
+        run_worker(directory, 2, 0.05)
+
+        assert 'apify_actor_runs_total{actor="test-actor",outcome="success"} 7.0' in metrics.render(directory).decode()
+
+def test_clear_multiprocess_dir():
+    with tempfile.TemporaryDirectory() as directory:
+        run_worker(directory, 1, 0.1)
+        with multiprocess_env(directory):
+            metrics.clear_multiprocess_dir()
+        assert os.listdir(directory) == []
+
+def test_histogram_span_recorded():
+    """Observations of a histogram with a span also show up in the current trace, per label"""
+    trace, token = tracing.start_trace()
+    try:
+        metrics.SENTIMENT_TIER_SECONDS.labels('model').observe(0.25)
+        with metrics.MODEL_BATCH_SECONDS.time():
+            pass
+    finally:
+        tracing.end_trace(token)
+
+    stages = trace.stages()
+    assert stages['sentiment_model']['count'] == 1 and stages['sentiment_model']['ms'] == 250.0
+    assert stages['model_batch']['count'] == 1
+
+def test_coalesced_calls_exported():
+    def count(outcome):
+        return metrics.REGISTRY.get_sample_value('single_flight_calls_total', {'outcome': outcome}) or 0
+
+    executed, coalesced = count('executed'), count('coalesced')
+    single_flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: single_flight.do('key', release.wait), daemon=True)
+    leader.start()
+    while single_flight.stats()['in_flight'] == 0:
+        release.wait(0.005)
+    follower = threading.Thread(target=lambda: single_flight.do('key', release.wait), daemon=True)
+    follower.start()
+    while single_flight.stats()['coalesced'] == 0:
+        release.wait(0.005)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert count('executed') == executed + 1 and count('coalesced') == coalesced + 1
+    assert 'single_flight_calls_total{outcome="coalesced"}' in metrics.render().decode()
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Metrics Test")
+    print("="*60)
+
+    test_render_sums_workers()
+    test_recycled_worker_counts_kept()
+    test_clear_multiprocess_dir()
+    test_histogram_span_recorded()
+    test_coalesced_calls_exported()
+
+    print("\n✅ Worker metrics are summed and coalesced requests are counted")
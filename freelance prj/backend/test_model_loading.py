@@ -0,0 +1,64 @@
+"""
+Test script for loading the sentiment model from a local safetensors export
+Saves a tiny randomly initialized BERT classifier and checks the memory-mapped model
+gives the same outputs as the model in memory, and that missing weights are an error
+
+Run directly (python test_model_loading.py) or with pytest
+"""
+
+import os
+import tempfile
+
+import torch
+from safetensors.torch import load_file, save_file
+from transformers import BertConfig, BertForSequenceClassification
+
+from services.model_loading import load_mmap_model
+
+def tiny_model():
+    config = BertConfig(vocab_size=100, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, num_labels=5)
+    torch.manual_seed(0)
+    return BertForSequenceClassification(config).eval()
+
+def test_mmap_model_matches_eager_model():
+    eager = tiny_model()
+    input_ids = torch.tensor([[2, 15, 37, 8, 91, 3], [2, 44, 3, 0, 0, 0]])
+    attention_mask = (input_ids != 0).long()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        eager.save_pretrained(model_dir, safe_serialization=True)
+        mapped = load_mmap_model(model_dir)
+
+        assert not mapped.training
+        assert not any(param.is_meta for param in mapped.parameters())
+        assert not any(buffer.is_meta for buffer in mapped.buffers())
+        with torch.no_grad():
+            expected = eager(input_ids=input_ids, attention_mask=attention_mask).logits
+            actual = mapped(input_ids=input_ids, attention_mask=attention_mask).logits
+        assert torch.equal(expected, actual)
+
+def test_missing_weights_rejected():
+    """A checkpoint without the classifier head must not load with a random head"""
+    with tempfile.TemporaryDirectory() as model_dir:
+        tiny_model().save_pretrained(model_dir, safe_serialization=True)
+        path = os.path.join(model_dir, 'model.safetensors')
+        weights = {name: tensor for name, tensor in load_file(path).items() if not name.startswith('classifier.')}
+        save_file(weights, path, metadata={'format': 'pt'})
+
+        try:
+            load_mmap_model(model_dir)
+        except ValueError as e:
+            assert 'classifier.' in str(e)
+        else:
+            raise AssertionError('loading should fail without the classifier weights')
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Model Loading Test")
+    print("="*60)
+
+    test_mmap_model_matches_eager_model()
+    test_missing_weights_rejected()
+
+    print("\n✅ Memory-mapped models match the eager ones")
@@ -0,0 +1,88 @@
+"""
+Test script for near-duplicate clustering (MinHash + LSH) ahead of sentiment scoring
+Checks that spam variants land in one cluster, that clusters do not depend on the process
+(gunicorn workers, restarts), and that a cluster's model score is applied to its members
+
+Run directly (python test_near_duplicates.py) or with pytest
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from services.near_duplicates import NearDuplicateClusterer
+from services.sentiment_analyzer import SentimentAnalyzer
+
+TEXTS = [
+    'Check out my page for free followers and giveaways every day',
+    '@someone check out my page for FREE followers and giveaways every day!!',
+    'check out my page for free followers and giveaways every day 🔥 https://spam.example',
+    'The delivery took three weeks and the box arrived damaged',
+    'the delivery took three weeks and the box arrived damaged...',
+    'The sizes run small so order one size up',
+    'ok',
+    'ok',
+    'no',
+]
+
+def test_near_duplicates_cluster():
+    labels = NearDuplicateClusterer(threshold=0.8).cluster(TEXTS)
+    assert labels[0] == labels[1] == labels[2] == 0
+    assert labels[3] == labels[4] == 3
+    assert labels[5] == 5
+    # Short texts only merge when identical
+    assert labels[6] == labels[7] == 6 and labels[8] == 8
+
+def test_clusters_stable_across_processes():
+    """Shingle hashes must not depend on PYTHONHASHSEED"""
+    script = ('import json, sys; from services.near_duplicates import NearDuplicateClusterer; '
+              'c = NearDuplicateClusterer(); '
+              'print(json.dumps([c.signature(c.normalize(t)).tolist() for t in json.load(sys.stdin)]))')
+    outputs = set()
+    for seed in ('1', '2'):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        run = subprocess.run([sys.executable, '-c', script], input=json.dumps(TEXTS), env=env,
+                             capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        outputs.add(run.stdout)
+    assert len(outputs) == 1
+
+class StubModelAnalyzer(SentimentAnalyzer):
+    """SentimentAnalyzer with a stand-in model that labels by keyword and records what it scored"""
+
+    def __init__(self):
+        self.batch_size = 32
+        self.sentiment_pipeline = object()
+        self.is_multilingual = False
+        self.scored = []
+
+    def analyze_sentiment_bert_batch(self, texts):
+        self.scored.extend(texts)
+        return [{'sentiment': 'negative' if 'damaged' in text else 'positive', 'confidence': 0.7 + 0.01 * len(self.scored)}
+                for text in texts]
+
+def test_cluster_score_applied_to_members():
+    analyzer = StubModelAnalyzer()
+    comments = [{'text': text} for text in TEXTS[3:6]]
+    analyzer.analyze_batch(comments, clusterer=NearDuplicateClusterer(threshold=0.8))
+
+    # One model call per cluster: the damaged-box pair and the single comment
+    assert len(analyzer.scored) == 2
+    first, second, single = comments
+    assert first['sentiment'] == second['sentiment'] == 'negative'
+    assert first['confidence'] == second['confidence']
+    assert first['duplicate_cluster'] == second['duplicate_cluster'] == 0
+    assert first['duplicate_cluster_size'] == 2
+    assert single['sentiment'] == 'positive' and 'duplicate_cluster' not in single
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Near-duplicate Clustering Test")
+    print("="*60)
+
+    test_near_duplicates_cluster()
+    test_clusters_stable_across_processes()
+    test_cluster_score_applied_to_members()
+
+    print("\n✅ Near-duplicates are clustered stably and scored once")
@@ -0,0 +1,75 @@
+"""
+Test script for the Apify call budget (token bucket)
+Checks the burst and the sustained rate, that a zero rate disables limiting, and that
+limiters sharing a state file - like the gunicorn workers do - draw from one budget
+
+Run directly (python test_rate_limiter.py) or with pytest
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+from services.rate_limiter import RateLimiter
+
+def timed_calls(limiter, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        limiter.acquire()
+    return time.perf_counter() - started
+
+def test_burst_then_rate():
+    limiter = RateLimiter(rate_per_second=20, burst=3)
+    assert timed_calls(limiter, 3) < 0.04
+    # The bucket is empty: 4 more calls at 20/s take 0.2s
+    elapsed = timed_calls(limiter, 4)
+    assert 0.18 <= elapsed < 0.4
+    assert limiter.stats()['waited_seconds'] >= 0.18
+
+def test_zero_rate_disables_limiting():
+    limiter = RateLimiter(rate_per_second=0, burst=1)
+    assert timed_calls(limiter, 100) < 0.05
+    assert limiter.stats()['waited_seconds'] == 0
+
+def test_shared_state_file():
+    """Two limiters on one state file share the burst instead of getting one each"""
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        path = os.path.join(scratch_dir, 'apify_rate_limit')
+        first = RateLimiter(rate_per_second=20, burst=3, state_path=path)
+        second = RateLimiter(rate_per_second=20, burst=3, state_path=path)
+
+        assert timed_calls(first, 3) < 0.04
+        assert timed_calls(second, 2) >= 0.08
+        assert second.stats()['shared'] and first.stats()['waited_seconds'] == 0
+
+def drain(path, count):
+    timed_calls(RateLimiter(rate_per_second=20, burst=2, state_path=path), count)
+
+def test_budget_across_processes():
+    """Worker processes together stay within one rate: 12 calls at 20/s with a burst of 2 take 0.5s"""
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        path = os.path.join(scratch_dir, 'apify_rate_limit')
+        workers = [multiprocessing.get_context('fork').Process(target=drain, args=(path, 6)) for _ in range(2)]
+
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(10)
+        elapsed = time.perf_counter() - started
+
+        assert all(worker.exitcode == 0 for worker in workers)
+        assert elapsed >= 0.45
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Rate Limiter Test")
+    print("="*60)
+
+    test_burst_then_rate()
+    test_zero_rate_disables_limiting()
+    test_shared_state_file()
+    test_budget_across_processes()
+
+    print("\n✅ Apify calls stay within one budget across threads and processes")
@@ -0,0 +1,214 @@
+"""
+Test script for request coalescing and the analysis response cache
+Checks that concurrent identical calls share one computation, and that cached outcomes go
+through the fresh (HIT), stale-while-revalidate (STALE) and expired (MISS) paths with
+stable ETags
+
+Run directly (python test_response_cache.py) or with pytest
+"""
+
+import tempfile
+import threading
+import time
+
+from services.response_cache import ResponseCache
+from services.single_flight import SingleFlight
+
+def outcome(value, status_code=200, partial=False):
+    """Outcome tuple as returned by the run_* analysis functions"""
+    return status_code, {'success': status_code == 200, 'data': {'value': value, 'partial': partial}}, {'all_comments': []}
+
+class CountingCompute:
+    """compute() stand-in that counts calls and can be held until released"""
+
+    def __init__(self, block=False):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return outcome(self.calls)
+
+def run_concurrently(fn, count):
+    """Call fn from `count` threads, returning results (or exceptions) in thread order"""
+    results = [None] * count
+
+    def worker(idx):
+        try:
+            results[idx] = fn()
+        except Exception as e:
+            results[idx] = e
+
+    threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+def test_single_flight_coalesces():
+    """Concurrent calls with one key run the function once and share its result"""
+    flight = SingleFlight()
+    compute = CountingCompute(block=True)
+    threads, results = run_concurrently(lambda: flight.do('key', compute), 8)
+
+    assert compute.started.wait(5)
+    deadline = time.time() + 5
+    while flight.stats()['coalesced'] < 7 and time.time() < deadline:
+        time.sleep(0.01)
+    compute.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert compute.calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {'executions': 1, 'coalesced': 7, 'in_flight': 0}
+
+    # Once finished, the next call computes again
+    flight.do('key', compute)
+    assert compute.calls == 2
+
+def test_single_flight_shares_errors():
+    """Waiters receive the leader's exception instead of a result"""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('scrape failed')
+
+    threads, results = run_concurrently(lambda: flight.do('key', failing), 4)
+    assert started.wait(5)
+    deadline = time.time() + 5
+    while flight.stats()['coalesced'] < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()['executions'] == 1
+
+def test_hit_and_etag():
+    """A miss computes once; later lookups hit memory, then disk after a restart, with the same ETag"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResponseCache(cache_dir, ttl_seconds=60, stale_seconds=60)
+        compute = CountingCompute()
+        key = ResponseCache.make_key(('analyze-profile', 'https://instagram.com/acme', None, 10))
+
+        entry, status = cache.get_or_compute(key, compute)
+        assert status == 'MISS' and compute.calls == 1
+        # Only status and body are cached - the comment lists live in the ResultStore
+        assert entry['outcome'][2] is None
+
+        again, status = cache.get_or_compute(key, compute)
+        assert status == 'HIT' and compute.calls == 1
+        assert again['etag'] == entry['etag']
+
+        restarted = ResponseCache(cache_dir, ttl_seconds=60, stale_seconds=60)
+        from_disk, status = restarted.get_or_compute(key, compute)
+        assert status == 'HIT' and compute.calls == 1
+        assert from_disk['etag'] == entry['etag']
+        assert restarted.stats()['disk'] == 1
+
+        # Same body, same ETag; a different body changes it
+        other_key = ResponseCache.make_key(('analyze-profile', 'https://instagram.com/other', None, 10))
+        other, _ = cache.get_or_compute(other_key, lambda: outcome(1))
+        assert other['etag'] == entry['etag']
+        changed, _ = cache.get_or_compute(other_key, lambda: outcome(2), force_refresh=True)
+        assert changed['etag'] != entry['etag']
+
+def test_stale_while_revalidate():
+    """An expired entry inside the grace window is served once while a background refresh replaces it"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResponseCache(cache_dir, ttl_seconds=0.2, stale_seconds=60)
+        compute = CountingCompute()
+        first, _ = cache.get_or_compute('key', compute)
+        time.sleep(0.3)
+
+        stale, status = cache.get_or_compute('key', compute)
+        assert status == 'STALE'
+        assert stale['etag'] == first['etag']
+
+        deadline = time.time() + 5
+        while cache._memory.get('key') is first and time.time() < deadline:
+            time.sleep(0.01)
+        refreshed, status = cache.get_or_compute('key', compute)
+        assert status == 'HIT' and compute.calls == 2
+        assert refreshed['outcome'][1]['data']['value'] == 2
+
+def test_expired_past_grace_window():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResponseCache(cache_dir, ttl_seconds=0.1, stale_seconds=0.1)
+        compute = CountingCompute()
+        cache.get_or_compute('key', compute)
+        time.sleep(0.3)
+
+        _, status = cache.get_or_compute('key', compute)
+        assert status == 'MISS' and compute.calls == 2
+
+def test_errors_and_partial_results_not_cached():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResponseCache(cache_dir)
+        cache.get_or_compute('error', lambda: outcome(1, status_code=404))
+        _, status = cache.get_or_compute('error', lambda: outcome(1, status_code=404))
+        assert status == 'MISS'
+
+        cache.get_or_compute('partial', lambda: outcome(1, partial=True))
+        _, status = cache.get_or_compute('partial', lambda: outcome(1, partial=True))
+        assert status == 'MISS'
+
+def test_invalid_entries_dropped():
+    """Entries whose stored result is gone count as misses and are removed from both tiers"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        alive = {'ok': True}
+        cache = ResponseCache(cache_dir, is_valid=lambda cached: alive['ok'])
+        compute = CountingCompute()
+        cache.get_or_compute('key', compute)
+
+        alive['ok'] = False
+        _, status = cache.get_or_compute('key', compute)
+        assert status == 'MISS' and compute.calls == 2
+
+        alive['ok'] = True
+        _, status = cache.get_or_compute('key', compute)
+        assert status == 'HIT'
+
+def test_concurrent_misses_compute_once():
+    """Concurrent misses of one key share a single computation through SingleFlight"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResponseCache(cache_dir, single_flight=SingleFlight())
+        compute = CountingCompute(block=True)
+        threads, results = run_concurrently(lambda: cache.get_or_compute('key', compute), 6)
+
+        assert compute.started.wait(5)
+        deadline = time.time() + 5
+        while cache.single_flight.stats()['coalesced'] < 5 and time.time() < deadline:
+            time.sleep(0.01)
+        compute.release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert compute.calls == 1
+        assert len({result[0]['etag'] for result in results}) == 1
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Response Cache Test")
+    print("="*60)
+
+    test_single_flight_coalesces()
+    test_single_flight_shares_errors()
+    test_hit_and_etag()
+    test_stale_while_revalidate()
+    test_expired_past_grace_window()
+    test_errors_and_partial_results_not_cached()
+    test_invalid_entries_dropped()
+    test_concurrent_misses_compute_once()
+
+    print("\n✅ Coalescing and cache paths work")
@@ -0,0 +1,181 @@
+"""
+Test script for ResultStore paging and spilled results
+Checks that cursors walk every matching comment exactly once, for in-memory and spilled
+results, and that spilled results are served by other processes and after a restart
+
+Run directly (python test_result_store.py) or with pytest
+"""
+
+import tempfile
+
+from services.result_store import ResultStore
+
+SENTIMENTS = ['positive', 'negative', 'neutral']
+
+def synthetic_comments(count):
+    return [
+        {
+            'id': f"c{i}",
+            'text': f"comment {i}",
+            'sentiment': SENTIMENTS[i % 3],
+            'topic': 'Delivery' if i % 2 else None,
+            'post_url': f"https://instagram.com/p/post{i % 4}"
+        }
+        for i in range(count)
+    ]
+
+def collect_pages(store, result_id, limit, **filters):
+    """Follow next_cursor until the last page, returning every comment id and the page count"""
+    ids = []
+    pages = 0
+    cursor = None
+    while True:
+        page = store.query_comments(result_id, cursor=cursor, limit=limit, **filters)
+        pages += 1
+        assert page['count'] == len(page['comments']) <= limit
+        ids.extend(c['id'] for c in page['comments'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids, pages
+
+def test_cursor_paging():
+    """Pages over filtered in-memory comments return each match once, in order"""
+    comments = synthetic_comments(103)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ResultStore(spill_dir=spill_dir)
+        result_id = store.save(comments)
+
+        ids, pages = collect_pages(store, result_id, 10)
+        assert ids == [c['id'] for c in comments]
+        assert pages == 11
+
+        expected = [c['id'] for c in comments if c['sentiment'] == 'negative' and c['topic'] == 'Delivery']
+        ids, _ = collect_pages(store, result_id, 7, sentiment='negative', topic='Delivery')
+        assert ids == expected
+
+        # An exact multiple of the page size ends without an empty trailing page
+        ids, pages = collect_pages(store, result_id, 103)
+        assert len(ids) == 103 and pages == 1
+
+def test_spill_paging_matches_memory():
+    """A spilled result pages exactly like the same comments held in memory"""
+    comments = synthetic_comments(2500)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ResultStore(spill_dir=spill_dir)
+        memory_id = store.save(comments)
+        spill = store.create_spill()
+        spill.add(comments)
+        spill_id = store.save_spill(spill)
+
+        for filters in ({}, {'sentiment': 'neutral'}, {'post': 'https://instagram.com/p/post2', 'topic': 'Delivery'}):
+            assert collect_pages(store, spill_id, 333, **filters) == collect_pages(store, memory_id, 333, **filters)
+
+        projected = store.query_comments(spill_id, limit=1, fields=['id', 'sentiment'])
+        assert projected['comments'] == [{'id': 'c0', 'sentiment': 'positive'}]
+
+def test_invalid_cursor():
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ResultStore(spill_dir=spill_dir)
+        result_id = store.save(synthetic_comments(5))
+        try:
+            store.query_comments(result_id, cursor='not-a-cursor')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('an invalid cursor must raise ValueError')
+
+def test_spill_reopened_after_restart():
+    """A new store over the same spill directory serves a spilled result by its id"""
+    comments = synthetic_comments(1200)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        first = ResultStore(spill_dir=spill_dir)
+        spill = first.create_spill()
+        spill.add(comments)
+        result_id = first.save_spill(spill)
+        expected = collect_pages(first, result_id, 500, sentiment='negative')
+
+        restarted = ResultStore(spill_dir=spill_dir)
+        assert collect_pages(restarted, result_id, 500, sentiment='negative') == expected
+        assert [c['id'] for c in restarted.iter_comments(result_id)] == [c['id'] for c in comments]
+
+        # Unknown ids and ids that are not plain result ids are not looked up on disk
+        assert restarted.get('0' * 32) is None
+        assert restarted.get('../etc/passwd') is None
+
+def test_eviction_removes_spill():
+    """Least recently used results are evicted and their spill files deleted"""
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ResultStore(max_results=1, spill_dir=spill_dir)
+        spill = store.create_spill()
+        spill.add(synthetic_comments(10))
+        spilled_id = store.save_spill(spill)
+        store.save(synthetic_comments(3))
+
+        assert store.get(spilled_id) is None
+        assert store.query_comments(spilled_id) is None
+
+def test_expired_spill_not_reopened():
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ResultStore(spill_dir=spill_dir)
+        spill = store.create_spill()
+        spill.add(synthetic_comments(10))
+        result_id = store.save_spill(spill)
+
+        expired = ResultStore(ttl_seconds=-1, spill_dir=spill_dir)
+        assert expired.get(result_id) is None
+
+def test_shared_store_across_processes():
+    """Shared stores over one spill directory (like gunicorn workers) serve each other's results"""
+    comments = synthetic_comments(300)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        owner = ResultStore(max_results=1, spill_dir=spill_dir, shared=True)
+        other = ResultStore(max_results=1, spill_dir=spill_dir, shared=True)
+        result_id = owner.save(comments, summary={'posts_analysis': [{'post_url': 'p'}]})
+
+        assert collect_pages(other, result_id, 100) == collect_pages(owner, result_id, 100)
+        assert other.get(result_id)['summary'] == {'posts_analysis': [{'post_url': 'p'}]}
+
+        # Evicting a reopened result only drops the handle
+        other.save(synthetic_comments(3))
+        assert owner.get(result_id) is not None
+
+        # The owner's eviction deletes the file, and the other store notices
+        other.get(result_id)
+        owner.save(synthetic_comments(3))
+        assert owner.get(result_id) is None
+        assert other.get(result_id) is None
+
+def test_unfinished_spill_not_reopened():
+    with tempfile.TemporaryDirectory() as spill_dir:
+        writer = ResultStore(spill_dir=spill_dir)
+        spill = writer.create_spill()
+        spill.add(synthetic_comments(10))
+        assert ResultStore(spill_dir=spill_dir).get(spill.result_id) is None
+        writer.save_spill(spill)
+        assert ResultStore(spill_dir=spill_dir).get(spill.result_id) is not None
+
+def test_sweep_removes_expired_orphans():
+    with tempfile.TemporaryDirectory() as spill_dir:
+        first = ResultStore(spill_dir=spill_dir, shared=True)
+        orphan_id = first.save(synthetic_comments(5))
+
+        sweeper = ResultStore(ttl_seconds=-1, spill_dir=spill_dir, sweep_seconds=0)
+        sweeper.save(synthetic_comments(1))
+        assert ResultStore(spill_dir=spill_dir).get(orphan_id) is None
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Result Store Paging Test")
+    print("="*60)
+
+    test_cursor_paging()
+    test_spill_paging_matches_memory()
+    test_invalid_cursor()
+    test_spill_reopened_after_restart()
+    test_eviction_removes_spill()
+    test_expired_spill_not_reopened()
+    test_shared_store_across_processes()
+    test_unfinished_spill_not_reopened()
+    test_sweep_removes_expired_orphans()
+
+    print("\n✅ Result store paging works")
@@ -0,0 +1,138 @@
+"""
+Test script for sampling mode (stratified sentiment estimates with early stopping)
+Uses seeded samples from synthetic populations whose true sentiment shares are known,
+with a labelling stand-in for the model
+
+Run directly (python test_sampling.py) or with pytest
+"""
+
+import random
+
+from services.sampling import StratifiedEstimate, interleave, sample_sentiment, stratify
+
+def population(size, seed=7):
+    """
+    Comments whose sentiment depends on likes: the most liked fifth is 80% positive, the
+    rest 30% positive - a sample that ignored strata sizes would be biased
+    """
+    rng = random.Random(seed)
+    comments = []
+    for i in range(size):
+        likes = i % 100
+        positive_share = 0.8 if likes >= 80 else 0.3
+        roll = rng.random()
+        if roll < positive_share:
+            label = 'positive'
+        elif roll < positive_share + (1 - positive_share) / 2:
+            label = 'negative'
+        else:
+            label = 'neutral'
+        comments.append({'id': f"c{i}", 'text': f"comment {i}", 'likes': likes, 'label': label})
+    return comments
+
+def true_shares(comments):
+    return {s: sum(c['label'] == s for c in comments) / len(comments) for s in ('positive', 'negative', 'neutral')}
+
+class LabelClassifier:
+    """Copies the known label into 'sentiment' and records the size of every round"""
+
+    def __init__(self):
+        self.rounds = []
+
+    def __call__(self, comments):
+        self.rounds.append(len(comments))
+        for comment in comments:
+            comment['sentiment'] = comment['label']
+        return comments
+
+def test_strata_weighting():
+    """Each stratum contributes in proportion to its size, not to its number of sampled comments"""
+    estimate = StratifiedEstimate([100, 900])
+    for _ in range(8):
+        estimate.add(0, 'positive')
+    for _ in range(2):
+        estimate.add(0, 'negative')
+    for _ in range(2):
+        estimate.add(1, 'positive')
+    for _ in range(18):
+        estimate.add(1, 'neutral')
+
+    intervals = estimate.intervals()
+    assert abs(intervals['positive']['proportion'] - (0.1 * 0.8 + 0.9 * 0.1)) < 1e-9
+    assert abs(intervals['negative']['proportion'] - 0.1 * 0.2) < 1e-9
+    assert abs(intervals['neutral']['proportion'] - 0.9 * 0.9) < 1e-9
+
+def test_full_census_has_no_error():
+    """Sampling every comment collapses the intervals (finite population correction)"""
+    estimate = StratifiedEstimate([3, 2])
+    for stratum, sentiment in ((0, 'positive'), (0, 'negative'), (0, 'positive'), (1, 'neutral'), (1, 'neutral')):
+        estimate.add(stratum, sentiment)
+    assert estimate.max_width() == 0
+
+def test_prefixes_are_proportional():
+    """Every prefix of the interleaved draw takes each stratum in proportion to its size"""
+    groups = stratify(population(1000), strata=4, seed=1)
+    taken = [0] * len(groups)
+    for n, (stratum, _) in enumerate(interleave(groups), start=1):
+        taken[stratum] += 1
+        for h, group in enumerate(groups):
+            assert abs(taken[h] - n * len(group) / 1000) <= 1
+
+def test_early_stopping_and_coverage():
+    """A loose tolerance stops well before the population is exhausted, with intervals that cover the truth"""
+    comments = population(20000)
+    truth = true_shares(comments)
+    classify = LabelClassifier()
+
+    sampled, estimate = sample_sentiment(comments, classify, tolerance=0.08, seed=3)
+
+    assert estimate['stopped_early']
+    assert estimate['sample_size'] == len(sampled) < 2000
+    assert estimate['population'] == 20000
+    for sentiment, interval in estimate['intervals'].items():
+        assert interval['upper'] - interval['lower'] <= 0.08
+        assert interval['lower'] <= truth[sentiment] <= interval['upper']
+
+    # Comments are scored in rounds: min_sample first, then one batch per interval check
+    assert classify.rounds[0] == 100
+    assert sum(classify.rounds) == len(sampled)
+    assert len(classify.rounds) < len(sampled) / 10
+
+def test_same_seed_same_sample():
+    comments = population(5000)
+    first, _ = sample_sentiment(comments, LabelClassifier(), tolerance=0.1, seed=11)
+    second, _ = sample_sentiment(comments, LabelClassifier(), tolerance=0.1, seed=11)
+    assert [c['id'] for c in first] == [c['id'] for c in second]
+
+def test_unreachable_tolerance_scores_everything():
+    """Without early stopping every comment is scored and the estimate is exact"""
+    comments = population(600)
+    truth = true_shares(comments)
+    sampled, estimate = sample_sentiment(comments, LabelClassifier(), tolerance=0.0, seed=5)
+
+    assert not estimate['stopped_early']
+    assert len(sampled) == 600
+    for sentiment, interval in estimate['intervals'].items():
+        assert abs(interval['proportion'] - truth[sentiment]) < 1e-9
+
+def test_max_sample_caps_scoring():
+    classify = LabelClassifier()
+    sampled, estimate = sample_sentiment(population(5000), classify, tolerance=0.0, max_sample=250, seed=2)
+    assert len(sampled) == estimate['sample_size'] == 250
+    assert sum(classify.rounds) == 250
+    assert not estimate['stopped_early']
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Sampling Mode Test")
+    print("="*60)
+
+    test_strata_weighting()
+    test_full_census_has_no_error()
+    test_prefixes_are_proportional()
+    test_early_stopping_and_coverage()
+    test_same_seed_same_sample()
+    test_unreachable_tolerance_scores_everything()
+    test_max_sample_caps_scoring()
+
+    print("\n✅ Sampling estimates and early stopping work")
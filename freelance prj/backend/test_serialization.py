@@ -0,0 +1,67 @@
+"""
+Test script for JSON serialization and response compression
+Checks Accept-Encoding negotiation, the incremental gzip/brotli streams used for NDJSON,
+and compression of buffered responses (size threshold, weak ETag)
+
+Run directly (python test_serialization.py) or with pytest
+"""
+
+import gzip
+
+import brotli
+from flask import Flask, Response
+
+from services.serialization import (
+    choose_encoding, compress_response, dumps_bytes, iter_brotli, iter_gzip, iter_ndjson, loads_bytes
+)
+
+ROWS = [{'id': str(idx), 'text': f"comment {idx} " + 'x' * (idx % 50), 'likes': idx} for idx in range(3000)]
+
+def test_choose_encoding():
+    assert choose_encoding('') is None
+    assert choose_encoding('identity') is None
+    assert choose_encoding('gzip, deflate, br') == 'br'
+    assert choose_encoding('gzip;q=0.8, br;q=0') == 'gzip'
+    assert choose_encoding('br;q=0, gzip;q=0') is None
+    assert choose_encoding('*') == 'gzip'
+    assert choose_encoding('GZIP;q=0.5') == 'gzip'
+
+def test_ndjson_streams_round_trip():
+    """Compressed NDJSON streams decode to one JSON document per line, over several flushes"""
+    body = b''.join(iter_ndjson(ROWS))
+    assert len(body) > 65536
+    assert [loads_bytes(line) for line in body.splitlines()] == ROWS
+
+    gzip_chunks = list(iter_gzip(iter_ndjson(ROWS)))
+    brotli_chunks = list(iter_brotli(iter_ndjson(ROWS)))
+    assert len(gzip_chunks) > 2 and len(brotli_chunks) > 2
+    assert gzip.decompress(b''.join(gzip_chunks)) == body
+    assert brotli.decompress(b''.join(brotli_chunks)) == body
+
+def test_compress_response():
+    app = Flask(__name__)
+    with app.app_context():
+        small = Response(dumps_bytes({'ok': True}), mimetype='application/json')
+        assert 'Content-Encoding' not in compress_response(small, 'gzip', min_size=1024).headers
+
+        large = Response(dumps_bytes(ROWS), mimetype='application/json')
+        large.set_etag('abc')
+        large = compress_response(large, 'gzip, br', min_size=1024)
+        assert large.headers['Content-Encoding'] == 'br'
+        assert large.get_etag() == ('abc', True)
+        assert 'Accept-Encoding' in large.vary
+        assert loads_bytes(brotli.decompress(large.get_data())) == ROWS
+
+        plain = Response(b'x' * 4096, mimetype='image/png')
+        assert 'Content-Encoding' not in compress_response(plain, 'gzip', min_size=1024).headers
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Serialization Test")
+    print("="*60)
+
+    test_choose_encoding()
+    test_ndjson_streams_round_trip()
+    test_compress_response()
+
+    print("\n✅ Responses are encoded as negotiated")
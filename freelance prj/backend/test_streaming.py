@@ -0,0 +1,132 @@
+"""
+Test script for the memory-bounded streaming analysis mode
+Feeds a synthetic million-comment profile through StreamingAggregator and a spilled
+result, and checks that the peak of Python allocations (tracemalloc) stays under a cap;
+also checks Facebook posts are yielded while the actor's dataset is still being read
+
+Run directly (python test_streaming.py) or with pytest
+Environment: STREAMING_TEST_COMMENTS (default 1000000), STREAMING_TEST_PEAK_CAP_MB (default 20)
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+from services.facebook_scraper import FacebookScraper
+from services.fake_apify import FakeApifyClient
+from services.result_store import ResultStore
+from services.streaming import StreamingAggregator
+
+TOTAL_COMMENTS = int(os.getenv('STREAMING_TEST_COMMENTS', 1000000))
+PEAK_CAP_MB = int(os.getenv('STREAMING_TEST_PEAK_CAP_MB', 20))
+COMMENTS_PER_POST = 1000
+
+TEXTS = [
+    'love this so much',
+    'terrible quality, broke after a day',
+    'when is the next drop?',
+    'delivery took forever',
+    'great price',
+    'ok'
+]
+
+class KeywordSentiment:
+    """Cheap stand-in for SentimentAnalyzer so the test measures the pipeline, not the model"""
+
+    def analyze_batch(self, comments, clusterer=None):
+        for comment in comments:
+            text = comment['text']
+            if 'terrible' in text or 'forever' in text:
+                comment['sentiment'] = 'negative'
+            elif 'love' in text or 'great' in text:
+                comment['sentiment'] = 'positive'
+            else:
+                comment['sentiment'] = 'neutral'
+            comment['confidence'] = 0.9
+        return comments
+
+class KeywordTopics:
+    """Cheap stand-in for TopicClassifier"""
+
+    def classify_topics(self, comments):
+        for comment in comments:
+            comment['topic'] = 'Delivery' if 'delivery' in comment['text'] else 'Bad Quality'
+        return comments
+
+def synthetic_posts(total_comments):
+    """Yield posts lazily, like InstagramScraper.iter_posts_comments"""
+    for post_idx in range(0, total_comments, COMMENTS_PER_POST):
+        count = min(COMMENTS_PER_POST, total_comments - post_idx)
+        yield {
+            'post_url': f"https://instagram.com/p/synthetic{post_idx // COMMENTS_PER_POST}",
+            'post_date': '2024-01-01',
+            'comments': (
+                {
+                    'id': f"c{post_idx + i}",
+                    'text': TEXTS[(post_idx + i) % len(TEXTS)],
+                    'username': f"user{i % 500}",
+                    'timestamp': '2024-01-01T12:00:00Z',
+                    'likes': i % 10
+                }
+                for i in range(count)
+            )
+        }
+
+def test_streaming_peak_memory():
+    """Peak traced memory stays under the cap while a million comments stream through"""
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ResultStore(spill_dir=spill_dir)
+        spill = store.create_spill()
+        aggregator = StreamingAggregator(KeywordSentiment(), KeywordTopics(), sinks=[spill.add])
+
+        # Unlike ru_maxrss (a process-lifetime peak), this peak only covers the streamed run
+        tracemalloc.start()
+        started = time.time()
+        try:
+            for post in synthetic_posts(TOTAL_COMMENTS):
+                aggregator.add_post(post['post_url'], post['post_date'], post['comments'])
+            result_id = store.save_spill(spill)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = peak / (1024 * 1024)
+
+        print(f"Streamed {aggregator.total_comments} comments from {aggregator.total_posts} posts "
+              f"in {time.time() - started:.1f}s")
+        print(f"Peak traced memory: {peak_mb:.1f} MB (cap {PEAK_CAP_MB} MB)")
+
+        assert aggregator.total_comments == TOTAL_COMMENTS
+        assert spill.count == TOTAL_COMMENTS
+        assert aggregator.sentiment_counts['negative'] == sum(aggregator.topic_stats.values())
+
+        # The spilled result is served page by page like an in-memory one
+        page = store.query_comments(result_id, sentiment='negative', limit=50)
+        assert page['count'] == 50 and page['next_cursor']
+        assert all(c['sentiment'] == 'negative' for c in page['comments'])
+
+        assert peak_mb < PEAK_CAP_MB, f"Peak traced memory was {peak_mb:.1f} MB (cap {PEAK_CAP_MB} MB)"
+
+def test_facebook_posts_stream_from_dataset():
+    """Each Facebook post is handed over as soon as its dataset item is read"""
+    client = FakeApifyClient(comments_per_post=20, posts_per_profile=30)
+    scraper = FacebookScraper(api_key=None, client=client)
+
+    posts = scraper.iter_posts_bulk('https://www.facebook.com/acme', max_posts=10)
+    first = next(posts)
+    assert len(first['comments']) == 20
+    assert client.stats()['items'] == 1
+
+    assert len(list(posts)) == 9
+    # Reading stops at max_posts instead of draining the dataset
+    assert client.stats()['items'] == 10
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Streaming Analysis Memory Test")
+    print("="*60)
+
+    test_streaming_peak_memory()
+    test_facebook_posts_stream_from_dataset()
+
+    print("\n✅ Peak memory stayed under the cap")
@@ -0,0 +1,109 @@
+"""
+Test script for structured logging
+Checks the SampledLog cadence, the fields of the JSON formatter (trace id, extra fields,
+exception) and that queued records keep the values they were logged with
+
+Run directly (python test_structured_logging.py) or with pytest
+"""
+
+import json
+import logging
+from datetime import datetime
+
+from services import tracing
+from services.structured_logging import JsonFormatter, SampledLog, _DeferredQueueHandler, _TraceIdFilter
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+def make_logger(name, level=logging.INFO):
+    logger = logging.getLogger(name)
+    logger.handlers = []
+    logger.propagate = False
+    logger.setLevel(level)
+    handler = ListHandler()
+    logger.addHandler(handler)
+    return logger, handler
+
+def test_sampled_log_cadence():
+    logger, handler = make_logger('test.sampled')
+    sampled = SampledLog(logger, every=100)
+
+    for idx in range(250):
+        sampled.warning("Could not parse timestamp: %s", idx)
+
+    assert [record.getMessage() for record in handler.records] == [
+        'Could not parse timestamp: 0 (occurrence 1, logging 1 in 100)',
+        'Could not parse timestamp: 100 (occurrence 101, logging 1 in 100)',
+        'Could not parse timestamp: 200 (occurrence 201, logging 1 in 100)'
+    ]
+    assert all(record.levelno == logging.WARNING for record in handler.records)
+
+def test_sampled_log_skips_disabled_levels():
+    """Occurrences below the logger's level are not counted"""
+    logger, handler = make_logger('test.sampled_disabled', level=logging.WARNING)
+    sampled = SampledLog(logger, every=2)
+    for _ in range(5):
+        sampled.info("not shown")
+    sampled.warning("shown")
+    sampled.warning("sampled out")
+    sampled.warning("shown again")
+
+    assert [record.getMessage() for record in handler.records] == [
+        'shown (occurrence 1, logging 1 in 2)',
+        'shown again (occurrence 3, logging 1 in 2)'
+    ]
+
+def test_json_formatter_fields():
+    logger, handler = make_logger('test.json')
+    handler.addFilter(_TraceIdFilter())
+    trace, token = tracing.start_trace('abc123')
+    try:
+        try:
+            raise ValueError('bad timestamp')
+        except ValueError:
+            logger.exception("Scrape of %s failed", 'acme', extra={'post_url': 'https://www.instagram.com/p/x/'})
+    finally:
+        tracing.end_trace(token)
+    logger.info("outside a request")
+
+    entry = json.loads(JsonFormatter().format(handler.records[0]))
+    assert entry['level'] == 'ERROR' and entry['logger'] == 'test.json'
+    assert entry['message'] == 'Scrape of acme failed'
+    assert entry['trace_id'] == 'abc123'
+    assert entry['post_url'] == 'https://www.instagram.com/p/x/'
+    assert 'ValueError: bad timestamp' in entry['exception']
+    assert datetime.fromisoformat(entry['ts']).utcoffset().total_seconds() == 0
+    assert set(entry) == {'ts', 'level', 'logger', 'message', 'trace_id', 'post_url', 'exception'}
+
+    plain = json.loads(JsonFormatter().format(handler.records[1]))
+    assert set(plain) == {'ts', 'level', 'logger', 'message'}
+
+def test_queued_record_keeps_logged_values():
+    """The message is resolved when the record is queued, not when the listener formats it"""
+    handler = _DeferredQueueHandler(None)
+    items = ['a']
+    record = logging.LogRecord('test.queue', logging.INFO, __file__, 1, "items: %s", (items,), None)
+
+    prepared = handler.prepare(record)
+    items.append('b')
+
+    assert prepared.getMessage() == "items: ['a']"
+    assert json.loads(JsonFormatter().format(prepared))['message'] == "items: ['a']"
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Structured Logging Test")
+    print("="*60)
+
+    test_sampled_log_cadence()
+    test_sampled_log_skips_disabled_levels()
+    test_json_formatter_fields()
+    test_queued_record_keeps_logged_values()
+
+    print("\n✅ Logs are sampled and structured")
@@ -0,0 +1,89 @@
+"""
+Test script for sentiment trends
+Checks bucket boundaries (weeks start on Monday, UTC), gap filling and topic counts, and
+that weekly points regrouped from the daily rollups of a CommentStore match the comments
+
+Run directly (python test_trends.py) or with pytest
+"""
+
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+from services.comment_store import CommentStore
+from services.trends import bucket_floor, build_trend_series
+
+def epoch(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+def test_bucket_floor():
+    timestamps = np.array([epoch(2024, 6, 2, 23, 59), epoch(2024, 6, 3, 0, 0), epoch(2024, 6, 9, 13, 30)])
+    # 2024-06-03 is a Monday
+    assert list(bucket_floor(timestamps, 'week')) == [epoch(2024, 5, 27), epoch(2024, 6, 3), epoch(2024, 6, 3)]
+    assert list(bucket_floor(timestamps, 'day')) == [epoch(2024, 6, 2), epoch(2024, 6, 3), epoch(2024, 6, 9)]
+    assert list(bucket_floor(timestamps, 'hour')) == [epoch(2024, 6, 2, 23), epoch(2024, 6, 3), epoch(2024, 6, 9, 13)]
+
+def test_day_series_fills_gaps():
+    rows = [
+        (epoch(2024, 6, 1), 'positive', '', 3),
+        (epoch(2024, 6, 1), 'negative', 'Shipping', 2),
+        (epoch(2024, 6, 1), 'negative', 'Quality', 1),
+        (epoch(2024, 6, 4), 'neutral', '', 5)
+    ]
+
+    series = build_trend_series(rows, 'day')
+
+    assert [point['bucket_start'][:10] for point in series] == ['2024-06-01', '2024-06-02', '2024-06-03', '2024-06-04']
+    assert series[0] == {'bucket_start': '2024-06-01T00:00:00+00:00', 'positive': 3, 'negative': 3, 'neutral': 0,
+                         'total': 6, 'topics': {'Shipping': 2, 'Quality': 1}}
+    assert series[1]['total'] == 0 and series[1]['topics'] == {}
+    assert series[3]['neutral'] == 5
+    assert len(build_trend_series(rows, 'day', fill_gaps=False)) == 2
+    assert build_trend_series([], 'day') == []
+
+def test_week_from_day_rollups():
+    """Weekly trends regroup the daily rollups and agree with counting the comments directly"""
+    comments = []
+    for idx in range(60):
+        # Every 7 hours over ~17 days, crossing three week boundaries
+        comments.append({
+            'id': f"c{idx}",
+            'post_url': 'https://www.instagram.com/p/acme1/',
+            'text': f"comment {idx}",
+            'timestamp': epoch(2024, 5, 25) + idx * 7 * 3600,
+            'sentiment': ('positive', 'negative', 'neutral')[idx % 3],
+            'topic': 'Shipping' if idx % 3 == 1 else None
+        })
+    expected = {}
+    for comment in comments:
+        week = int(bucket_floor(np.array([comment['timestamp']]), 'week')[0])
+        counts = expected.setdefault(week, {'positive': 0, 'negative': 0, 'neutral': 0})
+        counts[comment['sentiment']] += 1
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        store = CommentStore(os.path.join(scratch_dir, 'comments.db'))
+        store.save_comments(comments, 'instagram', profile='https://www.instagram.com/acme')
+        rows = store.query_rollups('day', platform='instagram')
+        store.close()
+
+    series = build_trend_series(rows, 'week')
+
+    assert [point['bucket_start'][:10] for point in series] == ['2024-05-20', '2024-05-27', '2024-06-03', '2024-06-10']
+    for point in series:
+        start = int(datetime.fromisoformat(point['bucket_start']).timestamp())
+        assert {sentiment: point[sentiment] for sentiment in expected[start]} == expected[start]
+        assert point['topics'] == {'Shipping': expected[start]['negative']}
+    assert sum(point['total'] for point in series) == len(comments)
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("Trends Test")
+    print("="*60)
+
+    test_bucket_floor()
+    test_day_series_fills_gaps()
+    test_week_from_day_rollups()
+
+    print("\n✅ Trend buckets add up")
@@ -0,0 +1,35 @@
+"""
+Test script for URL normalization (the key of the response cache, single-flight and stores)
+Checks that share links of one profile or post map to the same URL and that only tracking
+parameters are dropped
+
+Run directly (python test_url_utils.py) or with pytest
+"""
+
+from services.url_utils import normalize_url
+
+def test_equivalent_links_match():
+    expected = 'https://instagram.com/acme'
+    for url in ('https://www.instagram.com/acme/', 'instagram.com/acme', 'HTTPS://M.Instagram.com/acme#top',
+                'https://instagram.com/acme/?igshid=abc123', 'https://instagram.com/acme?utm_source=ig&utm_medium=share'):
+        assert normalize_url(url) == expected, url
+
+def test_tracking_params_dropped():
+    url = 'https://www.facebook.com/acme/posts/1?__cft__[0]=AZX&__tn__=R&ref=share&fbclid=x&story_fbid=7'
+    assert normalize_url(url) == 'https://facebook.com/acme/posts/1?story_fbid=7'
+
+def test_params_sharing_a_prefix_kept():
+    """'ref' is matched by name - refid and referrer-style parameters change the target and are kept"""
+    url = 'https://m.facebook.com/profile.php?id=100&refid=17&referrer_profile_id=5&ref=bookmarks'
+    assert normalize_url(url) == 'https://facebook.com/profile.php?id=100&refid=17&referrer_profile_id=5'
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("URL Normalization Test")
+    print("="*60)
+
+    test_equivalent_links_match()
+    test_tracking_params_dropped()
+    test_params_sharing_a_prefix_kept()
+
+    print("\n✅ URLs normalize to stable keys")
@@ -0,0 +1,81 @@
+"""
+WSGI entry point for production serving
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module loads the whole backend - including the sentiment model and the
+topic classifier - so with preload_app the weights are loaded once in the gunicorn master
+and shared copy-on-write by the forked workers. `python app.py` stays the development server.
+"""
+
+import fcntl
+import gc
+import logging
+import os
+
+from app import app, comment_store, is_truthy, start_profile_monitor
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+MONITOR_LOCK_FILE = os.getenv(
+    'MONITOR_LOCK_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'monitor.lock')
+)
+
+_monitor_lock = None
+
+def prepare_fork():
+    """
+    Called in the master before each worker is forked: drop the master's SQLite connection
+    (connections must not cross a fork) and move every object allocated so far into the
+    GC's permanent generation, so collections in the workers do not write to - and
+    thereby copy - the pages holding the preloaded model
+    """
+    comment_store.close()
+    gc.freeze()
+
+def clear_metrics():
+    """Called in the master on start: drop metric files left by a previous run"""
+    metrics.clear_multiprocess_dir()
+
+def worker_died(pid):
+    """Called in the master when a worker has exited: drop its live gauges"""
+    metrics.mark_process_dead(pid)
+
+def configure_worker(workers):
+    """
+    Called in each worker after the fork: split the CPU cores between the workers' torch
+    thread pools instead of every worker using all of them
+
+    Args:
+        workers (int): Number of worker processes
+    """
+    import torch
+
+    threads = int(os.getenv('TORCH_NUM_THREADS', max(1, (os.cpu_count() or 1) // max(1, workers))))
+    torch.set_num_threads(threads)
+
+def start_monitor_in_one_worker():
+    """
+    Run the monitoring scheduler in exactly one worker - whichever first takes the lock file.
+    The lock is released when that worker exits (e.g. when it is recycled) and taken over by
+    the worker started in its place.
+
+    Returns:
+        bool: True if this worker runs the scheduler
+    """
+    global _monitor_lock
+    if not is_truthy(os.getenv('MONITOR_ENABLED', 'true')):
+        return False
+    os.makedirs(os.path.dirname(os.path.abspath(MONITOR_LOCK_FILE)), exist_ok=True)
+    lock = open(MONITOR_LOCK_FILE, 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return False
+    # Held (not closed) for the lifetime of the worker
+    _monitor_lock = lock
+    start_profile_monitor()
+    logger.info(f"Worker {os.getpid()} runs the profile monitor")
+    return True
@@ -304,6 +304,9 @@ async function handleAnalyze(e) {
         loadingText.textContent = currentMode === 'single' ? 'Analyzing Facebook Post...' : 'Analyzing Facebook Group...';
     }
     
+    // This page renders every comment at once, so ask for the full comment lists
+    body.include_comments = true;
+    
     try {
         const response = await fetch(endpoint, {
             method: 'POST',
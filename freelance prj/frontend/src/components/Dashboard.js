@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import './Dashboard.css';
 import StatCard from './StatCard';
 import SentimentChart from './SentimentChart';
@@ -13,10 +13,50 @@ const Dashboard = ({ data, onReset }) => {
   const isProfileAnalysis = data.type === 'profile';
   const { sentiment_stats, topic_stats, total_comments } = data;
   
-  // Handle both single and profile analysis
-  const comments = data.all_comments || data.comments || { positive: [], negative: [], neutral: [] };
+  // Legacy responses embed every comment; newer ones keep them server-side under result_id
+  const embeddedComments = data.all_comments || data.comments;
+  const [pagedComments, setPagedComments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingComments, setLoadingComments] = useState(false);
+
+  const fetchCommentsPage = useCallback(async (cursor) => {
+    if (!data.comments_url) return;
+    setLoadingComments(true);
+    try {
+      const API_BASE_URL = process.env.REACT_APP_API_URL || '';
+      const params = new URLSearchParams({
+        limit: '100',
+        fields: 'id,username,text,likes,sentiment,confidence,topic'
+      });
+      if (activeTab !== 'all') params.set('sentiment', activeTab);
+      if (cursor) params.set('cursor', cursor);
+
+      const response = await fetch(`${API_BASE_URL}${data.comments_url}?${params.toString()}`);
+      const result = await response.json();
+      if (result.success) {
+        setPagedComments(prev => (cursor ? [...prev, ...result.data.comments] : result.data.comments));
+        setNextCursor(result.data.next_cursor);
+      }
+    } catch (error) {
+      console.error('Error loading comments:', error);
+    } finally {
+      setLoadingComments(false);
+    }
+  }, [data.comments_url, activeTab]);
+
+  useEffect(() => {
+    if (!embeddedComments) {
+      setPagedComments([]);
+      setNextCursor(null);
+      fetchCommentsPage(null);
+    }
+  }, [embeddedComments, fetchCommentsPage]);
 
   const getCommentsForTab = () => {
+    if (!embeddedComments) {
+      return pagedComments;
+    }
+    const comments = embeddedComments;
     switch (activeTab) {
       case 'positive':
         return comments.positive || [];
@@ -153,6 +193,15 @@ const Dashboard = ({ data, onReset }) => {
           </div>
         </div>
         <CommentsList comments={getCommentsForTab()} />
+        {!embeddedComments && nextCursor && (
+          <button
+            className="reset-button"
+            onClick={() => fetchCommentsPage(nextCursor)}
+            disabled={loadingComments}
+          >
+            {loadingComments ? 'Loading...' : 'Load more comments'}
+          </button>
+        )}
       </motion.div>
     </motion.div>
   );